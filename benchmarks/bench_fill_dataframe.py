@@ -0,0 +1,50 @@
+"""Замер построения таблицы задач: построчное добавление против сборки по столбцам.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_fill_dataframe 1000 10000 50000
+"""
+
+import datetime
+import sys
+import time
+
+import pandas as pd
+
+import core.schema as schema
+from benchmarks.synthetic import make_project
+from core.table import build_task_table
+
+
+def legacy_fill_dataframe(project):
+    """Прежний способ: каждая строка добавляется через data.loc."""
+
+    columns = schema.get_columns()
+    data = pd.DataFrame(columns=[column.header for column in columns])
+    for t in project.Tasks:
+        arr = []
+        for column in columns:
+            value = getattr(t, column.attribute)
+            if isinstance(value, datetime.datetime):
+                value = datetime.datetime.date(value)
+            arr.append(value)
+        data.loc[len(data.index)] = arr
+    return data
+
+
+def _measure(function, project):
+    start = time.perf_counter()
+    function(project)
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    for count in sizes:
+        project = make_project(count)
+        columnar = _measure(lambda p: build_task_table(p.Tasks), project)
+        legacy = _measure(legacy_fill_dataframe, project)
+        print(f"{count:>7} задач: data.loc {legacy:8.3f} с, по столбцам {columnar:8.3f} с, "
+              f"ускорение x{legacy / columnar:.0f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 50000])
@@ -0,0 +1,174 @@
+"""Замеры этапов выгрузки ОФ и внесения факта на синтетических проектах.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.bench_pipeline --sizes 1000 --compare results.json
+
+Для каждого размера проекта замеряются время (лучшее из --repeat запусков)
+и пик памяти (отдельный запуск под tracemalloc) этапов:
+export_table - readOF.fill_dataframe, fact_table - fact.fill_dataframe,
+read_form - чтение нужных столбцов ОФ из Excel, rollup - свертка полей
+суммарных задач (core.hierarchy), check_form, change_project,
+write_form - запись ОФ в Excel со стилями, export_batch и fact_batch -
+пакетная обработка --files файлов через FakeBackend. MS Project не нужен, кэш таблиц задач отключается.
+Результаты выводятся в JSON (в файл --output или в stdout), таблица -
+в stderr. С --compare рядом выводится отношение ко времени из прежнего файла.
+"""
+
+import argparse
+import datetime
+import functools
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import settings.cache as cache_config
+import settings.readOF as config
+import core.batch as batch
+import core.excel as excel
+import core.fact as fact
+import core.hierarchy as hierarchy
+import core.readOF as readOF
+import core.schema as schema
+from benchmarks.synthetic import FakeApplication, FakeBackend, make_form, make_project, write_form
+from core.backend import SessionPool
+
+STAGES = ('export_table', 'fact_table', 'read_form', 'rollup', 'check_form', 'change_project', 'write_form',
+          'export_batch', 'fact_batch')
+
+
+def _measure(function, repeat):
+    """Возвращает времена repeat запусков и пик памяти отдельного запуска."""
+
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak
+
+
+def _stage_functions(count, files, mismatch_rate, folder):
+    """Готовит данные для замеров и возвращает словарь этап -> функция без аргументов."""
+
+    columns = [schema.header(attribute) for attribute in config.FACT_ID_COLUMNS]
+    project = make_project(count)
+    data_export = readOF.fill_dataframe(project)
+    data_project = fact.fill_dataframe(project)
+    form, _ = make_form(data_project, columns, mismatch_rate)
+    changes = fact.check_form(data_project, form, columns)
+    path_to_excel = os.path.join(folder, f"form_{count}.xlsx")
+    path_to_read_form = os.path.join(folder, f"form_{count}_fact.xlsx")
+    write_form(form, path_to_read_form)
+
+    paths_to_projects = []
+    paths_to_forms = []
+    for number in range(files):
+        path_to_project = os.path.join(folder, f"project_{count}_{number}.mpp")
+        with open(path_to_project, 'wb') as file:
+            file.write(str(number).encode())
+        paths_to_projects.append(path_to_project)
+        # FakeBackend создает проект по имени файла, форма строится по нему же.
+        msp = FakeApplication()
+        file_project = FakeBackend(count).open(msp, path_to_project)
+        file_form, _ = make_form(fact.fill_dataframe(file_project), columns, mismatch_rate, seed=number)
+        path_to_form = os.path.join(folder, f"project_{count}_{number}_form.xlsx")
+        write_form(file_form, path_to_form)
+        paths_to_forms.append(path_to_form)
+    path_to_output = os.path.join(folder, "OF")
+    os.makedirs(path_to_output, exist_ok=True)
+
+    def export_batch():
+        for _ in batch.iter_export(paths_to_projects, path_to_output, 1, functools.partial(FakeBackend, count)):
+            pass
+
+    def fact_batch():
+        with SessionPool(FakeBackend(count)) as pool:
+            for path_to_project, path_to_form in zip(paths_to_projects, paths_to_forms):
+                fact.main(path_to_project, path_to_form, pool)
+
+    return {
+        'export_table': lambda: readOF.fill_dataframe(project),
+        'fact_table': lambda: fact.fill_dataframe(project),
+        'read_form': lambda: fact.get_excel_pd(path_to_read_form, columns),
+        'rollup': lambda: hierarchy.rollup(data_export),
+        'check_form': lambda: fact.check_form(data_project, form, columns),
+        'change_project': lambda: fact.change_project(project, FakeApplication(), changes),
+        'write_form': lambda: excel.write_form(schema.for_output(data_export), path_to_excel, "Обменная форма",
+                                               schema.header('Text5')),
+        'export_batch': export_batch,
+        'fact_batch': fact_batch,
+    }
+
+
+def run(sizes, stages=STAGES, repeat=3, files=4, mismatch_rate=0.05):
+    """Выполняет замеры и возвращает результаты в виде словаря для JSON."""
+
+    cache_config.USE_CACHE = False
+    results = []
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as folder:
+            functions = _stage_functions(count, files, mismatch_rate, folder)
+            for stage in stages:
+                seconds, peak = _measure(functions[stage], repeat)
+                results.append({'stage': stage, 'tasks': count, 'files': files if stage.endswith('_batch') else 1,
+                                'seconds': min(seconds), 'runs': seconds, 'peak_memory_bytes': peak})
+                print(f"{stage:>15} {count:>7} задач: {min(seconds):9.3f} с, пик памяти {peak / 2 ** 20:8.1f} МБ",
+                      file=sys.stderr)
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pandas': pd.__version__,
+        'repeat': repeat,
+        'mismatch_rate': mismatch_rate,
+        'results': results,
+    }
+
+
+def compare(report, baseline):
+    """Выводит в stderr отношение времени этапов к прежнему отчету."""
+
+    previous = {(item['stage'], item['tasks']): item['seconds'] for item in baseline['results']}
+    for item in report['results']:
+        before = previous.get((item['stage'], item['tasks']))
+        if before:
+            print(f"{item['stage']:>15} {item['tasks']:>7} задач: {before:9.3f} с -> {item['seconds']:9.3f} с "
+                  f"(x{item['seconds'] / before:.2f})", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_pipeline')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--files', type=int, default=4, help='количество файлов в пакетных этапах')
+    parser.add_argument('--mismatch-rate', type=float, default=0.05, help='доля задач ОФ, отличающихся от проекта')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    parser.add_argument('--compare', help='прежний файл результатов для сравнения')
+    args = parser.parse_args(argv)
+    report = run(args.sizes, args.stages, args.repeat, args.files, args.mismatch_rate)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(report, json.load(file))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Замер времени импорта модулей, которые загружаются при старте приложения.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --modules core.runner --budget-ms 150 --output startup.json
+
+Каждый модуль импортируется в отдельном процессе Python с -X importtime
+(лучшее из --repeat запусков). Проверяется, что импорт укладывается в
+--budget-ms и что среди импортированных модулей нет тяжелых (--forbidden),
+которые должны загружаться только при первой обработке. Результаты
+выводятся в JSON (в файл --output или в stdout), таблица и самые долгие
+импорты - в stderr. Если бюджет превышен или загружен запрещенный модуль,
+код возврата 1.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+MODULES = ('core.runner', 'core.cli', 'interface.interface')  # Модули, которые импортируются при старте.
+FORBIDDEN = ('pandas', 'numpy', 'openpyxl', 'win32com', 'pythoncom')  # Модули, которых не должно быть при старте.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Корень репозитория.
+
+
+def _import_times(module):
+    """Импортирует модуль в отдельном процессе и возвращает словарь: модуль -> (собственное, общее) время в мкс."""
+
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+def measure(module, repeat, forbidden=FORBIDDEN, top=10):
+    """Возвращает результат замера одного модуля в виде словаря для JSON."""
+
+    runs = []
+    times = {}
+    for _ in range(repeat):
+        times = _import_times(module)
+        runs.append(times[module][1] / 1000)
+    loaded = sorted(name for name in times if name.split('.')[0] in forbidden)
+    slowest = sorted(times.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    return {'module': module, 'milliseconds': min(runs), 'runs': runs, 'modules_loaded': len(times),
+            'forbidden_loaded': loaded,
+            'slowest': [{'module': name, 'self_ms': own / 1000, 'cumulative_ms': cumulative / 1000}
+                        for name, (own, cumulative) in slowest]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench_startup')
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=250, help='допустимое время импорта модуля')
+    parser.add_argument('--forbidden', nargs='*', default=list(FORBIDDEN),
+                        help='модули, которые не должны импортироваться при старте')
+    parser.add_argument('--output', help='файл для результатов в JSON')
+    args = parser.parse_args(argv)
+    results = []
+    failed = False
+    for module in args.modules:
+        try:
+            result = measure(module, args.repeat, tuple(args.forbidden))
+        except RuntimeError as error:
+            print(f"{module:>22}: не импортируется ({error})", file=sys.stderr)
+            failed = True
+            continue
+        result['within_budget'] = result['milliseconds'] <= args.budget_ms and not result['forbidden_loaded']
+        failed = failed or not result['within_budget']
+        results.append(result)
+        print(f"{module:>22}: {result['milliseconds']:8.1f} мс, модулей {result['modules_loaded']:4}"
+              f"{'' if result['within_budget'] else ' - ПРЕВЫШЕН БЮДЖЕТ'}", file=sys.stderr)
+        if result['forbidden_loaded']:
+            print(f"{'':>22}  загружены: {', '.join(result['forbidden_loaded'][:10])}", file=sys.stderr)
+        for item in result['slowest'][:5]:
+            print(f"{'':>22}  {item['module']:<40} {item['self_ms']:8.1f} мс", file=sys.stderr)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'budget_ms': args.budget_ms,
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
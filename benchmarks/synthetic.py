@@ -0,0 +1,190 @@
+"""Модуль содержит синтетические объекты task и project для замеров без MS Project."""
+
+import datetime
+import os
+import random
+import threading
+import zlib
+
+import pandas as pd
+
+import core.schema as schema
+
+ELEMENT_TYPES = ('Подпроект', 'Стадия', 'Этап', 'Фаза', 'Мероприятие')  # Типы суммарных задач по уровням.
+LEAF_TYPES = ('Укрупненная работа', 'Веха', 'Ключевая веха')  # Типы конечных задач.
+MAX_OUTLINE_LEVEL = 8  # Максимальный уровень структуры синтетического проекта.
+
+
+class FakeTask:
+    """Заменитель объекта Task из project.
+
+    Хранит значения полей в словаре и отдает их как атрибуты, так же как
+    это делает COM объект.
+    """
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+
+class FakeTasks(list):
+    """Заменитель коллекции Tasks с поиском задачи по UniqueID.
+
+    Как и в MS Project, поиск по UniqueID не перебирает коллекцию.
+    """
+
+    def UniqueID(self, uid):
+        index = self.__dict__.get('_by_uid')
+        if index is None:
+            index = self.__dict__['_by_uid'] = {t.UniqueID: t for t in self}
+        try:
+            return index[uid]
+        except KeyError:
+            raise Exception(f'Задача с UniqueID {uid} не найдена')
+
+
+class FakeProject:
+    """Заменитель объекта project, у которого есть коллекция Tasks."""
+
+    def __init__(self, tasks):
+        self.Tasks = FakeTasks(tasks)
+
+
+def make_task(number, rnd):
+    """Создает task с заполненными полями схемы ОФ по их типам."""
+
+    start = datetime.datetime(2023, 1, 1, 8) + datetime.timedelta(days=rnd.randint(0, 700))
+    finish = start + datetime.timedelta(days=rnd.randint(1, 120), hours=9)
+    fields = {'UniqueID': number + 1, 'ID': number + 1}
+    for column in schema.get_columns():
+        if column.attribute in fields:
+            continue
+        if column.kind in ('text', 'category'):
+            value = f"{column.attribute}_{number}"
+        elif column.kind == 'int':
+            value = rnd.randint(0, 100)
+        elif column.kind == 'float':
+            value = float(rnd.randint(0, 100))
+        elif column.kind == 'bool':
+            value = rnd.random() < 0.5
+        elif column.attribute.endswith('Finish'):
+            value = finish
+        else:
+            value = start
+        fields[column.attribute] = value
+    return FakeTask(fields)
+
+
+def _outline_levels(count, rnd):
+    """Возвращает уровни структуры для count задач, идущих в порядке project.
+
+    Каждая следующая задача остается на том же уровне, уходит на уровень
+    глубже или поднимается на любой из верхних уровней.
+    """
+    levels = []
+    level = 0
+    for _ in range(count):
+        roll = rnd.random()
+        if level == 0 or (roll < 0.3 and level < MAX_OUTLINE_LEVEL):
+            level += 1
+        elif roll > 0.7:
+            level = rnd.randint(1, level)
+        levels.append(level)
+    return levels
+
+
+def make_project(count, seed=0):
+    """Создает project из count синтетических task со структурой.
+
+    У задач согласованы уровень структуры, признак суммарной задачи
+    и тип элемента КСГ (Text5).
+    """
+    rnd = random.Random(seed)
+    tasks = [make_task(i, rnd) for i in range(count)]
+    levels = _outline_levels(count, rnd)
+    for i, t in enumerate(tasks):
+        t.OutlineLevel = levels[i]
+        t.Summary = i + 1 < count and levels[i + 1] > levels[i]
+        if t.Summary:
+            t.Text5 = ELEMENT_TYPES[min(levels[i], len(ELEMENT_TYPES)) - 1]
+        else:
+            t.Text5 = LEAF_TYPES[0] if rnd.random() < 0.9 else rnd.choice(LEAF_TYPES[1:])
+    return FakeProject(tasks)
+
+
+def make_form(data_project, columns, mismatch_rate=0.05, seed=0):
+    """Создает обменную форму, соответствующую таблице задач проекта.
+
+    На вход поступает таблица задач (см. fact.fill_dataframe), список
+    столбцов ОФ (первый - ключ), доля задач, которые в ОФ должны
+    отличаться от проекта, и seed. В отличающихся задачах дата в последнем
+    столбце сдвигается на один день. Возвращает DataFrame ОФ и множество
+    индексов проекта (UniqueID) отличающихся задач.
+    """
+    rnd = random.Random(seed)
+    form = data_project[columns].copy()
+    changed = set(rnd.sample(list(form.index), round(len(form) * mismatch_rate)))
+    form.loc[sorted(changed), columns[-1]] += pd.Timedelta(days=1)
+    return form.reset_index(drop=True), changed
+
+
+def write_form(form, path):
+    """Сохраняет обменную форму в Excel так, как ее читает fact.get_excel_pd."""
+
+    schema.for_output(form).to_excel(path, index=False)
+
+
+class FakeApplication:
+    """Заменитель объекта приложения MS Project."""
+
+    def __init__(self):
+        self.ActiveProject = None
+        self.Calculation = -1
+        self.ScreenUpdating = True
+        self.opened = 0
+        self.saved = 0
+        self.closed = False
+
+    def CalculateProject(self):
+        pass
+
+    def FileSave(self):
+        self.saved += 1
+
+    def Quit(self, save=0):
+        self.closed = True
+
+
+class FakeBackend:
+    """Заменитель core.backend.ComBackend без COM.
+
+    Для каждого файла создает синтетический project из count задач.
+    Содержимое зависит только от имени файла, поэтому результат одинаков
+    в любом процессе. Если имя файла содержит "broken", открытие
+    завершается ошибкой, как у поврежденного файла, а если "hang" -
+    зависает, как MS Project с модальным окном.
+    """
+
+    def __init__(self, count=100):
+        self.count = count
+        self.started = 0
+
+    def start(self):
+        self.started += 1
+        return FakeApplication()
+
+    def open(self, msp, path):
+        if "broken" in os.path.basename(path):
+            raise Exception('Не получилось открыть файл проекта')
+        if "hang" in os.path.basename(path):
+            threading.Event().wait()
+        msp.ActiveProject = make_project(self.count, seed=zlib.crc32(os.path.basename(path).encode()))
+        msp.opened += 1
+        return msp.ActiveProject
+
+    def close_file(self, msp, save=False):
+        if save:
+            msp.FileSave()
+        msp.ActiveProject = None
+
+    def quit(self, msp):
+        msp.Quit()
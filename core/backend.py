@@ -0,0 +1,178 @@
+"""Модуль отвечает за доступ к приложению MS Project."""
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+import settings.backend as config
+import core.metrics as metrics
+
+
+class ComBackend:
+    """Работает с MS Project через COM.
+
+    Каждый вызов start запускает отдельный процесс MS Project (DispatchEx),
+    поэтому несколько обработчиков не мешают друг другу. Класс задает
+    набор операций, который нужен SessionPool; в тестах его можно заменить
+    объектом с теми же методами.
+    """
+
+    def start(self):
+        """Запускает MS Project и возвращает объект приложения."""
+
+        # pywin32 есть только в Windows и долго импортируется, поэтому импортируется при первом запуске.
+        try:
+            import pythoncom
+            import win32com.client as win32
+        except ImportError:
+            logging.error('%s: Не установлен pywin32', self.start.__name__)
+            raise Exception('Для работы с MS Project требуется pywin32')
+        pythoncom.CoInitialize()
+        msp = win32.DispatchEx("MSProject.Application")
+        msp.Visible = False
+        msp.DisplayAlerts = False
+        return msp
+
+    def process_id(self, msp):
+        """Возвращает id процесса MS Project или None, если его не удалось определить.
+
+        Окну приложения задается уникальный заголовок, по нему находится
+        окно, а по окну - процесс. Нужен, чтобы завершить зависший MS Project.
+        """
+        try:
+            import win32gui
+            import win32process
+        except ImportError:
+            return None
+        caption = f"MSProject {os.getpid()} {id(msp)}"
+        handles = []
+
+        def collect(handle, _):
+            if win32gui.GetWindowText(handle).startswith(caption):
+                handles.append(handle)
+            return True
+
+        try:
+            msp.Caption = caption
+            win32gui.EnumWindows(collect, None)
+            return win32process.GetWindowThreadProcessId(handles[0])[1] if handles else None
+        except Exception:
+            logging.warning('%s: Не удалось определить процесс MS Project', self.process_id.__name__)
+            return None
+
+    def open(self, msp, path):
+        """Открывает файл проекта и возвращает объект project."""
+
+        msp.FileOpen(os.path.abspath(path))
+        return msp.ActiveProject
+
+    def close_file(self, msp, save=False):
+        """Закрывает активный файл проекта, если он еще открыт."""
+
+        if msp.Projects.Count:
+            msp.FileClose(Save=1 if save else 0)
+
+    def quit(self, msp):
+        """Закрывает MS Project без сохранения."""
+
+        msp.Quit(0)
+
+
+class _Session:
+    """Запущенный экземпляр MS Project и число открытых в нем файлов."""
+
+    def __init__(self, msp):
+        self.msp = msp
+        self.files = 0
+
+
+class SessionPool:
+    """Пул запущенных экземпляров MS Project.
+
+    Файлы открываются через project(), который выдает свободный экземпляр
+    приложения или запускает новый. После max_files файлов или после
+    ошибки экземпляр закрывается и при следующем обращении запускается
+    заново. close() (или выход из блока with) закрывает все экземпляры.
+    """
+
+    def __init__(self, backend=None, max_files=config.MAX_FILES_PER_APPLICATION):
+        self.backend = backend if backend is not None else ComBackend()
+        self.max_files = max_files
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _checkout(self):
+        with self._lock:
+            if self._closed:
+                raise Exception('Пул MS Project уже закрыт')
+            if self._idle:
+                return self._idle.pop()
+        logging.info('%s: Запускаем MS Project', SessionPool.__name__)
+        try:
+            return _Session(self.backend.start())
+        except Exception:
+            logging.error('%s: MS Project не запустился', SessionPool.__name__)
+            raise Exception('Не получилось запустить MS Project')
+
+    def _checkin(self, session, healthy):
+        if healthy and session.files < self.max_files:
+            with self._lock:
+                if not self._closed:
+                    self._idle.append(session)
+                    return
+        self._quit(session)
+
+    def _quit(self, session):
+        logging.info('%s: Закрываем MS Project после %s файлов', SessionPool.__name__, session.files)
+        try:
+            self.backend.quit(session.msp)
+        except Exception:
+            logging.warning('%s: MS Project не закрылся', SessionPool.__name__)
+
+    @contextmanager
+    def project(self, path, save=False):
+        """Открывает файл проекта на свободном экземпляре MS Project.
+
+        На вход поступает путь до файла проекта и признак сохранения при
+        закрытии. Внутри блока with доступны объект project и объект MS Project,
+        после выхода из блока файл закрывается, а экземпляр возвращается в пул.
+        """
+        if not os.path.isabs(path):
+            logging.warning('%s: Путь до файла проекта не абсолютный', self.project.__name__)
+        logging.info('%s: Пытаемся открыть файл проекта', self.project.__name__)
+        session = self._checkout()
+        healthy = False
+        try:
+            try:
+                with metrics.stage('open_project'):
+                    project = self.backend.open(session.msp, path)
+            except Exception:
+                logging.error('%s: Файл проекта не смог открыться', self.project.__name__)
+                raise Exception('Не получилось открыть файл проекта')
+            session.files += 1
+            logging.info('%s: Файл проекта успешно открылся', self.project.__name__)
+            try:
+                yield project, session.msp
+            finally:
+                with metrics.stage('close_project'):
+                    self.backend.close_file(session.msp, save)
+            healthy = True
+        finally:
+            self._checkin(session, healthy)
+
+    def close(self):
+        """Закрывает все запущенные экземпляры MS Project."""
+
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._quit(session)
@@ -0,0 +1,217 @@
+"""Модуль отвечает за пакетную выгрузку обменных форм (в том числе в несколько процессов) и внесение факта."""
+
+import logging
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+
+import settings.backend as config
+import core.cache as cache
+import core.fact as fact
+import core.metrics as metrics
+import core.readOF as readOF
+import core.watchdog as watchdog
+from core.backend import ComBackend, SessionPool
+
+_pool = None  # Пул экземпляров MS Project, которым владеет текущий процесс.
+
+FileResult = namedtuple('FileResult', ['path', 'output', 'duration', 'metrics', 'error'], defaults=(None, None))
+FileResult.__doc__ = """Результат обработки одного файла: путь до файла проекта,
+путь до результата (None, если обработка не удалась), длительность в секундах,
+замер этапов (см. core.metrics.track, None, если замеры выключены) и причина
+неудачи, если она известна (например, превышение времени обработки)."""
+
+
+def _init_worker(backend_factory):
+    """Создает собственный пул MS Project в процессе-обработчике.
+
+    Пул закрывается при завершении процесса.
+    """
+    global _pool
+    _pool = SessionPool(backend_factory())
+    Finalize(_pool, _pool.close, exitpriority=10)
+
+
+def _cache_counts():
+    """Возвращает текущие счетчики (попадания, промахи) кэша таблиц задач процесса."""
+
+    table_cache = cache.get_cache()
+    return (table_cache.stats.hits, table_cache.stats.misses) if table_cache else (0, 0)
+
+
+def _cache_stats_since(counts):
+    """Возвращает cache.CacheStats с попаданиями и промахами кэша после снятия счетчиков counts."""
+
+    hits, misses = _cache_counts()
+    stats = cache.CacheStats()
+    stats.hits = hits - counts[0]
+    stats.misses = misses - counts[1]
+    return stats
+
+
+def _export_file(path_to_project, path_to_folder, path_to_source=None, pool=None):
+    """Выгружает ОФ одного файла проекта.
+
+    path_to_source - путь до исходного файла, если выгружается его копия
+    (см. readOF.main). Возвращает FileResult и счетчики кэша таблиц задач для этого файла.
+    """
+    counts = _cache_counts()
+    start = time.perf_counter()
+    with metrics.track(path_to_project) as record:
+        res = readOF.main(path_to_project, path_to_folder, pool if pool is not None else _pool, path_to_source)
+    duration = time.perf_counter() - start
+    return FileResult(path_to_project, res, duration, record), _cache_stats_since(counts)
+
+
+def _ignore_start(number):
+    pass
+
+
+def _failed(path, error):
+    """Возвращает FileResult для файла, обработку которого прервал сторожевой процесс."""
+
+    duration = config.FILE_TIMEOUT if isinstance(error, watchdog.FileTimeout) else None
+    logging.error('%s: Файл %s не обработан: %s', _failed.__name__, path, error)
+    return FileResult(path, None, duration, None, str(error))
+
+
+def iter_export(paths_to_projects, path_to_folder, workers=1, backend_factory=ComBackend, stats=None,
+                cancel=None, on_start=None, sources=None):
+    """Выгружает обменные формы для списка файлов проекта.
+
+    На вход поступают пути до файлов проекта, путь до папки для ОФ,
+    количество процессов, фабрика объектов для работы с MS Project
+    (см. core.backend.ComBackend, каждый процесс создает свой пул) и
+    необязательный объект cache.CacheStats, в который складываются
+    счетчики кэша таблиц задач всех процессов. Функция по одному возвращает
+    FileResult в том же порядке, в котором переданы файлы, независимо от
+    порядка их обработки.
+    При workers <= 1 выгрузка выполняется в текущем процессе.
+    Если передан объект threading.Event (cancel) и он установлен, новые
+    файлы не запускаются: обрабатываемые в этот момент файлы дописываются,
+    а файлы из очереди отменяются.
+    Если задан config.FILE_TIMEOUT, каждый файл обрабатывается в
+    процессе-обработчике под наблюдением (см. core.watchdog): файл, который
+    не обработался за это время, считается неуспешным, а обработка
+    продолжается со следующего файла.
+    Если передана функция on_start(номер файла), она вызывается, когда
+    файл передается на обработку (при workers > 1 без ограничения
+    времени - когда файл ставится в очередь пула процессов).
+    sources - пути до исходных файлов в том же порядке, если выгружаются
+    их копии (по ним readOF.main находит прошлую выгрузку проекта).
+    """
+    on_start = on_start or _ignore_start
+    paths_to_projects = list(paths_to_projects)
+    sources = list(sources) if sources is not None else [None] * len(paths_to_projects)
+    total = cache.CacheStats()
+    try:
+        if config.FILE_TIMEOUT is not None:
+            calls = watchdog.iter_calls(_export_file, [(path, path_to_folder, source)
+                                                       for path, source in zip(paths_to_projects, sources)],
+                                        workers, backend_factory, config.FILE_TIMEOUT, cancel, on_start)
+            for path, (outcome, error) in zip(paths_to_projects, calls):
+                if error is not None:
+                    yield _failed(path, error)
+                    continue
+                result, file_stats = outcome
+                total.add(file_stats)
+                yield result
+            return
+        if workers <= 1:
+            with SessionPool(backend_factory()) as pool:
+                for number, (path, source) in enumerate(zip(paths_to_projects, sources)):
+                    if cancel is not None and cancel.is_set():
+                        break
+                    on_start(number)
+                    result, file_stats = _export_file(path, path_to_folder, source, pool)
+                    total.add(file_stats)
+                    yield result
+            return
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(backend_factory,)) as executor:
+            futures = []
+            for number, (path, source) in enumerate(zip(paths_to_projects, sources)):
+                on_start(number)
+                futures.append(executor.submit(_export_file, path, path_to_folder, source))
+            for future in futures:
+                if cancel is not None and cancel.is_set():
+                    executor.shutdown(cancel_futures=True)
+                    break
+                result, file_stats = future.result()
+                total.add(file_stats)
+                yield result
+    finally:
+        logging.info('%s: Кэш таблиц задач: %s', iter_export.__name__, total)
+        if stats is not None:
+            stats.add(total)
+
+
+def _fact_file(path_to_project, path_to_excel, pool):
+    """Вносит факт из одной ОФ в файл проекта.
+
+    Возвращает FileResult и счетчики кэша таблиц задач для этого файла.
+    """
+    counts = _cache_counts()
+    start = time.perf_counter()
+    with metrics.track(path_to_project) as record:
+        success = fact.main(path_to_project, path_to_excel, pool)
+    result = FileResult(path_to_project, path_to_project if success else None, time.perf_counter() - start, record)
+    return result, _cache_stats_since(counts)
+
+
+def iter_fact(pairs, backend_factory=ComBackend, cancel=None, stats=None, on_start=None):
+    """Вносит факт из ОФ в файлы проекта по одному файлу.
+
+    На вход поступают пары (путь до ОФ, путь до файла проекта), фабрика
+    объектов для работы с MS Project, необязательный объект
+    threading.Event для отмены и необязательный объект cache.CacheStats
+    для счетчиков кэша. Функция по одному возвращает FileResult
+    в порядке пар. После отмены обработка останавливается после текущего
+    файла. Если задан config.FILE_TIMEOUT, файлы обрабатываются под
+    наблюдением, как в iter_export. on_start(номер пары) вызывается перед
+    обработкой каждой пары.
+    """
+    on_start = on_start or _ignore_start
+    pairs = list(pairs)
+    total = cache.CacheStats()
+    try:
+        if config.FILE_TIMEOUT is not None:
+            calls = watchdog.iter_calls(_fact_file, [(project, form) for form, project in pairs], 1,
+                                        backend_factory, config.FILE_TIMEOUT, cancel, on_start)
+            for (_, path_to_project), (outcome, error) in zip(pairs, calls):
+                if error is not None:
+                    yield _failed(path_to_project, error)
+                    continue
+                result, file_stats = outcome
+                total.add(file_stats)
+                yield result
+            return
+        with SessionPool(backend_factory()) as pool:
+            for number, (path_to_excel, path_to_project) in enumerate(pairs):
+                if cancel is not None and cancel.is_set():
+                    break
+                on_start(number)
+                result, file_stats = _fact_file(path_to_project, path_to_excel, pool)
+                total.add(file_stats)
+                yield result
+    finally:
+        logging.info('%s: Кэш таблиц задач: %s', iter_fact.__name__, total)
+        if stats is not None:
+            stats.add(total)
+
+
+def export(paths_to_projects, path_to_folder, workers=1, backend_factory=ComBackend, stats=None):
+    """Выгружает обменные формы и возвращает результаты и неуспешные файлы.
+
+    Первый список совпадает по порядку с переданными файлами и содержит
+    пути до ОФ (None для неуспешных), как config_for_interface.path_to_results.
+    Второй список содержит файлы проекта, ОФ для которых выгрузить не удалось.
+    """
+    results = []
+    paths_to_bad_files = []
+    for result in iter_export(paths_to_projects, path_to_folder, workers, backend_factory, stats):
+        results.append(result.output)
+        if result.output is None:
+            paths_to_bad_files.append(result.path)
+    return results, paths_to_bad_files
@@ -0,0 +1,129 @@
+"""Модуль отвечает за кэш таблиц задач, извлеченных из файлов проекта."""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import pandas as pd
+
+import settings.cache as config
+import settings.readOF as config_for_readOF
+from core.io import file_hash
+
+_cache = None  # Кэш текущего процесса.
+
+
+class CacheStats:
+    """Счетчики попаданий и промахов кэша."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, other):
+        self.hits += other.hits
+        self.misses += other.misses
+
+    def __str__(self):
+        return f"попаданий: {self.hits}, промахов: {self.misses}"
+
+
+class TableCache:
+    """Кэш таблиц задач на локальном диске.
+
+    Ключ записи - хэш содержимого файла проекта, набор столбцов
+    ОФ (config.COLUMNS) и вариант таблицы (выгрузка ОФ и внесение факта
+    строят разные таблицы). Записи хранятся в виде pickle DataFrame.
+    Если размер папки превышает max_bytes, удаляются записи, к которым
+    дольше всего не обращались.
+    """
+
+    def __init__(self, folder=config.PATH_TO_CACHE_FOLDER, max_bytes=config.CACHE_MAX_BYTES):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        os.makedirs(folder, exist_ok=True)
+
+    def key(self, path, variant):
+        """Возвращает ключ записи для файла проекта и варианта таблицы."""
+
+        columns = repr((variant, list(config_for_readOF.COLUMNS)))
+        return file_hash(path) + "_" + hashlib.sha256(columns.encode()).hexdigest()[:16]
+
+    def _path(self, key):
+        return os.path.join(self.folder, key + ".pkl")
+
+    def get(self, key):
+        """Возвращает таблицу из кэша или None, если записи нет."""
+
+        path = self._path(key)
+        try:
+            data = pd.read_pickle(path)
+        except FileNotFoundError:
+            self.stats.misses += 1
+            return None
+        except Exception:
+            logging.warning('%s: Запись кэша повреждена, удаляем', self.get.__name__)
+            self._remove(path)
+            self.stats.misses += 1
+            return None
+        os.utime(path)
+        self.stats.hits += 1
+        return data
+
+    def put(self, key, data):
+        """Сохраняет таблицу в кэш и удаляет старые записи сверх размера."""
+
+        handle, path_to_temp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        os.close(handle)
+        try:
+            data.to_pickle(path_to_temp)
+            os.replace(path_to_temp, self._path(key))
+        except Exception:
+            self._remove(path_to_temp)
+            logging.warning('%s: Не получилось сохранить таблицу в кэш', self.put.__name__)
+            return
+        self._evict()
+
+    def get_or_build(self, path, variant, build):
+        """Возвращает таблицу из кэша, а при промахе строит ее через build() и сохраняет."""
+
+        key = self.key(path, variant)
+        data = self.get(key)
+        if data is None:
+            data = build()
+            self.put(key, data)
+        return data
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".pkl"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_cache():
+    """Возвращает кэш текущего процесса или None, если кэш выключен."""
+
+    global _cache
+    if not config.USE_CACHE:
+        return None
+    if _cache is None:
+        _cache = TableCache()
+    return _cache
@@ -0,0 +1,121 @@
+"""Модуль отвечает за запуск пакетной обработки из командной строки, без окна.
+
+Примеры запуска:
+    python -m core.cli export <папка с файлами проекта> <папка для ОФ> --workers 4
+    python -m core.cli fact <папка с ОФ> <папка с файлами проекта>
+    python -m core.cli --restart export <папка с файлами проекта> <папка для ОФ>
+
+О ходе работы в stdout выводятся события в формате JSON lines (по одному
+объекту JSON в строке, поле event - тип события, см. core.runner), журнал
+выводится в stderr. Код возврата: 0 - все файлы обработаны успешно,
+1 - ни один файл не обработан или обработка прервана ошибкой,
+3 - часть файлов обработать не удалось или они остались необработанными,
+130 - обработка отменена (Ctrl+C).
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import signal
+import sys
+import threading
+
+import core.runner as runner
+import settings.interface as config
+from core.backend import ComBackend
+
+EXIT_OK = 0  # Все файлы обработаны успешно.
+EXIT_FAILURE = 1  # Ни один файл не обработан или обработка прервана ошибкой.
+EXIT_PARTIAL = 3  # Часть файлов обработать не удалось.
+EXIT_CANCELLED = 130  # Обработка отменена.
+
+
+def _event_to_json(kind, data):
+    """Преобразует событие core.runner в словарь для вывода в JSON."""
+
+    if kind == 'start':
+        return {'event': kind, 'total': data}
+    if kind == 'progress':
+        return {'event': kind, 'done': data[0], 'total': data[1]}
+    if kind == 'file':
+        return {'event': kind, 'path': data.path, 'output': data.output, 'success': data.output is not None,
+                'duration': None if data.duration is None else round(data.duration, 3)}
+    if kind == 'done':
+        return {'event': kind, 'total': len(data.results), 'succeeded': len(data.results) - len(data.bad_files),
+                'failed': len(data.bad_files), 'unfinished': data.unfinished, 'cancelled': data.cancelled,
+                'resumed': data.resumed, 'cache_hits': data.cache_stats.hits, 'cache_misses': data.cache_stats.misses}
+    return {'event': kind, 'message': str(data)}
+
+
+def _exit_code(summary):
+    if summary.cancelled:
+        return EXIT_CANCELLED
+    if not summary.bad_files and not summary.unfinished:
+        return EXIT_OK
+    if len(summary.bad_files) == len(summary.results):
+        return EXIT_FAILURE
+    return EXIT_PARTIAL
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m core.cli',
+                                     description='Пакетная выгрузка ОФ и внесение факта без окна приложения.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help='выгрузить ОФ из файлов проекта')
+    export.add_argument('input', help='папка с файлами проекта')
+    export.add_argument('output', help='папка, в которую копируются ОФ')
+    export.add_argument('--workers', type=int, default=config.WORKERS,
+                        help='количество процессов с MS Project (по умолчанию %(default)s)')
+    fact = commands.add_parser('fact', help='внести факт из ОФ в файлы проекта')
+    fact.add_argument('input', help='папка с ОФ')
+    fact.add_argument('output', help='папка с файлами проекта')
+    parser.add_argument('--restart', action='store_true',
+                        help='не продолжать прерванный пакет с теми же папками, а начать обработку заново')
+    parser.add_argument('--log-level', default='INFO', help='уровень журнала в stderr (по умолчанию %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, backend_factory=ComBackend):
+    """Запускает обработку по аргументам командной строки и возвращает код возврата.
+
+    Первое нажатие Ctrl+C отменяет обработку после текущего файла,
+    второе прерывает ее сразу. backend_factory - фабрика объектов для
+    работы с MS Project (см. core.runner).
+    """
+    args = parse_args(argv)
+    logging.basicConfig(level=args.log_level.upper(), stream=sys.stderr)
+    stream = sys.stdout
+    cancel = threading.Event()
+
+    def on_event(kind, data):
+        stream.write(json.dumps(_event_to_json(kind, data), ensure_ascii=False) + '\n')
+        stream.flush()
+
+    def on_interrupt(signum, frame):
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        cancel.set()
+        logging.warning('%s: Обработка будет остановлена после текущего файла', main.__name__)
+
+    signal.signal(signal.SIGINT, on_interrupt)
+    # Сообщения модулей, выводимые через print, не должны попадать в поток событий.
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if args.command == 'export':
+                summary = runner.run_export(args.input, args.output, args.workers, on_event, cancel,
+                                            backend_factory, not args.restart)
+            else:
+                summary = runner.run_fact(args.input, args.output, on_event, cancel, backend_factory,
+                                          not args.restart)
+        except KeyboardInterrupt:
+            on_event('error', 'Обработка прервана')
+            return EXIT_CANCELLED
+        except Exception as e:
+            logging.error('%s: Обработка прервана: %s', main.__name__, e)
+            on_event('error', e)
+            return EXIT_FAILURE
+    return _exit_code(summary)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Модуль отвечает за сравнение таблицы задач проекта с обменной формой."""
+
+import logging
+from collections import namedtuple
+
+import pandas as pd
+
+import core.schema as schema
+
+Comparison = namedtuple('Comparison', ['differences', 'only_in_form', 'only_in_project'])
+Comparison.__doc__ = """Результат сравнения ОФ и проекта.
+
+differences - DataFrame со всеми несовпадающими ячейками: ключ, номер строки
+проекта (row), имя столбца (column), значение в проекте (project) и в ОФ (form).
+only_in_form и only_in_project - строки, ключа которых нет в другой таблице.
+"""
+
+
+def _deduplicate(data, key, name):
+    duplicated = data[key].duplicated()
+    if duplicated.any():
+        logging.warning('%s: В %s повторяются ключи, используется первая строка: %s',
+                        compare_tables.__name__, name, list(data.loc[duplicated, key].unique()))
+        data = data[~duplicated]
+    return data
+
+
+def compare_tables(data_project, data_excel, key, columns, ignore_empty=True):
+    """Сравнивает таблицы проекта и ОФ по ключевому столбцу.
+
+    На вход поступают DataFrame проекта и ОФ, имя ключевого столбца и
+    список столбцов для сравнения. Таблицы соединяются по ключу одним
+    слиянием, затем каждый столбец целиком приводится к типу из схемы ОФ
+    (см. core.schema) и сравнивается. Пустые ячейки ОФ (в том числе
+    config.NA_VALUE в датах) считаются незаполненными и несоответствием
+    не являются. Если ignore_empty равен False, пустая ячейка совпадает
+    только с пустой.
+    Возвращается Comparison.
+    """
+    kinds = schema.kinds_by_header()
+    project = _deduplicate(data_project, key, 'проекте')
+    form = _deduplicate(data_excel, key, 'ОФ')
+    project = project[[key] + list(columns)].assign(row=project.index)
+    form = form[[key] + list(columns)]
+    merged = project.merge(form, on=key, how='outer', suffixes=('_project', '_form'), indicator=True)
+    both = merged[merged['_merge'] == 'both']
+
+    parts = []
+    for column in columns:
+        kind = kinds.get(column, 'text')
+        project_values = schema.comparable(both[column + '_project'], kind)
+        form_values = schema.comparable(both[column + '_form'], kind)
+        if ignore_empty:
+            differs = (form_values.notna() & (project_values != form_values)).fillna(True).astype(bool)
+        else:
+            same = (project_values == form_values).fillna(False).astype(bool)
+            differs = ~(same | (project_values.isna() & form_values.isna()))
+        if differs.any():
+            parts.append(pd.DataFrame({key: both.loc[differs, key],
+                                       'row': both.loc[differs, 'row'].astype('int64'),
+                                       'column': column,
+                                       'project': project_values[differs],
+                                       'form': form_values[differs]}))
+    if parts:
+        differences = pd.concat(parts, ignore_index=True)
+    else:
+        differences = pd.DataFrame(columns=[key, 'row', 'column', 'project', 'form'])
+    form_keys = merged.loc[merged['_merge'] == 'right_only', key]
+    project_keys = merged.loc[merged['_merge'] == 'left_only', key]
+    return Comparison(differences,
+                      data_excel[data_excel[key].isin(form_keys)],
+                      data_project[data_project[key].isin(project_keys)])
@@ -0,0 +1,103 @@
+"""Модуль отвечает за сравнение выгрузки ОФ с прошлой выгрузкой того же проекта.
+
+После каждой выгрузки таблица задач проекта сохраняется как снимок
+(SnapshotStore). При следующей выгрузке новая таблица сравнивается со
+снимком по УИД (Text4), и задачи отмечаются как измененные, добавленные
+или удаленные (см. config.DELTA_STATUSES).
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+import pandas as pd
+
+import settings.readOF as config
+import core.schema as schema
+from core.compare import compare_tables
+
+
+class SnapshotStore:
+    """Таблицы задач последних выгрузок проектов на локальном диске.
+
+    Снимок проекта хранится в виде pickle DataFrame и заменяется целиком
+    при каждой выгрузке. Снимок ищется по полному пути до файла проекта:
+    имя снимка - имя файла без расширения и хэш нормализованного пути,
+    поэтому одноименные проекты из разных папок не затирают друг друга.
+    """
+
+    def __init__(self, folder=config.PATH_TO_SNAPSHOT_FOLDER):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, path_to_project):
+        path = os.path.normcase(os.path.abspath(path_to_project))
+        digest = hashlib.sha256(path.encode('utf-8')).hexdigest()[:16]
+        name = os.path.splitext(os.path.basename(path_to_project))[0]
+        return os.path.join(self.folder, f"{name}.{digest}.pkl")
+
+    def get(self, path_to_project):
+        """Возвращает снимок проекта по пути до его файла или None, если снимка нет."""
+
+        try:
+            return pd.read_pickle(self._path(path_to_project))
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.warning('%s: Снимок проекта %s поврежден, сравнение пропускается', self.get.__name__,
+                            path_to_project)
+            return None
+
+    def put(self, path_to_project, data):
+        """Сохраняет таблицу задач как снимок проекта по пути до его файла."""
+
+        handle, path_to_temp = tempfile.mkstemp(dir=self.folder, suffix=".tmp")
+        os.close(handle)
+        try:
+            data.to_pickle(path_to_temp)
+            os.replace(path_to_temp, self._path(path_to_project))
+        finally:
+            if os.path.exists(path_to_temp):
+                os.remove(path_to_temp)
+
+
+def mark_changes(previous, current):
+    """Сравнивает таблицу задач с прошлой и отмечает изменения.
+
+    На вход поступают прошлая (или None) и текущая таблицы задач со
+    столбцами ОФ. Таблицы соединяются по УИД, все столбцы сравниваются
+    целиком (пустое значение совпадает только с пустым). Возвращаются
+    текущая таблица с двумя добавленными столбцами (вид изменения и
+    список измененных столбцов, у неизмененных задач - пустые) и таблица
+    удаленных задач из прошлой выгрузки.
+    """
+    key = schema.header('Text4')
+    status = pd.Series(None, index=current.index, dtype=object)
+    changed_columns = pd.Series(None, index=current.index, dtype=object)
+    if previous is None:
+        status[:] = config.DELTA_STATUSES['added']
+        removed = current.iloc[:0]
+    else:
+        columns = [column for column in current.columns if column != key and column in previous.columns]
+        comparison = compare_tables(current, previous, key, columns, ignore_empty=False)
+        differences = comparison.differences
+        if not differences.empty:
+            by_row = differences.groupby('row', sort=False)['column'].agg(', '.join)
+            status.loc[by_row.index] = config.DELTA_STATUSES['changed']
+            changed_columns.loc[by_row.index] = by_row
+        status.loc[comparison.only_in_project.index] = config.DELTA_STATUSES['added']
+        removed = comparison.only_in_form
+    marked = current.assign(**{config.DELTA_STATUS_COLUMN: status,
+                               config.DELTA_CHANGED_COLUMNS_COLUMN: changed_columns})
+    removed = removed.assign(**{config.DELTA_STATUS_COLUMN: config.DELTA_STATUSES['removed'],
+                                config.DELTA_CHANGED_COLUMNS_COLUMN: None})
+    return marked, removed
+
+
+def delta_form(previous, current):
+    """Возвращает компактную ОФ: измененные и добавленные задачи, затем удаленные."""
+
+    marked, removed = mark_changes(previous, current)
+    changed = marked[marked[config.DELTA_STATUS_COLUMN].notna()]
+    return pd.concat([changed, removed], ignore_index=True)
@@ -0,0 +1,110 @@
+"""Модуль отвечает за поиск входных файлов и сопоставление ОФ с файлами проекта."""
+
+import datetime
+import fnmatch
+import logging
+import os
+import re
+
+import settings.interface as config
+
+FORM_SUFFIX = re.compile(r"_ОФ_(\d{2}\.\d{2}\.\d{4})$")  # Суффикс, который readOF.main добавляет к имени ОФ.
+
+
+def _matches(name, extensions, patterns, exclude):
+    if any(fnmatch.fnmatch(name, pattern) for pattern in exclude):
+        return False
+    if extensions and os.path.splitext(name)[1].lower() not in extensions:
+        return False
+    if patterns and not any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+        return False
+    return True
+
+
+def iter_files(directory, extensions=None, patterns=None, exclude=config.EXCLUDE_PATTERNS):
+    """Лениво возвращает абсолютные пути до подходящих файлов в папке и вложенных папках.
+
+    На вход поступает путь до папки, допустимые расширения (в нижнем
+    регистре, с точкой), шаблоны имен, хотя бы одному из которых должно
+    соответствовать имя файла, и шаблоны исключаемых имен (по умолчанию
+    файлы блокировки "~$*"). Пути возвращаются по мере обхода, поэтому
+    обработку можно начинать, не дожидаясь конца обхода.
+    """
+    pending = [os.path.abspath(directory)]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = sorted(os.scandir(current), key=lambda entry: entry.name)
+        except OSError:
+            logging.warning('%s: Папка %s недоступна', iter_files.__name__, current)
+            continue
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.is_file() and _matches(entry.name, extensions, patterns, exclude):
+                yield entry.path
+        pending.extend(reversed(subdirectories))
+
+
+def name_key(path):
+    """Возвращает имя, по которому сопоставляются ОФ и файл проекта.
+
+    Это имя файла без расширения и без суффикса "_ОФ_<дата>".
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    return FORM_SUFFIX.sub("", name)
+
+
+def form_date(path):
+    """Возвращает дату из суффикса "_ОФ_<дата>" имени ОФ или None, если даты в имени нет."""
+
+    match = FORM_SUFFIX.search(os.path.splitext(os.path.basename(path))[0])
+    if match is None:
+        return None
+    try:
+        return datetime.datetime.strptime(match.group(1), "%d.%m.%Y").date()
+    except ValueError:
+        return None
+
+
+def pair_forms(paths_to_forms, paths_to_projects):
+    """Сопоставляет обменные формы с файлами проекта.
+
+    Индекс имен файлов проекта строится один раз, затем для каждой ОФ
+    возвращается пара (путь до ОФ, путь до файла проекта или None).
+    Если несколько файлов проекта имеют одинаковое имя, используется первый.
+    """
+    index = {}
+    for path in paths_to_projects:
+        key = name_key(path)
+        if key in index:
+            logging.warning('%s: Несколько файлов проекта с именем %s', pair_forms.__name__, key)
+            continue
+        index[key] = path
+    for path in paths_to_forms:
+        yield path, index.get(name_key(path))
+
+
+def latest_forms(paths_to_forms, paths_to_projects):
+    """Возвращает словарь: путь до файла проекта -> путь до его последней ОФ.
+
+    ОФ сопоставляются с файлами проекта так же, как в pair_forms, ОФ без
+    парного файла проекта пропускаются. Если у проекта несколько ОФ,
+    выбирается ОФ с самой поздней датой в имени (ОФ без даты считаются
+    самыми ранними, при равных датах берется первая), а остальные
+    записываются в журнал как пропущенные.
+    """
+    forms = {}
+    for path_to_form, path_to_project in pair_forms(paths_to_forms, paths_to_projects):
+        if path_to_project is not None:
+            forms.setdefault(path_to_project, []).append(path_to_form)
+    latest = {}
+    for path_to_project, candidates in forms.items():
+        latest[path_to_project] = max(candidates, key=lambda path: form_date(path) or datetime.date.min)
+        skipped = [path for path in candidates if path != latest[path_to_project]]
+        if skipped:
+            logging.warning('%s: Для проекта %s используется ОФ %s, пропущены: %s', latest_forms.__name__,
+                            os.path.basename(path_to_project), os.path.basename(latest[path_to_project]),
+                            ', '.join(os.path.basename(path) for path in skipped))
+    return latest
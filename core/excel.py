@@ -0,0 +1,268 @@
+"""Модуль отвечает за запись обменной формы в Excel и быстрое чтение ее столбцов."""
+
+import datetime
+import itertools
+import logging
+import math
+import pickle
+import posixpath
+import tempfile
+import zipfile
+from xml.etree import ElementTree
+
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import numbers
+from openpyxl.utils import column_index_from_string, get_column_letter
+
+import core.styles as styles
+
+DEFAULT_COLUMN_WIDTH = 13  # Ширина столбца, которую openpyxl задает по умолчанию.
+SPOOL_CHUNK_ROWS = 1000  # Количество строк, которое сбрасывается во временный файл за раз при потоковой записи.
+EXCEL_EPOCH = pd.Timestamp(1899, 12, 30)  # Нулевой день дат Excel (система дат 1900).
+EXCEL_EPOCH_1904 = pd.Timestamp(1904, 1, 1)  # Нулевой день дат Excel (система дат 1904).
+
+_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'  # Пространство имен листа Excel.
+_RELATIONSHIPS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'  # Пространство имен связей.
+_PACKAGE_RELATIONSHIPS = '{http://schemas.openxmlformats.org/package/2006/relationships}'  # Связи внутри книги.
+
+
+def _cell_value(value):
+    """Приводит значение DataFrame к значению ячейки Excel (NaN - пустая ячейка)."""
+
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def _update_widths(widths, values, style_index, element_types):
+    """Расширяет столбцы под значения строки, если у строки есть стиль."""
+
+    if values[style_index] not in element_types:
+        return
+    for column_number, value in enumerate(values, start=1):
+        text_length = len(str(value))
+        if text_length > widths.get(column_number, DEFAULT_COLUMN_WIDTH):
+            widths[column_number] = text_length
+
+
+def _save(rows, path_to_excel, sheet_name, style_index, widths):
+    """Записывает строки в книгу в режиме write_only и сохраняет ее.
+
+    Ширины столбцов задаются до записи строк, каждая строка сразу
+    записывается со своим стилем, даты получают формат даты. Книга
+    целиком в памяти не хранится.
+    """
+    workbook = openpyxl.Workbook(write_only=True)
+    style_names = styles.register_styles(workbook)
+    worksheet = workbook.create_sheet(sheet_name)
+    for column_number, width in sorted(widths.items()):
+        worksheet.column_dimensions[get_column_letter(column_number)].width = width
+    for values in rows:
+        style = style_names.get(values[style_index])
+        cells = []
+        for value in values:
+            is_date = isinstance(value, datetime.date)
+            if style is None and not is_date:
+                cells.append(value)
+                continue
+            cell = WriteOnlyCell(worksheet, value=value)
+            if style is not None:
+                cell.style = style
+            if is_date:
+                cell.number_format = numbers.FORMAT_DATE_YYYYMMDD2
+            cells.append(cell)
+        worksheet.append(cells)
+    workbook.save(path_to_excel)
+
+
+def write_form(data, path_to_excel, sheet_name, style_column):
+    """Записывает обменную форму в Excel.
+
+    На вход поступает DataFrame, путь до Excel, имя листа и имя столбца,
+    по значению которого выбирается стиль строки. Ширина столбцов
+    подбирается по строкам со стилем, затем каждая строка (включая
+    заголовок) записывается со своим стилем, даты получают формат даты.
+    Файл сохраняется один раз, повторно не открывается.
+    """
+    style_index = data.columns.get_loc(style_column)
+    element_types = styles.get_styles()
+
+    def rows():
+        values = itertools.chain([tuple(data.columns)], data.itertuples(index=False, name=None))
+        return (tuple(_cell_value(value) for value in row) for row in values)
+
+    widths = {}
+    for values in rows():
+        _update_widths(widths, values, style_index, element_types)
+    _save(rows(), path_to_excel, sheet_name, style_index, widths)
+
+
+def _read_spool(spool):
+    spool.seek(0)
+    while True:
+        try:
+            chunk = pickle.load(spool)
+        except EOFError:
+            return
+        yield from chunk
+
+
+def write_form_stream(rows, headers, path_to_excel, sheet_name, style_column):
+    """Записывает обменную форму в Excel из потока строк.
+
+    На вход поступают строки (итерируемый объект кортежей значений
+    в порядке headers, уже в том виде, в каком они записываются в ОФ),
+    имена столбцов, путь до Excel, имя листа и имя столбца, по значению
+    которого выбирается стиль строки. Строки по мере чтения сбрасываются во
+    временный файл, одновременно подбирается ширина столбцов, затем файл
+    читается и записывается в Excel так же, как в write_form. В памяти
+    одновременно находится не больше SPOOL_CHUNK_ROWS строк. Возвращает
+    количество записанных строк без заголовка.
+    """
+    headers = tuple(headers)
+    style_index = headers.index(style_column)
+    element_types = styles.get_styles()
+    widths = {}
+    _update_widths(widths, headers, style_index, element_types)
+    count = 0
+    with tempfile.TemporaryFile() as spool:
+        chunk = []
+        for values in rows:
+            _update_widths(widths, values, style_index, element_types)
+            chunk.append(values)
+            if len(chunk) == SPOOL_CHUNK_ROWS:
+                pickle.dump(chunk, spool, pickle.HIGHEST_PROTOCOL)
+                count += len(chunk)
+                chunk = []
+        pickle.dump(chunk, spool, pickle.HIGHEST_PROTOCOL)
+        count += len(chunk)
+        _save(itertools.chain([headers], _read_spool(spool)), path_to_excel, sheet_name, style_index, widths)
+    return count
+
+
+def _first_sheet(archive):
+    """Возвращает путь до первого листа внутри книги и признак системы дат 1904."""
+
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    properties = workbook.find(f'{_MAIN}workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+    sheet = workbook.find(f'{_MAIN}sheets/{_MAIN}sheet')
+    relation_id = sheet.get(f'{_RELATIONSHIPS}id')
+    relations = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    for relation in relations.iter(f'{_PACKAGE_RELATIONSHIPS}Relationship'):
+        if relation.get('Id') == relation_id:
+            target = relation.get('Target')
+            path = target.lstrip('/') if target.startswith('/') else posixpath.join('xl', target)
+            return posixpath.normpath(path), date1904
+    logging.error('%s: В книге не найден первый лист', _first_sheet.__name__)
+    raise Exception('В книге не найден первый лист')
+
+
+def _shared_strings(archive):
+    try:
+        source = archive.open('xl/sharedStrings.xml')
+    except KeyError:
+        return []
+    strings = []
+    with source:
+        for _, element in ElementTree.iterparse(source):
+            if element.tag == f'{_MAIN}si':
+                strings.append(''.join(text.text or '' for text in element.iter(f'{_MAIN}t')))
+                element.clear()
+    return strings
+
+
+def _cell_text(cell, strings):
+    """Возвращает значение ячейки листа: строку, число, признак или None."""
+
+    cell_type = cell.get('t', 'n')
+    if cell_type == 'inlineStr':
+        inline = cell.find(f'{_MAIN}is')
+        return None if inline is None else ''.join(text.text or '' for text in inline.iter(f'{_MAIN}t'))
+    value = cell.findtext(f'{_MAIN}v')
+    if value is None:
+        return None
+    if cell_type == 's':
+        return strings[int(value)]
+    if cell_type == 'n':
+        return float(value) if any(symbol in value for symbol in '.eE') else int(value)
+    if cell_type == 'b':
+        return value == '1'
+    if cell_type == 'e':
+        return None
+    return value
+
+
+def _serial_dates(values, epoch):
+    """Переводит номера дней Excel в даты, остальные значения не меняет."""
+
+    series = pd.Series(values, dtype=object)
+    serials = pd.to_numeric(series, errors='coerce')
+    numeric = serials.notna() & series.map(lambda value: not isinstance(value, bool))
+    if not numeric.any():
+        return series
+    # Excel хранит время как долю дня, поэтому оно округляется до миллисекунд.
+    dates = epoch + pd.to_timedelta(serials[numeric], unit='D').dt.round('ms')
+    return series.where(~numeric, dates.astype(object))
+
+
+def _check_headers(headers, found):
+    """Проверяет, что в заголовке листа есть все столбцы headers."""
+
+    missing = ', '.join(str(header) for header in headers if header not in found)
+    if missing:
+        logging.error('%s: В ОФ нет столбцов %s', read_columns.__name__, missing)
+        raise Exception(f'В ОФ нет столбцов: {missing}')
+
+
+def read_columns(path_to_excel, headers, date_headers=()):
+    """Читает из первого листа книги только заданные столбцы.
+
+    Лист разбирается потоково прямо из xlsx (без построения книги
+    openpyxl), первая строка - заголовок, значения остальных ячеек
+    сохраняются только для столбцов headers. Полностью пустые строки
+    пропускаются. Числа в столбцах date_headers считаются датами Excel и
+    переводятся в Timestamp. Возвращает словарь: имя столбца -> Series.
+    Если какого-то столбца в листе нет, выбрасывается исключение.
+    """
+    headers = list(headers)
+    with zipfile.ZipFile(path_to_excel) as archive:
+        sheet_path, date1904 = _first_sheet(archive)
+        strings = _shared_strings(archive)
+        positions = None
+        buffers = [[] for _ in headers]
+        with archive.open(sheet_path) as source:
+            for _, element in ElementTree.iterparse(source):
+                if element.tag != f'{_MAIN}row':
+                    continue
+                values = {}
+                number = 0
+                for cell in element.iter(f'{_MAIN}c'):
+                    reference = cell.get('r')
+                    if reference:
+                        number = column_index_from_string(reference.rstrip('0123456789'))
+                    else:
+                        number += 1
+                    if positions is None or number in positions:
+                        values[number] = _cell_text(cell, strings)
+                element.clear()
+                if positions is None:
+                    found = {}
+                    for column_number, value in values.items():
+                        found.setdefault(value, column_number)
+                    _check_headers(headers, found)
+                    indexes = [found[header] for header in headers]
+                    positions = set(indexes)
+                    continue
+                row = [values.get(index) for index in indexes]
+                if all(value is None for value in row):
+                    continue
+                for buffer, value in zip(buffers, row):
+                    buffer.append(value)
+    if positions is None:
+        _check_headers(headers, {})
+    epoch = EXCEL_EPOCH_1904 if date1904 else EXCEL_EPOCH
+    return {header: _serial_dates(buffer, epoch) if header in date_headers else pd.Series(buffer, dtype=object)
+            for header, buffer in zip(headers, buffers)}
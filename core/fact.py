@@ -3,92 +3,78 @@
 import datetime
 import logging
 import os
-import time
 
+import numpy as np
 import pandas as pd
-import pythoncom
-import win32com.client as win32
 
 import settings.readOF as config
+import core.cache as cache
+import core.excel as excel
+import core.metrics as metrics
+import core.schema as schema
+from core.backend import SessionPool
+from core.compare import compare_tables
+from core.table import build_task_table
 
+PJ_MANUAL = 0  # Значение Application.Calculation для ручного пересчета (pjManual).
+CACHE_VARIANT = "fact"  # Вариант таблицы задач в кэше.
+FORM_CACHE_VARIANT = "form"  # Вариант прочитанной ОФ в кэше.
 
-def get_excel_pd(path):
-    """Создает DataFrame из обменной формы"""
+
+def _read_form_columns(path, columns):
+    """Читает из ОФ только заданные столбцы и приводит их к типам схемы ОФ."""
+
+    kinds = schema.kinds_by_header()
+    values = excel.read_columns(path, columns, [column for column in columns if kinds.get(column) == 'date'])
+    return schema.normalize_frame(pd.DataFrame(values, columns=columns))
+
+
+def get_excel_pd(path, columns=None):
+    """Создает DataFrame из обменной формы
+
+    Если передан список столбцов, из ОФ читаются только они, а результат
+    кэшируется по содержимому файла, так что неизмененная ОФ повторно
+    не читается. Иначе ОФ читается целиком. Столбцы из схемы ОФ
+    приводятся к своим типам (см. core.schema).
+    """
 
     if not os.path.isabs(path):
         logging.warning('%s: Путь до ОФ не абсолютный', get_excel_pd.__name__)
     logging.info('%s: Пытаемся записать ОФ в DataFrame', get_excel_pd.__name__)
     try:
-        data = pd.read_excel(path)
+        if columns is None:
+            data = schema.normalize_frame(pd.read_excel(path))
+        else:
+            table_cache = cache.get_cache()
+            if table_cache is None:
+                data = _read_form_columns(path, columns)
+            else:
+                data = table_cache.get_or_build(path, f"{FORM_CACHE_VARIANT} {columns}",
+                                                lambda: _read_form_columns(path, columns))
     except Exception:
-        logging.error('%s: Не получилось записать ОФ в DataFrame', get_project.__name__)
+        logging.error('%s: Не получилось записать ОФ в DataFrame', get_excel_pd.__name__)
         raise Exception('Не получилось записать ОФ в DataFrame')
     logging.info('%s: ОФ успешно записалась в DataFrame', get_excel_pd.__name__)
     return data
 
-def get_project(path):
-    """Открывает файл проекта и возвращает объект проекта.
-
-    На вход поступает путь до файла проекта.
-    На выход объект project и MS Project.
-    """
-    if not os.path.isabs(path):
-        logging.warning('%s: Путь до файла проекта не абсолютный', get_project.__name__)
-    logging.info('%s: Пытаемся открыть файл проекта', get_project.__name__)
-    try:
-        msp = win32.Dispatch("MSProject.Application", pythoncom.CoInitialize())
-        _abs_path = os.path.abspath(path)
-        print(_abs_path)
-        msp.FileOpen(_abs_path)
-        project = msp.ActiveProject
-    except Exception:
-        logging.error('%s: Файл проекта не смог открыться', get_project.__name__)
-        raise Exception('Не получилось открыть файл проекта')
-    logging.info('%s: Файл проекта успешно открылся', get_project.__name__)
-    return project, msp
-
-
-def _get_data_task(t):
-    """"Получает значения task из нужных столбцов
-
-    На вход поступает объект Task из project. Из него достаются
-    требуемые данные, ими заполняется список, который возвращается
-    для дальнейшего использования.
-    """
-    arr = []
-    try:
-        for i in config.ID_COLUMN.keys():
-            data = getattr(t,i)
-            if isinstance(data, datetime.datetime):
-                data = datetime.datetime.date(data)
-            arr.append(data)
-    except Exception as e:
-        print(e)
-        logging.error('%s: Неверный идентификатор столбца project', _get_data_task.__name__)
-        raise Exception('Неверный идентификатор столбца project')
-    return arr
-
 
 def fill_dataframe(project):
     """Заполняет DataFrame значениями из project
 
     На вход поступают объект project. Формируется dataframe
     с данными из требуемых столбцов и возвращается
-    для дальнейшего использования.
+    для дальнейшего использования. Индекс dataframe - UniqueID задач.
     """
     logging.info('%s: Создаем DataFrame из столбцов объекта проекта', fill_dataframe.__name__)
     if not project:
         logging.error('%s: Не удалось получить объект проекта', fill_dataframe.__name__)
         raise Exception("Объект проекта пустой")
-    if not config.ID_COLUMN:
+    if not config.COLUMNS:
         logging.error('%s: Ключевые столбцы не заданы', fill_dataframe.__name__)
         raise Exception("Ключевые столбцы не заданы")
     task_collection = project.Tasks
-    data = pd.DataFrame(columns=config.ID_COLUMN.values())
-    start = time.time()
     try:
-        for t in task_collection:
-            data.loc[len(data.index)] = _get_data_task(t)
+        data = build_task_table(task_collection, strict=True, index='UniqueID', count_as='com_calls')
     except Exception:
         logging.error('%s: Неверно заполнен словарь столбцов и их идентификаторов', fill_dataframe.__name__)
         raise Exception("Ошибка в словаре слобцов и их идентификаторов")
@@ -96,31 +82,15 @@ def fill_dataframe(project):
 
     return data
 
-def _check_str(excel_str, project_str, columns):
-    """Сравнивает значения task ОФ и проекта
-
-    На вход поступает строка из Dataframe, полученного из excel и строка
-    из Dataframe, полученного из project, а также колонки для сравнения.
-    Функция сравнивает ячейки в переданных столбцах по очереди и возвращает
-    False и название столбца, в котором найдено несоответствие или
-    True и None, если несоответствий нет
-    """
-    for col in columns:
-        if not pd.isnull(excel_str[col]) and excel_str[col] != 'НД':
-            excel_str[col] = datetime.datetime.date(excel_str[col])
-        if excel_str[col] != project_str[col]:
-            return False, col
-    return True, None
-
 
 def check_form(data_project, data_excel, columns):
     """Находит несоответствия между обменной формой и проектом и сохраняет их в словарь
 
-    На вход поступает 2 объекта Dataframe и список столбцов,
-    по которым будем происходить сравнение. Функция находит несоответствия
-    и заполняет словарь в котором хранится имя столбца, где найдено
-    несоответствие, и значение из обменной формы. В качестве ключа индекс
-    строки, в которой найдено несоответствие.
+    На вход поступает 2 объекта Dataframe и список столбцов, первый из
+    которых ключевой (УИД), а остальные сравниваются. Таблицы соединяются
+    по ключу, и сравниваются все столбцы сразу. Функция заполняет словарь,
+    в котором ключ - индекс строки проекта (UniqueID задачи, см. fill_dataframe),
+    а значение - словарь из имен несовпавших столбцов и значений из обменной формы.
     """
     logging.info('%s: Ищем несоответсвия между ОФ и проектом', check_form.__name__)
     if data_project.empty:
@@ -129,61 +99,115 @@ def check_form(data_project, data_excel, columns):
     if data_excel.empty:
         logging.error('%s: DataFrame ОФ пустой', check_form.__name__)
         raise Exception('DataFrame ОФ пустой')
+    comparison = compare_tables(data_project, data_excel, columns[0], columns[1:])
+    if not comparison.only_in_form.empty:
+        logging.warning('%s: Задач из ОФ нет в проекте: %s', check_form.__name__, len(comparison.only_in_form))
+    if not comparison.only_in_project.empty:
+        logging.info('%s: Задач проекта нет в ОФ: %s', check_form.__name__, len(comparison.only_in_project))
     changes = {}
-    for i, excel_str in data_excel.iterrows():
-        for j, project_str in data_project.iterrows():
-            if excel_str[columns[0]] == project_str[columns[0]]:
-                status, column = _check_str(excel_str, project_str, columns[1:])
-                if not status:
-                    changes[j] = [column, excel_str[column]]
-                break
+    differences = comparison.differences
+    for row, column, value in zip(differences['row'], differences['column'], differences['form']):
+        changes.setdefault(int(row), {})[column] = value
     logging.info('%s: Поиск несоответсвия между ОФ и проектом окончен', check_form.__name__)
     return changes
 
+
+def _to_com_value(value):
+    """Приводит значение из ОФ к типу, который принимает COM."""
+
+    if isinstance(value, np.generic):
+        value = value.item()
+    #pywintypes.datetime и datetime.date
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    return value
+
+
 def change_project(project, msp, changes):
     """Вносит изменения в проект.
 
-    На вход поступает объект project и объект приложения MS Project,
-    а также словарь изменений. Функция проходит по project построчно и
-    ищет индексы, которые совпадают со значениями ключей. Затем
-    вносит изменения в соответствующий столбец соответствующей строки
-    project.
+    На вход поступает объект project, объект приложения MS Project и
+    словарь изменений, в котором ключ - UniqueID задачи, а значение -
+    словарь из имен столбцов и новых значений (см. check_form). Задачи
+    находятся напрямую по UniqueID, записываются только переданные поля.
+    На время записи пересчет и обновление экрана MS Project отключаются,
+    проект пересчитывается и сохраняется один раз в конце.
     """
     if not project:
         logging.info('%s: Объект проекта пустой', change_project.__name__)
         raise Exception('Объект проекта пустой')
-    task_collection = project.Tasks
     if not changes:
         logging.info('%s: Изменений в проекте нет', change_project.__name__)
-    else:
-        logging.info('%s: Применяем изменения', change_project.__name__)
+        return
+    logging.info('%s: Применяем изменения в %s задачах', change_project.__name__, len(changes))
+    attributes = schema.attributes_by_header()
+    task_collection = project.Tasks
+    calculation = screen_updating = None
+    try:
+        calculation = msp.Calculation
+        screen_updating = msp.ScreenUpdating
+        msp.Calculation = PJ_MANUAL
+        msp.ScreenUpdating = False
+        for uid, values in changes.items():
+            t = task_collection.UniqueID(uid)
+            for column, value in values.items():
+                setattr(t, attributes[column], _to_com_value(value))
+            metrics.count('com_calls', len(values) + 1)
+        msp.CalculateProject()
+        msp.FileSave()
+    except Exception:
+        logging.error('%s: Не получилось применить изменения', change_project.__name__)
+        raise Exception('Не получилось применить изменения')
+    finally:
         try:
-            for i, t in enumerate(task_collection):
-                if i in changes.keys():
-                    #Не получается присвоить значение в t.ActualStart.
-                    #t.ActualStart = t.ActualStart.replace(day=changes[i][1])
-                    #pywintypes.datetime и datetime.date
-                    new_date = datetime.datetime(changes[i][1].year, changes[i][1].month, changes[i][1].day)
-                    t.ActualStart = new_date
-                    print(t.Active)
-                    t.Name = t.Name.replace('п', '1')
-            msp.FileSave()
-        except Exception as e:
-            logging.error('%s: Не получилось применить изменения', change_project.__name__)
-            raise Exception('Не получилось применить изменения')
-        logging.info('%s: Изменения успешно применены', change_project.__name__)
-
-
-def main(path_to_project, path_to_excel):
-    """Управляющая функция"""
-
+            if calculation is not None:
+                msp.Calculation = calculation
+            if screen_updating is not None:
+                msp.ScreenUpdating = screen_updating
+        except Exception:
+            logging.error('%s: Не получилось восстановить пересчет и обновление экрана', change_project.__name__)
+    logging.info('%s: Изменения успешно применены', change_project.__name__)
+
+
+def main(path_to_project, path_to_excel, pool=None):
+    """Управляющая функция
+
+    На вход поступает путь до файла project, до ОФ и необязательный пул
+    экземпляров MS Project. Если пул не передан, MS Project запускается
+    только для этого файла. Если таблица задач неизмененного файла есть
+    в кэше, сравнение выполняется по ней, и файл проекта открывается только
+    при наличии изменений. Возвращает True, если факт внесен успешно.
+    """
+    if pool is None:
+        with SessionPool(max_files=1) as pool:
+            return main(path_to_project, path_to_excel, pool)
     try:
-        excel_df = get_excel_pd(path_to_excel)
-        project, msp = get_project(path_to_project)
-        project_df = fill_dataframe(project)
-        results = check_form(project_df, excel_df, "УИД_(П)")
-        change_project(project, msp, results)
+        columns = [schema.header(attribute) for attribute in config.FACT_ID_COLUMNS]
+        with metrics.stage('read_form'):
+            excel_df = get_excel_pd(path_to_excel, columns)
+        table_cache = cache.get_cache()
+        key = table_cache.key(path_to_project, CACHE_VARIANT) if table_cache else None
+        project_df = table_cache.get(key) if table_cache else None
+        results = None
+        if project_df is not None:
+            with metrics.stage('check_form'):
+                results = check_form(project_df, excel_df, columns)
+            if not results:
+                logging.info('%s: Изменений в проекте нет', main.__name__)
+                return True
+        with pool.project(path_to_project) as (project, msp):
+            if project_df is None:
+                with metrics.stage('fill_dataframe'):
+                    project_df = fill_dataframe(project)
+                with metrics.stage('check_form'):
+                    results = check_form(project_df, excel_df, columns)
+                if table_cache and not results:
+                    table_cache.put(key, project_df)
+            metrics.count('tasks', len(project_df))
+            metrics.count('changed_tasks', len(results))
+            with metrics.stage('change_project'):
+                change_project(project, msp, results)
     except Exception as e:
-        print("smth bad")
-
-
+        logging.error('%s: Не удалось внести факт в %s: %s', main.__name__, path_to_project, e)
+        return False
+    return True
@@ -0,0 +1,184 @@
+"""Модуль отвечает за структуру задач проекта и свертку полей суммарных задач.
+
+Структура строится один раз по уровням (OutlineLevel) задач в порядке
+project: для каждой задачи в массивах хранятся номер родителя, конец
+поддерева и признак листа. Поля суммарных задач (config.ROLLUPS)
+вычисляются из листовых задач их поддерева целыми массивами, без обхода
+задач по одной, поэтому их не нужно читать из MS Project.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+import settings.readOF as config
+import core.schema as schema
+
+AGGREGATIONS = ('min', 'max', 'max_complete', 'sum', 'weighted_mean')  # Допустимые способы свертки.
+DURATION_ATTRIBUTES = ('Start', 'Finish')  # Поля, по которым считается вес задачи для weighted_mean.
+
+
+class Hierarchy:
+    """Структура задач проекта в виде массивов.
+
+    Задачи нумеруются по порядку в project с нуля. parent[i] - номер
+    родителя (-1 у задач верхнего уровня), поддерево задачи i - задачи
+    с номерами от i до end[i] (не включая end[i]), is_leaf[i] - признак
+    задачи без подзадач. Родитель задачи - ближайшая предыдущая задача
+    с меньшим уровнем структуры.
+    """
+
+    def __init__(self, levels):
+        self.level = np.asarray(levels, dtype=np.int64)
+        count = len(self.level)
+        numbers = np.arange(count)
+        self.parent = np.full(count, -1, dtype=np.int64)
+        self.end = np.full(count, count, dtype=np.int64)
+        # Для каждого уровня массивы ближайших задач этого уровня до и после каждой задачи;
+        # уровней немного, поэтому проходов по массиву тоже немного.
+        for level in np.unique(self.level):
+            at_level = self.level == level
+            last = np.maximum.accumulate(np.where(at_level, numbers, -1))
+            before = np.concatenate(([-1], last[:-1]))
+            deeper = self.level > level
+            self.parent[deeper] = np.maximum(self.parent[deeper], before[deeper])
+            following = np.minimum.accumulate(np.where(at_level, numbers, count)[::-1])[::-1]
+            after = np.concatenate((following[1:], [count]))
+            not_deeper = self.level >= level
+            self.end[not_deeper] = np.minimum(self.end[not_deeper], after[not_deeper])
+        self.is_leaf = self.end == numbers + 1
+        self._children_order = np.argsort(self.parent, kind='stable')
+        self._children_start = np.searchsorted(self.parent[self._children_order], np.arange(-1, count + 1))
+
+    @classmethod
+    def from_table(cls, data):
+        """Строит структуру по столбцу уровня структуры таблицы задач."""
+
+        levels = pd.to_numeric(data[schema.header('OutlineLevel')], errors='coerce')
+        if levels.isna().any():
+            logging.error('%s: Уровень структуры заполнен не у всех задач', cls.from_table.__name__)
+            raise Exception('Уровень структуры заполнен не у всех задач')
+        return cls(levels.to_numpy())
+
+    def __len__(self):
+        return len(self.level)
+
+    def children(self, number):
+        """Возвращает номера подзадач задачи number (для -1 - задачи верхнего уровня)."""
+
+        return self._children_order[self._children_start[number + 1]:self._children_start[number + 2]]
+
+    def subtree(self, number):
+        """Возвращает срез номеров задач поддерева задачи number, включая ее саму."""
+
+        return slice(number, self.end[number])
+
+    def reduce(self, values, how, weights=None):
+        """Сворачивает значения листовых задач в их суммарные задачи.
+
+        На вход поступает массив значений по задачам (float, NaN - пусто),
+        способ свертки из AGGREGATIONS и веса задач для weighted_mean.
+        Значения суммарных задач вычисляются только из листьев их поддерева,
+        пустые значения листьев не учитываются (в max_complete пустой лист
+        делает пустым результат). Возвращается новый массив, значения
+        листьев не меняются.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if how in ('min', 'max'):
+            result = self._propagate(values, np.fmin if how == 'min' else np.fmax, np.nan)
+        elif how == 'max_complete':
+            result = self._propagate(values, np.fmax, np.nan)
+            empty = self._propagate(np.isnan(values).astype(np.float64), np.add, 0.0)
+            result[(empty > 0) & ~self.is_leaf] = np.nan
+        elif how == 'sum':
+            result = self._propagate(np.nan_to_num(values), np.add, 0.0)
+        elif how == 'weighted_mean':
+            weights = np.ones_like(values) if weights is None else np.asarray(weights, dtype=np.float64)
+            weights = np.where(np.isnan(values), 0.0, weights)
+            total = self._propagate(np.nan_to_num(values) * weights, np.add, 0.0)
+            weight = self._propagate(weights, np.add, 0.0)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(weight > 0, total / weight, np.nan)
+        else:
+            logging.error('%s: Неизвестный способ свертки %s', self.reduce.__name__, how)
+            raise Exception(f'Неизвестный способ свертки: {how}')
+        result[self.is_leaf] = values[self.is_leaf]
+        return result
+
+    def _propagate(self, values, ufunc, identity):
+        """Накапливает значения листьев в предках снизу вверх, по одному уровню за проход."""
+
+        result = np.where(self.is_leaf, values, identity)
+        for level in np.unique(self.level)[::-1]:
+            numbers = np.flatnonzero((self.level == level) & (self.parent >= 0))
+            ufunc.at(result, self.parent[numbers], result[numbers])
+        return result
+
+
+def _as_days(series):
+    """Переводит даты в число дней от 1970-01-01 (NaT - NaN)."""
+
+    dates = series if pd.api.types.is_datetime64_any_dtype(series) else pd.to_datetime(series, errors='coerce')
+    return ((dates - pd.Timestamp(0)) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def _weights(data):
+    """Возвращает вес каждой задачи для weighted_mean - длительность в днях, не меньше одного дня."""
+
+    try:
+        start, finish = (_as_days(data[schema.header(attribute)]) for attribute in DURATION_ATTRIBUTES)
+    except Exception:
+        return None
+    return np.nan_to_num(np.maximum(finish - start + 1, 1), nan=1.0)
+
+
+def rollup(data, rollups=None, hierarchy=None):
+    """Заполняет поля суммарных задач таблицы задач сверткой листовых задач.
+
+    На вход поступает таблица задач со столбцами ОФ в порядке project,
+    словарь поле task -> способ свертки (по умолчанию config.ROLLUPS) и
+    необязательная готовая структура задач. Поля, которых нет в таблице,
+    пропускаются. Возвращается новый DataFrame, строки листовых задач
+    и типы столбцов не меняются (если значения свертки помещаются в тип).
+    """
+    if rollups is None:
+        rollups = config.ROLLUPS
+    if hierarchy is None:
+        hierarchy = Hierarchy.from_table(data)
+    if hierarchy.is_leaf.all():
+        return data
+    kinds = schema.kinds_by_header()
+    weights = _weights(data)
+    data = data.copy(deep=False)
+    for attribute, how in rollups.items():
+        for column in schema.get_columns():
+            if column.attribute != attribute or column.header not in data.columns:
+                continue
+            series = data[column.header]
+            if series.dtype == object and kinds[column.header] != 'text':
+                # Столбец с ошибками чтения не приведен к типу (см. table.build_task_table).
+                logging.warning('%s: Столбец %s не сворачивается', rollup.__name__, column.header)
+                continue
+            if kinds[column.header] == 'date':
+                days = hierarchy.reduce(_as_days(series), how, weights)
+                values = pd.Series(pd.Timestamp(0) + pd.to_timedelta(days, unit='D'), index=data.index)
+                if pd.api.types.is_datetime64_any_dtype(series):
+                    values = values.astype(series.dtype)
+            else:
+                numbers = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+                values = pd.Series(hierarchy.reduce(numbers, how, weights), index=data.index)
+            data[column.header] = _keep_dtype(schema.normalize_column(values, kinds[column.header]), series.dtype)
+    return data
+
+
+def _keep_dtype(values, dtype):
+    """Приводит числовой столбец свертки к исходному типу столбца, если значения в него помещаются."""
+
+    if values.dtype == dtype or not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype):
+        return values
+    try:
+        converted = values.astype(dtype)
+    except (TypeError, ValueError, OverflowError):
+        return values
+    return converted if converted.astype('float64').equals(values.astype('float64')) else values
@@ -1,7 +1,18 @@
 """Модуль отвечает за проверки доступности папок и копирование данных."""
 
+import hashlib
+import json
+import logging
 import os
 import shutil
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import settings.io as config
+
+HASH_CHUNK_SIZE = 1024 * 1024  # Размер блока, которым читается файл при подсчете хэша.
 
 
 def check_folder_writable(folder_path):
@@ -19,6 +30,46 @@ def check_folder_readable(file_paths):
     return True
 
 
+def file_hash(file_path):
+    """Возвращает хэш содержимого файла (sha256 в шестнадцатеричном виде)."""
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _make_read_only(file_path):
+    """Снимает с файла права на запись."""
+
+    mode = os.stat(file_path).st_mode
+    os.chmod(file_path, mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def _remove_file(file_path):
+    """Удаляет файл, в том числе доступный только для чтения (в Windows его иначе не удалить)."""
+
+    try:
+        os.remove(file_path)
+    except PermissionError:
+        os.chmod(file_path, stat.S_IWRITE | stat.S_IREAD)
+        os.remove(file_path)
+
+
+def _remove_read_only(function, path, _):
+    """Обработчик ошибок shutil.rmtree: повторяет удаление после снятия атрибута "только чтение".
+
+    Файлы, которые все равно не удалось удалить (например, занятые другим
+    процессом), пропускаются.
+    """
+    try:
+        os.chmod(path, stat.S_IWRITE | stat.S_IREAD)
+        function(path)
+    except OSError:
+        logging.warning('%s: Не удалось удалить %s', _remove_read_only.__name__, path)
+
+
 def transfer_files(file_paths, destination_folder):
     """Копирует файлы из одной папки в другую.
 
@@ -36,3 +87,166 @@ def transfer_files(file_paths, destination_folder):
                 return e
     return True
 
+
+class ReserveStore:
+    """Резервная папка, в которой файлы хранятся по хэшу содержимого.
+
+    Каждый файл сохраняется в папку objects один раз под именем, равным
+    хэшу его содержимого, поэтому одинаковые файлы не дублируются, а файлы
+    с одинаковыми именами из разных папок не затирают друг друга.
+    Файлы хранилища доступны только для чтения, чтобы запись в рабочую
+    копию, которая является жесткой ссылкой на них, не испортила резервную копию.
+    Для каждого исходного файла запоминаются размер, время изменения и
+    хэш (manifest.json), так что неизмененные файлы не перечитываются и
+    не копируются повторно. Копирование выполняется в несколько потоков,
+    каждая копия проверяется по хэшу.
+    """
+
+    def __init__(self, folder, workers=config.RESERVE_WORKERS):
+        self.folder = folder
+        self.workers = workers
+        self.objects_folder = os.path.join(folder, "objects")
+        self.path_to_manifest = os.path.join(folder, "manifest.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.objects_folder, exist_ok=True)
+        try:
+            with open(self.path_to_manifest, encoding='utf-8') as file:
+                self._manifest = json.load(file)
+        except (FileNotFoundError, ValueError):
+            self._manifest = {}
+
+    def _object_path(self, digest, extension):
+        return os.path.join(self.objects_folder, digest[:2], digest + extension.lower())
+
+    def _source_hash(self, file_path):
+        """Возвращает хэш исходного файла, пересчитывая его только после изменения файла."""
+
+        stat = os.stat(file_path)
+        with self._lock:
+            entry = self._manifest.get(file_path)
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        digest = file_hash(file_path)
+        with self._lock:
+            self._manifest[file_path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def digest(self, file_path):
+        """Возвращает хэш содержимого файла; для неизмененных файлов он берется из manifest.json."""
+
+        return self._source_hash(os.path.abspath(file_path))
+
+    def _store_one(self, file_path):
+        """Сохраняет один файл в хранилище и возвращает пару (путь до файла, путь до объекта)."""
+
+        file_path = os.path.abspath(file_path)
+        digest = self._source_hash(file_path)
+        object_path = self._object_path(digest, os.path.splitext(file_path)[1])
+        if os.path.exists(object_path):
+            os.utime(object_path)
+            return file_path, object_path
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        path_to_temp = f"{object_path}.{threading.get_ident()}.tmp"
+        try:
+            shutil.copyfile(file_path, path_to_temp)
+            if file_hash(path_to_temp) != digest:
+                raise Exception(f'Копия файла {os.path.basename(file_path)} не совпадает с оригиналом')
+            _make_read_only(path_to_temp)
+            os.replace(path_to_temp, object_path)
+        finally:
+            if os.path.exists(path_to_temp):
+                _remove_file(path_to_temp)
+        logging.info('%s: Файл %s сохранен в хранилище', self.store_files.__name__, os.path.basename(file_path))
+        return file_path, object_path
+
+    @staticmethod
+    def _link_or_copy(object_path, destination_file):
+        if config.USE_HARDLINKS:
+            try:
+                # Файлы, сохраненные до того, как хранилище стало только для чтения.
+                _make_read_only(object_path)
+                os.link(object_path, destination_file)
+                return
+            except FileExistsError:
+                return
+            except OSError:
+                pass
+        # Одну и ту же копию могут создавать два потока (одинаковые файлы с одинаковым именем).
+        path_to_temp = f"{destination_file}.{threading.get_ident()}.tmp"
+        shutil.copyfile(object_path, path_to_temp)
+        os.replace(path_to_temp, destination_file)
+
+    def _work_copy(self, file_path, object_path, work_folder):
+        """Создает рабочую копию объекта хранилища и возвращает путь до нее."""
+
+        digest = os.path.splitext(os.path.basename(object_path))[0]
+        destination_folder = os.path.join(work_folder, digest[:12])
+        destination_file = os.path.join(destination_folder, os.path.basename(file_path))
+        os.makedirs(destination_folder, exist_ok=True)
+        if not os.path.exists(destination_file):
+            self._link_or_copy(object_path, destination_file)
+        return destination_file
+
+    def _store_with_copy(self, file_path, work_folder):
+        file_path, object_path = self._store_one(file_path)
+        return object_path if work_folder is None else self._work_copy(file_path, object_path, work_folder)
+
+    def store_files(self, file_paths, work_folder=None):
+        """Сохраняет файлы в хранилище.
+
+        На вход поступают пути до файлов (список или генератор, копирование
+        начинается по мере его чтения) и необязательная папка для рабочих
+        копий. Если папка задана, ее прежнее содержимое удаляется и для
+        каждого файла в ней создается рабочая копия (копия объекта
+        хранилища или, если включен config.USE_HARDLINKS, жесткая ссылка
+        на него, доступная только для чтения) в подпапке по хэшу, с
+        исходным именем файла. Рабочая копия создается тем же потоком
+        сразу после сохранения файла в хранилище. Возвращается список путей
+        до рабочих копий (или до объектов хранилища, если папка не задана)
+        в порядке исходных файлов, когда обработаны все файлы.
+        """
+        file_paths = (path for path in file_paths if path is not None)
+        if work_folder is not None and os.path.exists(work_folder):
+            shutil.rmtree(work_folder, onerror=_remove_read_only)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            copies = list(executor.map(lambda path: self._store_with_copy(path, work_folder), file_paths))
+        self._save_manifest()
+        return copies
+
+    def _save_manifest(self):
+        with self._lock:
+            manifest = {path: entry for path, entry in self._manifest.items() if os.path.exists(path)}
+        path_to_temp = self.path_to_manifest + ".tmp"
+        with open(path_to_temp, 'w', encoding='utf-8') as file:
+            json.dump(manifest, file, ensure_ascii=False)
+        os.replace(path_to_temp, self.path_to_manifest)
+
+    def evict(self, max_age_days=config.RESERVE_MAX_AGE_DAYS, max_bytes=config.RESERVE_MAX_BYTES):
+        """Удаляет из хранилища старые файлы.
+
+        Сначала удаляются файлы, которые не использовались дольше max_age_days
+        дней, затем, пока размер хранилища больше max_bytes, - давно
+        не использованные. Возвращает количество удаленных файлов.
+        """
+        entries = []
+        for root, directories, files in os.walk(self.objects_folder):
+            for file in files:
+                path = os.path.join(root, file)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        oldest_allowed = time.time() - max_age_days * 24 * 60 * 60
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= oldest_allowed and total <= max_bytes:
+                break
+            try:
+                _remove_file(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        if removed:
+            logging.info('%s: Из хранилища удалено файлов: %s', self.evict.__name__, removed)
+        return removed
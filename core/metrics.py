@@ -0,0 +1,119 @@
+"""Модуль отвечает за замеры этапов обработки файлов.
+
+Замеры собираются, только если они включены (config.ENABLED), иначе
+функции модуля сразу возвращаются. Замер одного файла открывается
+track(path), внутри него stage(name) добавляет длительность этапа,
+а count(name, value) увеличивает счетчик (задачи, обращения к COM).
+Замер - это словарь, который можно передать между процессами и
+выгрузить в отчет JSON или CSV (export_report).
+"""
+
+import cProfile
+import csv
+import fnmatch
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import settings.metrics as config
+
+_local = threading.local()  # Замер файла, который обрабатывается в текущем потоке.
+
+
+def _current():
+    return getattr(_local, 'record', None)
+
+
+def _profile_path(path):
+    return os.path.join(config.PATH_TO_REPORT_FOLDER, os.path.basename(path) + ".prof")
+
+
+@contextmanager
+def track(path):
+    """Открывает замер обработки файла и возвращает его (None, если замеры выключены).
+
+    Замер содержит путь, общую длительность, длительности этапов (stages),
+    счетчики (counters) и пик памяти (peak_memory, если включен TRACE_MEMORY).
+    Если имя файла подходит под PROFILE_PATTERN, профиль обработки
+    сохраняется в папку с отчетами.
+    """
+    if not config.ENABLED:
+        yield None
+        return
+    record = {'path': path, 'duration': None, 'stages': {}, 'counters': {}, 'peak_memory': None}
+    previous = _current()
+    _local.record = record
+    profile = None
+    if path and config.PROFILE_PATTERN and fnmatch.fnmatch(os.path.basename(path), config.PROFILE_PATTERN):
+        profile = cProfile.Profile()
+        profile.enable()
+    trace = config.TRACE_MEMORY and not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['duration'] = time.perf_counter() - start
+        if trace:
+            record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        if profile is not None:
+            profile.disable()
+            os.makedirs(config.PATH_TO_REPORT_FOLDER, exist_ok=True)
+            profile.dump_stats(_profile_path(path))
+            logging.info('%s: Профиль сохранен в %s', track.__name__, _profile_path(path))
+        _local.record = previous
+
+
+@contextmanager
+def stage(name, record=None):
+    """Замеряет длительность этапа name в текущем замере файла или в замере record, если он передан."""
+
+    if record is None:
+        record = _current()
+    if record is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = record['stages']
+        stages[name] = stages.get(name, 0.0) + time.perf_counter() - start
+
+
+def count(name, value=1):
+    """Увеличивает счетчик name текущего замера файла на value."""
+
+    record = _current()
+    if record is not None:
+        counters = record['counters']
+        counters[name] = counters.get(name, 0) + value
+
+
+def export_report(records, path):
+    """Сохраняет замеры в отчет.
+
+    Формат выбирается по расширению файла: .csv - одна строка на файл,
+    этапы и счетчики в отдельных столбцах, иначе JSON.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if not path.lower().endswith('.csv'):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(records, file, ensure_ascii=False, indent=2)
+        return path
+    stages = sorted({name for record in records for name in record['stages']})
+    counters = sorted({name for record in records for name in record['counters']})
+    with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+        writer = csv.writer(file, delimiter=';')
+        writer.writerow(['path', 'duration', 'peak_memory'] + stages + counters)
+        for record in records:
+            writer.writerow([record['path'], record['duration'], record['peak_memory']]
+                            + [record['stages'].get(name) for name in stages]
+                            + [record['counters'].get(name) for name in counters])
+    return path
@@ -0,0 +1,205 @@
+"""Модуль отвечает за чтение задач из файлов проекта в формате MSPDI (XML MS Project)."""
+
+import datetime
+import logging
+import os
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+
+import settings.readOF as config
+import core.schema as schema
+from core.table import build_task_table
+
+NAMESPACE = '{http://schemas.microsoft.com/project}'
+MSPDI_FORMAT_ID = "MSProject.XML"  # Идентификатор формата для FileSaveAs.
+
+# Идентификаторы настраиваемых полей task (PjField). Используются, если в файле
+# нет раздела ExtendedAttributes с именами полей.
+_FIELD_IDS = {188743731: 'Text1', 188743734: 'Text2', 188743737: 'Text3',
+              188743740: 'Text4', 188743743: 'Text5', 188743746: 'Text6',
+              188743747: 'Text7', 188743748: 'Text8', 188743749: 'Text9',
+              188743750: 'Text10'}
+_FIELD_IDS.update({188743997 + i: f'Text{11 + i}' for i in range(20)})
+_FIELD_IDS.update({188743767 + i: f'Number{1 + i}' for i in range(5)})
+_FIELD_IDS.update({188743982 + i: f'Number{6 + i}' for i in range(15)})
+
+
+def _to_bool(value):
+    return value == '1'
+
+
+def _to_date(value):
+    return datetime.datetime.fromisoformat(value)
+
+
+def _to_minutes(value):
+    """Переводит длительность из десятых долей минуты (MSPDI) в минуты (COM)."""
+
+    minutes = int(value) / 10
+    return int(minutes) if minutes.is_integer() else minutes
+
+
+_TASK_FIELDS = {'UID': ('UniqueID', int),
+                'ID': ('ID', int),
+                'Name': ('Name', str),
+                'Active': ('Active', _to_bool),
+                'Summary': ('Summary', _to_bool),
+                'OutlineLevel': ('OutlineLevel', int),
+                'OutlineNumber': ('OutlineNumber', str),
+                'Start': ('Start', _to_date),
+                'Finish': ('Finish', _to_date),
+                'ActualStart': ('ActualStart', _to_date),
+                'ActualFinish': ('ActualFinish', _to_date),
+                'StartSlack': ('StartSlack', _to_minutes),
+                'FinishSlack': ('FinishSlack', _to_minutes),
+                'TotalSlack': ('TotalSlack', _to_minutes),
+                'PercentComplete': ('PercentComplete', int)}
+
+
+class MspdiTask:
+    """Задача, прочитанная из MSPDI.
+
+    Поля доступны как атрибуты с теми же именами, что и у объекта Task
+    из COM. Для отсутствующих в файле полей схемы ОФ возвращаются те же
+    значения, что возвращает MS Project для незаполненного поля этого
+    типа (см. schema.empty_value): пустая строка, 0, False или
+    config.NA_VALUE для дат.
+    """
+
+    def __init__(self, fields):
+        self.__dict__.update(fields)
+
+    def __getattr__(self, name):
+        value = schema.empty_value(name)
+        if value is None:
+            raise AttributeError(name)
+        return value
+
+
+def _convert_extended(name, value):
+    """Приводит значение настраиваемого поля к типу, который вернул бы COM."""
+
+    if name.startswith('Number'):
+        return float(value)
+    if name.startswith('Flag'):
+        return _to_bool(value)
+    if name.startswith(('Date', 'Start', 'Finish')):
+        return _to_date(value)
+    return value
+
+
+def _parse_task(element, field_names):
+    """Превращает элемент Task в MspdiTask.
+
+    Возвращает None для пустых строк (IsNull), так же как коллекция Tasks в COM.
+    """
+    fields = {}
+    for child in element:
+        tag = child.tag[len(NAMESPACE):]
+        if tag == 'IsNull' and child.text == '1':
+            return None
+        if tag == 'ExtendedAttribute':
+            name = field_names.get(int(child.findtext(NAMESPACE + 'FieldID')))
+            value = child.findtext(NAMESPACE + 'Value')
+            if name and value is not None:
+                fields[name] = _convert_extended(name, value)
+        elif tag == 'Baseline':
+            number = child.findtext(NAMESPACE + 'Number')
+            prefix = 'Baseline' if number == '0' else f'Baseline{number}'
+            for part in ('Start', 'Finish'):
+                value = child.findtext(NAMESPACE + part)
+                if value:
+                    fields[prefix + part] = _to_date(value)
+        elif tag in _TASK_FIELDS and child.text is not None:
+            name, convert = _TASK_FIELDS[tag]
+            fields[name] = convert(child.text)
+    fields.setdefault('Active', True)
+    return MspdiTask(fields)
+
+
+def read_tasks(path):
+    """Потоково читает задачи из файла MSPDI.
+
+    На вход поступает путь до XML файла проекта. Функция по одной
+    возвращает задачи в порядке файла, пропуская суммарную задачу
+    проекта (UID 0), которой нет в коллекции Tasks. Разобранные элементы
+    сразу освобождаются, поэтому весь файл в памяти не хранится.
+    """
+    field_names = dict(_FIELD_IDS)
+    depth = 0
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        tag = element.tag[len(NAMESPACE):]
+        if depth == 2 and tag == 'ExtendedAttribute':
+            field_id = element.findtext(NAMESPACE + 'FieldID')
+            field_name = element.findtext(NAMESPACE + 'FieldName')
+            if field_id and field_name:
+                field_names[int(field_id)] = field_name
+        elif depth == 2 and tag == 'Task':
+            if element.findtext(NAMESPACE + 'UID') != '0':
+                yield _parse_task(element, field_names)
+            element.clear()
+        elif depth == 1:
+            element.clear()
+
+
+def is_mspdi_file(path):
+    """Проверяет, можно ли прочитать файл проекта без MS Project."""
+
+    return os.path.splitext(path)[1].lower() in config.MSPDI_EXTENSIONS
+
+
+def fill_dataframe(path):
+    """Заполняет DataFrame значениями из файла MSPDI.
+
+    На вход поступает путь до XML файла проекта. Возвращается такой же
+    DataFrame, какой строит readOF.fill_dataframe по объекту project.
+    """
+    logging.info('%s: Создаем DataFrame из файла MSPDI', fill_dataframe.__name__)
+    if not config.COLUMNS:
+        logging.error('%s: Ключевые столбцы не заданы', fill_dataframe.__name__)
+        raise Exception("Ключевые столбцы не заданы")
+    try:
+        data = build_task_table(read_tasks(path), strict=False)
+    except ET.ParseError:
+        logging.error('%s: Файл MSPDI поврежден', fill_dataframe.__name__)
+        raise Exception("Не получилось прочитать файл MSPDI")
+    logging.info('%s: DataFrame из файла MSPDI успешно создан', fill_dataframe.__name__)
+    return data
+
+
+@contextmanager
+def saved_as_mspdi(msp):
+    """Сохраняет открытый проект во временный файл MSPDI и возвращает путь до него.
+
+    На вход поступает объект приложения MS Project с открытым проектом.
+    Проект один раз сохраняется в XML командой FileSaveAs и закрывается.
+    После выхода из блока with временная папка удаляется.
+    """
+    path_to_temp_folder = tempfile.mkdtemp()
+    path_to_xml = os.path.join(path_to_temp_folder, "project.xml")
+    try:
+        try:
+            msp.FileSaveAs(Name=path_to_xml, FormatID=MSPDI_FORMAT_ID)
+            msp.FileClose(Save=0)
+        except Exception:
+            logging.error('%s: Не получилось сохранить проект в MSPDI', saved_as_mspdi.__name__)
+            raise Exception("Не получилось сохранить проект в MSPDI")
+        yield path_to_xml
+    finally:
+        shutil.rmtree(path_to_temp_folder, ignore_errors=True)
+
+
+def fill_dataframe_from_project(msp):
+    """Заполняет DataFrame из открытого проекта через сохранение в MSPDI.
+
+    Задачи читаются из временного файла MSPDI (см. saved_as_mspdi) целиком,
+    без обращения к каждому полю через COM.
+    """
+    with saved_as_mspdi(msp) as path_to_xml:
+        return fill_dataframe(path_to_xml)
@@ -3,61 +3,22 @@
 import datetime
 import logging
 import os
-import pickle
+import sqlite3
 import time
 
-import pandas as pd
-import pythoncom
-import win32com.client as win32
-import openpyxl
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import numbers
-
 import settings.readOF as config
+import database.tasks as tasks
+import core.cache as cache
+import core.delta as delta
+import core.excel as excel
+import core.hierarchy as hierarchy
+import core.metrics as metrics
+import core.mspdi as mspdi
+import core.schema as schema
+from core.backend import SessionPool
+from core.table import build_task_table, iter_task_rows
 
-
-def get_project(path):
-    """Открывает файл проекта и возвращает объект проекта."""
-
-    if not os.path.isabs(path):
-        logging.warning('%s: Путь до файла проекта не абсолютный', get_project.__name__)
-    logging.info('%s: Пытаемся открыть файл проекта', get_project.__name__)
-    try:
-        msp = win32.Dispatch("MSProject.Application", pythoncom.CoInitialize())
-        _abs_path = os.path.abspath(path)
-        print(_abs_path)
-        msp.FileOpen(_abs_path)
-        project = msp.ActiveProject
-    except Exception:
-        logging.error('%s: Файл проекта не смог открыться', get_project.__name__)
-        raise Exception('Не получилось открыть файл проекта')
-    logging.info('%s: Файл проекта успешно открылся', get_project.__name__)
-    return project, msp
-
-
-def _get_data_task(t):
-    """"Получает значения task из нужных столбцов.
-
-    На вход поступает объект Task из project. Из него достаются
-    требуемые данные, ими заполняется список, который возвращается
-    для дальнейшего использования.
-    """
-    arr = []
-    try:
-        for i in config.ID_COLUMN.keys():
-            try:
-                data = getattr(t, i)
-            except Exception as e:
-                arr.append("Ошибка чтения")
-                continue
-            if isinstance(data, datetime.datetime):
-                data = datetime.datetime.date(data)
-            arr.append(data)
-    except Exception as e:
-        print(e)
-        logging.error('%s: Неверный идентификатор столбца project', get_project.__name__)
-        raise Exception('Неверный идентификатор столбца project')
-    return arr
+CACHE_VARIANT = "readOF"  # Вариант таблицы задач в кэше.
 
 
 def fill_dataframe(project):
@@ -65,20 +26,20 @@ def fill_dataframe(project):
 
     На вход поступают объекты projectа и приложения MS Project.
     Формируется dataframe с данными из требуемых столбцов и возвращается
-    для дальнейшего использования.
+    для дальнейшего использования. Если включен config.ROLLUP_SUMMARIES,
+    поля из config.ROLLUPS у суммарных задач не читаются (см. _extract).
     """
     logging.info('%s: Создаем DataFrame из столбцов объекта проекта', fill_dataframe.__name__)
     if not project:
         logging.error('%s: Не удалось получить объект проекта', fill_dataframe.__name__)
         raise Exception("Объект проекта пустой")
-    if not config.ID_COLUMN:
+    if not config.COLUMNS:
         logging.error('%s: Ключевые столбцы не заданы', fill_dataframe.__name__)
         raise Exception("Ключевые столбцы не заданы")
     task_collection = project.Tasks
-    data = pd.DataFrame(columns=config.ID_COLUMN.values())
     try:
-        for t in task_collection:
-            data.loc[len(data.index)] = _get_data_task(t)
+        skip = tuple(config.ROLLUPS) if config.ROLLUP_SUMMARIES else ()
+        data = build_task_table(task_collection, strict=False, skip_for_summary=skip, count_as='com_calls')
     except Exception:
         logging.error('%s: Неверно заполнен словарь столбцов и их идентификаторов', fill_dataframe.__name__)
         raise Exception("Ошибка в словаре слобцов и их идентификаторов")
@@ -87,68 +48,183 @@ def fill_dataframe(project):
     return data
 
 
-def set_style_excel(column_index, path_to_excel):
-    """Применяет стили к строкам excel.
+def _extract(path_to_project, pool):
+    """Извлекает таблицу задач из файла проекта (MSPDI или через MS Project).
+
+    Если включен config.ROLLUP_SUMMARIES, при чтении через MS Project
+    поля суммарных задач из config.ROLLUPS не читаются, а вычисляются из
+    листовых задач. В MSPDI эти поля уже есть и не пересчитываются.
+    """
+    if mspdi.is_mspdi_file(path_to_project):
+        with metrics.stage('fill_dataframe'):
+            return mspdi.fill_dataframe(path_to_project)
+    with pool.project(path_to_project) as (project, msp):
+        with metrics.stage('fill_dataframe'):
+            if config.USE_MSPDI_EXPORT:
+                return mspdi.fill_dataframe_from_project(msp)
+            data = fill_dataframe(project)
+    if config.ROLLUP_SUMMARIES:
+        with metrics.stage('rollup'):
+            data = hierarchy.rollup(data)
+    return data
+
+
+def _cache_variant():
+    """Возвращает вариант таблицы задач в кэше с учетом настроек, от которых зависит таблица."""
 
-    На вход поступают индексы колонок в Excel и путь до Excel.
-    Функция создает объект worksheet из объекта workbook и
-    применяет изменения из pickle файла, в котором содержится
-    словарь для стилей для каждого конкретного ключевого значения
-    (Фаза, феха и т.д.)
+    variant = CACHE_VARIANT
+    if config.USE_MSPDI_EXPORT:
+        variant += " mspdi"
+    elif config.ROLLUP_SUMMARIES:
+        variant += f" {config.ROLLUPS}"
+    return variant
+
+
+def _stream(path_to_project, path_to_excel, sheet_name, pool, export=None):
+    """Выгружает ОФ потоково и возвращает количество задач.
+
+    Задачи по одной читаются из файла проекта (MSPDI или через MS Project)
+    и сразу записываются в Excel, таблица задач целиком не строится.
+    Если передана выгрузка в сводную базу (tasks.Export), строки по пути
+    записываются и в нее.
+    """
+    columns = schema.get_columns()
+
+    def write(task_collection, count_as=None):
+        rows = iter_task_rows(task_collection, columns, count_as)
+        if export is not None:
+            rows = export.tee(rows)
+        return excel.write_form_stream(rows, [column.header for column in columns],
+                                       path_to_excel, sheet_name, schema.header('Text5'))
+
+    if mspdi.is_mspdi_file(path_to_project):
+        return write(mspdi.read_tasks(path_to_project))
+    with pool.project(path_to_project) as (project, msp):
+        if config.USE_MSPDI_EXPORT:
+            with mspdi.saved_as_mspdi(msp) as path_to_xml:
+                return write(mspdi.read_tasks(path_to_xml))
+        return write(project.Tasks, 'com_calls')
+
+
+def _can_stream(path_to_project):
+    """Проверяет, можно ли выгрузить ОФ потоково (config.STREAMING_EXPORT).
+
+    Сравнению с прошлой выгрузкой и свертке суммарных задач нужна таблица
+    задач целиком, поэтому с ними ОФ выгружается через таблицу. Свертка
+    выполняется только при чтении через COM (см. _extract).
+    """
+    if not config.STREAMING_EXPORT or config.DELTA_EXPORT is not None:
+        return False
+    if config.ROLLUP_SUMMARIES and not config.USE_MSPDI_EXPORT and not mspdi.is_mspdi_file(path_to_project):
+        logging.warning('%s: Свертке суммарных задач нужна таблица задач, потоковая выгрузка не используется',
+                        _can_stream.__name__)
+        return False
+    return True
+
+
+def _get_task_store():
+    """Возвращает сводную базу задач или None, если запись в нее выключена или база недоступна."""
+
+    try:
+        return tasks.get_store()
+    except Exception as e:
+        logging.error('%s: Сводная база задач недоступна: %s', _get_task_store.__name__, e)
+        return None
+
+
+def _stream_with_database(path_to_project, path_to_excel, sheet_name, pool, task_store):
+    """Выгружает ОФ потоково, по пути записывая задачи в сводную базу, и возвращает количество задач.
+
+    Ошибки базы только записываются в журнал: если выгрузку в базу не
+    удалось открыть, ОФ выгружается без нее.
     """
+    count = None
     try:
-        print(os.getcwd())
-        with open(config.PATH_TO_STYLE_FILE, 'rb') as file:
-            styles_dict = pickle.load(file)
-    except FileNotFoundError:
-        logging.error('%s: Неверно задан путь к файлу со стилями', fill_dataframe.__name__)
-        raise Exception("Неверный путь до файла со стилями")
-    workbook_other = openpyxl.load_workbook(path_to_excel)
-    worksheet_other = workbook_other.active
-    for row in worksheet_other.iter_rows(min_row=1):
-        cell = row[column_index - 1]
-        cell_value = cell.value
-        if cell_value in styles_dict:
-            for cell in row:
-                style = styles_dict[cell_value]
-                cell.style = style
-                column_letter = get_column_letter(cell.column)
-                text_length = len(str(cell.value))
-                current_width = worksheet_other.column_dimensions[column_letter].width
-                if text_length > current_width:
-                    worksheet_other.column_dimensions[column_letter].width = text_length
-
-    for column_index, column in enumerate(worksheet_other.columns, start=1):
-        for cell in column:
-            if isinstance(cell.value, datetime.date):
-                cell.number_format = numbers.FORMAT_DATE_YYYYMMDD2
-
-    workbook_other.save(path_to_excel)
-
-
-def main(path_to_project, path_to_folder):
+        with task_store.export(path_to_project) as export:
+            count = _stream(path_to_project, path_to_excel, sheet_name, pool, export)
+    except sqlite3.Error as e:
+        logging.error('%s: Не удалось записать задачи %s в сводную базу: %s', _stream_with_database.__name__,
+                      path_to_project, e)
+    if count is None:
+        count = _stream(path_to_project, path_to_excel, sheet_name, pool)
+    return count
+
+
+def main(path_to_project, path_to_folder, pool=None, path_to_source=None):
     """Управляющая функция.
 
-    На вход поступает путь до файла project и до файла Excel.
-    Выполняется выгрузка обменной формы. В качестве результата
-    возвращается абсолютный путь до ОФ.
+    На вход поступает путь до файла project, до папки для Excel и
+    необязательный пул экземпляров MS Project. Если пул не передан,
+    MS Project запускается только для этого файла.
+    Выполняется выгрузка обменной формы (потоковая, если включен
+    config.STREAMING_EXPORT и ее можно использовать, см. _can_stream).
+    Если включена запись в сводную базу (см. database.tasks), задачи
+    проекта записываются и в нее; ошибка записи в базу не делает
+    выгрузку ОФ неуспешной. Если
+    задан config.DELTA_EXPORT, таблица задач сравнивается с прошлой
+    выгрузкой проекта (см. core.delta) и в ОФ отмечаются изменения или
+    выгружаются только они. Прошлая выгрузка ищется по пути до исходного
+    файла path_to_source, если выгружается его копия (например, рабочая
+    копия из резервной папки), иначе по path_to_project.
+    В качестве результата возвращается абсолютный путь до ОФ или None,
+    если выгрузить ОФ не удалось.
     """
+    if pool is None:
+        with SessionPool(max_files=1) as pool:
+            return main(path_to_project, path_to_folder, pool, path_to_source)
     path_to_excel = None
     try:
         start = time.time()
-        project, msp = get_project(path_to_project)
-        data = fill_dataframe(project)
         file_name = os.path.splitext(os.path.basename(path_to_project))[0]
         current_date = datetime.datetime.now().strftime("%d.%m.%Y")
-        path_to_excel = path_to_folder + "//" + file_name + "_ОФ_" + current_date + ".xlsx"
-        data.to_excel(path_to_excel, sheet_name=f"Обменная форма {datetime.date.today()}", index=False)
-        column_index = data.columns.get_loc(config.ID_COLUMN['Text5']) + 1
-        set_style_excel(column_index, path_to_excel)
-        end = time.time()
-        print(end - start)
+        sheet_name = f"Обменная форма {datetime.date.today()}"
+        task_store = _get_task_store()
+        if _can_stream(path_to_project):
+            path_to_excel = path_to_folder + "//" + file_name + "_ОФ_" + current_date + ".xlsx"
+            with metrics.stage('write_form'):
+                if task_store is None:
+                    metrics.count('tasks', _stream(path_to_project, path_to_excel, sheet_name, pool))
+                else:
+                    metrics.count('tasks', _stream_with_database(path_to_project, path_to_excel, sheet_name, pool,
+                                                                 task_store))
+        else:
+            table_cache = cache.get_cache()
+            if table_cache is None:
+                data = _extract(path_to_project, pool)
+            else:
+                data = table_cache.get_or_build(path_to_project, _cache_variant(),
+                                                lambda: _extract(path_to_project, pool))
+            metrics.count('tasks', len(data))
+            form = data
+            suffix = "_ОФ_"
+            if config.DELTA_EXPORT is not None:
+                with metrics.stage('delta'):
+                    snapshots = delta.SnapshotStore()
+                    previous = snapshots.get(path_to_source or path_to_project)
+                    if config.DELTA_EXPORT == "delta":
+                        form = delta.delta_form(previous, data)
+                        suffix = "_ОФ_изменения_"
+                    elif config.DELTA_EXPORT == "mark":
+                        form, _ = delta.mark_changes(previous, data)
+                    else:
+                        logging.error('%s: Неизвестный режим сравнения %s', main.__name__, config.DELTA_EXPORT)
+                        raise Exception(f'Неизвестный режим сравнения: {config.DELTA_EXPORT}')
+                metrics.count('changed_tasks', int(form[config.DELTA_STATUS_COLUMN].notna().sum()))
+            path_to_excel = path_to_folder + "//" + file_name + suffix + current_date + ".xlsx"
+            with metrics.stage('write_form'):
+                excel.write_form(schema.for_output(form), path_to_excel, sheet_name, schema.header('Text5'))
+            if task_store is not None:
+                with metrics.stage('write_database'):
+                    try:
+                        task_store.add_table(path_to_project, data)
+                    except Exception as e:
+                        logging.error('%s: Не удалось записать задачи %s в сводную базу: %s', main.__name__,
+                                      path_to_project, e)
+            if config.DELTA_EXPORT is not None:
+                snapshots.put(path_to_source or path_to_project, data)
+        logging.info('%s: ОФ %s выгружена за %.2f с', main.__name__, os.path.basename(path_to_excel),
+                     time.time() - start)
     except Exception as e:
-        print(e)
-        return path_to_excel
-    msp.Quit()
+        logging.error('%s: Не удалось выгрузить ОФ для %s: %s', main.__name__, path_to_project, e)
+        path_to_excel = None
     return path_to_excel
-
@@ -0,0 +1,278 @@
+"""Модуль отвечает за запуск пакетной обработки без привязки к интерфейсу.
+
+Функции run_export и run_fact выполняют подготовку резервной папки,
+обработку файлов, запись истории запусков и раскладку результатов по папкам.
+О ходе работы они сообщают через функцию on_event(kind, data):
+'start' - количество файлов на обработку,
+'progress' - пара (обработано, всего), не чаще PROGRESS_INTERVAL секунд,
+'file' - batch.FileResult по каждому обработанному файлу,
+'error' - текст ошибки, после которой обработка продолжается,
+'done' - RunSummary по окончании.
+Состояние каждого файла пакета записывается в журнал (database.journal)
+сразу после его обработки. Если пакет с теми же папками был прерван
+(отмена, перезагрузка, аварийное завершение), новый запуск продолжает
+его: обрабатываются только оставшиеся и неуспешные файлы, а итог и папка
+unsuccessful строятся по журналу для всего пакета. Пакет не продолжается,
+если он начат слишком давно (settings.database.RESUME_MAX_AGE_HOURS) или
+запуск вызван с resume=False.
+Модули обработки (batch, cache, fact и через них pandas и openpyxl)
+импортируются при первом запуске, а не при импорте модуля, чтобы окно
+приложения открывалось сразу. preload() импортирует их заранее.
+"""
+
+import logging
+import os
+import time
+from collections import namedtuple
+
+import core.discovery as discovery
+import core.io as oi
+import core.metrics as metrics
+import database.database as database
+import database.journal as journal
+import settings.interface as config
+import settings.metrics as metrics_config
+from core.backend import ComBackend
+
+RunSummary = namedtuple('RunSummary', ['results', 'bad_files', 'cancelled', 'cache_stats', 'resumed', 'unfinished'],
+                        defaults=(0, 0))
+RunSummary.__doc__ = """Итог запуска: список batch.FileResult по всем обработанным файлам пакета,
+список неуспешных файлов, признак отмены пользователем, счетчики кэша
+таблиц задач, количество файлов, обработанных в прошлых запусках
+прерванного пакета, и количество файлов пакета, которые остались
+необработанными (после отмены или по другой причине)."""
+
+
+def preload():
+    """Импортирует модули обработки, чтобы первый запуск не ждал их импорта.
+
+    Вызывается в фоновом потоке после открытия окна.
+    """
+    import core.batch  # noqa: F401
+    import core.fact  # noqa: F401
+
+
+def _ignore_event(kind, data):
+    pass
+
+
+class _Progress:
+    """Отправляет события о прогрессе не чаще заданного интервала."""
+
+    def __init__(self, on_event, total, interval=config.PROGRESS_INTERVAL):
+        self.on_event = on_event
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self._last = time.perf_counter()
+
+    def step(self):
+        self.done += 1
+        now = time.perf_counter()
+        if self.done == self.total or now - self._last >= self.interval:
+            self._last = now
+            self.on_event('progress', (self.done, self.total))
+
+
+def _reserve_folders():
+    """Создает резервную папку с подпапками и возвращает пути до подпапок."""
+
+    folders = {name: os.path.join(config.PATH_TO_RESERVE_FOLDER, name)
+               for name in ("OF", "projects", "unsuccessful")}
+    for folder in folders.values():
+        os.makedirs(folder, exist_ok=True)
+    return folders
+
+
+def _record(result):
+    return {'path': result.path, 'output_path': result.output, 'success': result.output is not None,
+            'duration': result.duration, 'stages': result.metrics['stages'] if result.metrics else None,
+            'error': result.error}
+
+
+def _save_metrics(run_id, results, run_record):
+    """Сохраняет замеры файлов и запуска в отчет, если замеры включены, а этапы запуска - в историю запусков."""
+
+    if run_record is not None:
+        database.get_store().add_run_stages(run_id, run_record['stages'])
+    records = [result.metrics for result in results if result.metrics]
+    if run_record is not None:
+        records.append(run_record)
+    if not records:
+        return
+    path = os.path.join(metrics_config.PATH_TO_REPORT_FOLDER, f"run_{run_id}.{metrics_config.REPORT_FORMAT}")
+    metrics.export_report(records, path)
+    logging.info('%s: Отчет по замерам сохранен в %s', _save_metrics.__name__, path)
+
+
+def _open_batch(mode, source, destination, paths, versions, resume):
+    """Открывает пакет в журнале.
+
+    На вход поступают режим, исходная папка, папка для результатов, пути
+    до файлов пакета, их версии и признак продолжения прерванного пакета.
+    Возвращает id пакета, пути до файлов, которые нужно обработать в этом
+    запуске (в исходном порядке), и количество файлов, уже обработанных
+    в прошлых запусках.
+    """
+    batch_journal = journal.get_journal()
+    batch_id, resumed = batch_journal.open_batch(mode, os.path.abspath(source), os.path.abspath(destination),
+                                                 zip(paths, versions), resume)
+    remaining = set(batch_journal.remaining(batch_id))
+    todo = [path for path in paths if path in remaining]
+    if resumed:
+        logging.info('%s: Продолжается прерванный пакет %s, осталось файлов: %s из %s',
+                     _open_batch.__name__, batch_id, len(todo), len(paths))
+    return batch_id, todo, len(paths) - len(todo)
+
+
+def _mark_running(batch_id, todo):
+    """Возвращает функцию on_start для core.batch, которая отмечает файл в журнале как переданный на обработку."""
+
+    batch_journal = journal.get_journal()
+    return lambda number: batch_journal.mark_running(batch_id, [todo[number]])
+
+
+def _cancelled(cancel):
+    return cancel is not None and cancel.is_set()
+
+
+def _close_batch(batch_id, processed, result_type):
+    """Возвращает итог пакета по журналу и отмечает пакет завершенным, если обработаны все файлы.
+
+    processed - словарь: путь до файла пакета -> FileResult этого запуска;
+    для файлов из прошлых запусков FileResult строится по журналу.
+    Возвращает список FileResult, список неуспешных файлов, пути до
+    результатов и количество необработанных файлов.
+    """
+    batch_journal = journal.get_journal()
+    entries = batch_journal.entries(batch_id)
+    finished = [entry for entry in entries if entry.state in ('done', 'failed')]
+    results = [processed.get(entry.path) or result_type(entry.path, entry.output_path, entry.duration, None,
+                                                        entry.error)
+               for entry in finished]
+    bad_files = [entry.path for entry in finished if entry.state == 'failed']
+    outputs = [entry.output_path for entry in finished if entry.state == 'done']
+    unfinished = len(entries) - len(finished)
+    if unfinished:
+        batch_journal.release(batch_id)
+    else:
+        batch_journal.finish_batch(batch_id)
+    return results, bad_files, outputs, unfinished
+
+
+def run_export(path_to_from_folder, path_to_to_folder, workers=config.WORKERS, on_event=None, cancel=None,
+               backend_factory=ComBackend, resume=True):
+    """Выгружает обменные формы для всех файлов проекта из папки.
+
+    На вход поступают папка с файлами проекта, папка для ОФ, количество
+    процессов, функция для событий (см. описание модуля), необязательный
+    объект threading.Event для отмены, фабрика объектов для работы
+    с MS Project и признак продолжения прерванного пакета (при False
+    пакет начинается заново). После отмены обработка останавливается после текущего
+    файла, а уже полученные ОФ все равно копируются в папку для ОФ.
+    Возвращает RunSummary.
+    """
+    import core.batch as batch
+    import core.cache as cache
+
+    on_event = on_event or _ignore_event
+    folders = _reserve_folders()
+    reserve = oi.ReserveStore(config.PATH_TO_RESERVE_FOLDER)
+    paths_to_projects = [os.path.abspath(path)
+                         for path in discovery.iter_files(path_to_from_folder, config.PROJECT_EXTENSIONS)]
+    with metrics.track(None) as run_record, metrics.stage('reserve'):
+        paths_to_copies = dict(zip(paths_to_projects, reserve.store_files(paths_to_projects, folders["projects"])))
+        reserve.evict()
+    batch_id, todo, resumed = _open_batch('export', path_to_from_folder, path_to_to_folder, paths_to_projects,
+                                          [reserve.digest(path) for path in paths_to_projects], resume)
+    on_event('start', len(todo))
+    store = database.get_store()
+    run_id = store.start_run('export', workers)
+    cache_stats = cache.CacheStats()
+    progress = _Progress(on_event, len(todo))
+    batch_journal = journal.get_journal()
+    processed = {}
+    try:
+        results = batch.iter_export([paths_to_copies[path] for path in todo], folders["OF"], workers,
+                                    backend_factory, cache_stats, cancel, _mark_running(batch_id, todo), todo)
+        for path, result in zip(todo, results):
+            batch_journal.mark_finished(batch_id, path, result.output, result.error, result.duration)
+            processed[path] = result
+            on_event('file', result)
+            progress.step()
+    finally:
+        store.add_files(run_id, [_record(result) for result in processed.values()])
+        store.finish_run(run_id)
+    results, bad_files, outputs, unfinished = _close_batch(batch_id, processed, batch.FileResult)
+    with metrics.stage('transfer_files', run_record):
+        transferred = oi.transfer_files(outputs, path_to_to_folder)
+        if bad_files:
+            oi.transfer_files(bad_files, folders["unsuccessful"])
+    if transferred is not True:
+        logging.error('%s: Не удалось скопировать ОФ: %s', run_export.__name__, transferred)
+        on_event('error', str(transferred))
+    _save_metrics(run_id, list(processed.values()), run_record)
+    summary = RunSummary(results, bad_files, _cancelled(cancel), cache_stats, resumed, unfinished)
+    on_event('done', summary)
+    return summary
+
+
+def run_fact(path_to_forms_folder, path_to_projects_folder, on_event=None, cancel=None,
+             backend_factory=ComBackend, resume=True):
+    """Вносит факт из обменных форм в файлы проекта.
+
+    На вход поступают папка с ОФ, папка с файлами проекта, функция для
+    событий, необязательный объект threading.Event для отмены, фабрика
+    объектов для работы с MS Project и признак продолжения прерванного
+    пакета. ОФ без парного файла проекта
+    пропускаются, из нескольких ОФ одного проекта берется последняя по
+    дате в имени. После отмены обработка останавливается после текущего
+    файла. Файлы проекта, в которые не удалось внести факт, копируются
+    в папку unsuccessful. Возвращает RunSummary.
+    """
+    import core.batch as batch
+    import core.cache as cache
+
+    on_event = on_event or _ignore_event
+    folders = _reserve_folders()
+    paths_to_excel = [os.path.abspath(path)
+                      for path in discovery.iter_files(path_to_forms_folder, config.FORM_EXTENSIONS)]
+    paths_to_projects = [os.path.abspath(path)
+                         for path in discovery.iter_files(path_to_projects_folder, config.PROJECT_EXTENSIONS)]
+    reserve = oi.ReserveStore(config.PATH_TO_RESERVE_FOLDER)
+    with metrics.track(None) as run_record, metrics.stage('reserve'):
+        reserve.store_files(paths_to_projects + paths_to_excel)
+        reserve.evict()
+    pairs = discovery.latest_forms(paths_to_excel, paths_to_projects)
+    # Файл проекта меняется при внесении факта, поэтому версия пары - хэш ОФ.
+    batch_id, todo, resumed = _open_batch('fact', path_to_forms_folder, path_to_projects_folder, list(pairs),
+                                          [reserve.digest(form) for form in pairs.values()], resume)
+    on_event('start', len(todo))
+    store = database.get_store()
+    run_id = store.start_run('fact')
+    cache_stats = cache.CacheStats()
+    progress = _Progress(on_event, len(todo))
+    batch_journal = journal.get_journal()
+    processed = {}
+    try:
+        results = batch.iter_fact([(pairs[project], project) for project in todo], backend_factory, cancel,
+                                  cache_stats, _mark_running(batch_id, todo))
+        for project, result in zip(todo, results):
+            batch_journal.mark_finished(batch_id, project, result.output, result.error, result.duration)
+            processed[project] = result
+            on_event('file', result)
+            progress.step()
+    finally:
+        store.add_files(run_id, [_record(result) for result in processed.values()])
+        store.finish_run(run_id)
+    results, bad_files, _, unfinished = _close_batch(batch_id, processed, batch.FileResult)
+    if bad_files:
+        with metrics.stage('transfer_files', run_record):
+            transferred = oi.transfer_files(bad_files, folders["unsuccessful"])
+        if transferred is not True:
+            logging.error('%s: Не удалось скопировать неуспешные файлы: %s', run_fact.__name__, transferred)
+            on_event('error', str(transferred))
+    _save_metrics(run_id, list(processed.values()), run_record)
+    summary = RunSummary(results, bad_files, _cancelled(cancel), cache_stats, resumed, unfinished)
+    on_event('done', summary)
+    return summary
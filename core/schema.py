@@ -0,0 +1,214 @@
+"""Модуль отвечает за схему столбцов ОФ и приведение столбцов к их типам.
+
+Схема задается в config.COLUMNS списком (поле task, имя столбца в ОФ, тип).
+Типы значений:
+text - строка, category - строка из небольшого набора значений (хранится
+как pandas category), bool - признак, int - целое число, float - число,
+date - дата (datetime64, время отбрасывается, config.NA_VALUE - пустая дата).
+Таблицы задач проекта и ОФ приводятся к этим типам целыми столбцами,
+поэтому их можно сравнивать без преобразования отдельных ячеек.
+"""
+
+import datetime
+import logging
+import math
+from collections import namedtuple
+
+import pandas as pd
+
+import settings.readOF as config
+
+KINDS = ('text', 'category', 'bool', 'int', 'float', 'date')  # Допустимые типы значений столбцов.
+
+Column = namedtuple('Column', ['attribute', 'header', 'kind'])
+Column.__doc__ = """Столбец ОФ: поле task в project, имя столбца в ОФ и тип значения."""
+
+_EMPTY_VALUES = {'text': '', 'category': '', 'bool': False, 'int': 0, 'float': 0.0,
+                 'date': config.NA_VALUE}  # Значения, которые MS Project возвращает для незаполненных полей.
+
+_source = None  # Список config.COLUMNS, по которому построена схема.
+_columns = []  # Схема в виде списка Column.
+_by_attribute = {}  # Первый столбец для каждого поля task.
+
+
+def get_columns():
+    """Возвращает схему ОФ (config.COLUMNS) в виде списка Column.
+
+    Схема проверяется и строится один раз, пока config.COLUMNS не заменен.
+    """
+    global _source, _columns, _by_attribute
+    if _source is not config.COLUMNS:
+        columns = [Column(*item) for item in config.COLUMNS]
+        for column in columns:
+            if column.kind not in KINDS:
+                logging.error('%s: Неизвестный тип столбца %s', get_columns.__name__, column.header)
+                raise Exception(f'Неизвестный тип столбца {column.header}: {column.kind}')
+        by_attribute = {}
+        for column in columns:
+            by_attribute.setdefault(column.attribute, column)
+        _columns, _by_attribute, _source = columns, by_attribute, config.COLUMNS
+    return _columns
+
+
+def header(attribute):
+    """Возвращает имя столбца ОФ для поля task (первого, если их несколько)."""
+
+    get_columns()
+    try:
+        return _by_attribute[attribute].header
+    except KeyError:
+        logging.error('%s: Поля %s нет в схеме ОФ', header.__name__, attribute)
+        raise Exception(f'Поля {attribute} нет в схеме ОФ')
+
+
+def empty_value(attribute):
+    """Возвращает значение незаполненного поля task или None, если поля нет в схеме."""
+
+    get_columns()
+    column = _by_attribute.get(attribute)
+    return _EMPTY_VALUES[column.kind] if column is not None else None
+
+
+def attributes_by_header(columns=None):
+    """Возвращает словарь: имя столбца ОФ -> поле task."""
+
+    return {column.header: column.attribute for column in columns or get_columns()}
+
+
+def kinds_by_header(columns=None):
+    """Возвращает словарь: имя столбца ОФ -> тип значения."""
+
+    return {column.header: column.kind for column in columns or get_columns()}
+
+
+def _text_to_dates(text):
+    """Разбирает даты, введенные текстом.
+
+    Сначала текст разбирается по config.FORM_DATE_FORMAT, затем как ISO
+    (2023-02-01), а оставшийся - с днем перед месяцем (например, с временем).
+    """
+    text = text.str.strip()
+    dates = pd.to_datetime(text, format=config.FORM_DATE_FORMAT, errors='coerce')
+    for options in ({'format': 'ISO8601'}, {'format': 'mixed', 'dayfirst': True}):
+        rest = dates.isna() & text.ne("")
+        if not rest.any():
+            break
+        dates[rest] = pd.to_datetime(text[rest], errors='coerce', **options)
+    return dates
+
+
+def _to_dates(series):
+    if pd.api.types.is_datetime64_any_dtype(series) and getattr(series.dt, 'tz', None) is None:
+        return series.dt.normalize()
+    values = series.where(series != config.NA_VALUE)
+    # Текст из ОФ записан в русской локали (день перед месяцем), pandas по умолчанию ставит месяц первым.
+    is_text = values.map(lambda value: isinstance(value, str)).astype(bool)
+    if is_text.any():
+        parts = [_text_to_dates(values[is_text].astype(str))]
+        if not is_text.all():
+            parts.append(_to_dates(values[~is_text].astype(object)))
+        return pd.concat(parts).reindex(values.index).dt.normalize()
+    # Даты из COM приходят с часовым поясом, из Excel и MSPDI - без него, время в обоих случаях местное.
+    dates = pd.to_datetime(values, errors='coerce', utc=True).dt.tz_localize(None)
+    return dates.dt.normalize()
+
+
+def _to_integers(series):
+    values = pd.to_numeric(series, errors='coerce')
+    present = values.dropna()
+    if not (present % 1 == 0).all():
+        return values
+    if len(present) < len(values):
+        return values.astype('Int64')
+    return pd.to_numeric(values, downcast='integer')
+
+
+def normalize_column(series, kind):
+    """Приводит столбец к типу kind целиком.
+
+    Значения, которые нельзя привести к типу (в том числе config.NA_VALUE
+    в датах), становятся пустыми.
+    """
+    if kind == 'date':
+        return _to_dates(series)
+    if kind == 'bool':
+        if pd.api.types.is_bool_dtype(series):
+            return series
+        return series.astype('boolean' if series.isna().any() else bool)
+    if kind == 'int':
+        if pd.api.types.is_integer_dtype(series):
+            return pd.to_numeric(series, downcast='integer')
+        return _to_integers(series)
+    if kind == 'float':
+        return pd.to_numeric(series, errors='coerce').astype('float64')
+    if kind == 'category':
+        return series if isinstance(series.dtype, pd.CategoricalDtype) else series.astype('category')
+    if pd.api.types.is_string_dtype(series):
+        return series
+    return series.where(series.isna(), series.astype(str))
+
+
+def normalize_frame(data, columns=None, skip=()):
+    """Приводит столбцы DataFrame, которые есть в схеме, к их типам.
+
+    Столбцы ищутся по имени в ОФ, столбцы из skip и столбцы не из схемы
+    не меняются. Возвращается новый DataFrame.
+    """
+    kinds = kinds_by_header(columns)
+    converted = {name: normalize_column(data[name], kinds[name])
+                 for name in data.columns if name in kinds and name not in skip}
+    if not converted:
+        return data
+    data = data.copy(deep=False)
+    for name, series in converted.items():
+        data[name] = series
+    return data
+
+
+def comparable(series, kind):
+    """Приводит столбец к типу kind так, чтобы его можно было сравнить со столбцом другой таблицы."""
+
+    series = normalize_column(series, kind)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(object)
+    return series
+
+
+def for_output(data, columns=None):
+    """Возвращает DataFrame со значениями в том виде, в каком они записываются в ОФ.
+
+    Даты становятся date, пустые даты - config.NA_VALUE, как их возвращает
+    MS Project, остальные пустые значения (кроме чисел) - None.
+    """
+    kinds = kinds_by_header(columns)
+    data = data.copy(deep=False)
+    for name in data.columns:
+        series = data[name]
+        if kinds.get(name) == 'date' and pd.api.types.is_datetime64_any_dtype(series):
+            data[name] = series.dt.date.astype(object).where(series.notna(), config.NA_VALUE)
+        elif not pd.api.types.is_float_dtype(series):
+            data[name] = series.astype(object).where(series.notna(), None)
+    return data
+
+
+def output_value(value, kind):
+    """Приводит одно значение поля task к виду, в каком его записывает for_output.
+
+    Используется при потоковой выгрузке, когда таблица задач целиком
+    не строится. config.READ_ERROR_VALUE не меняется.
+    """
+    if value is None or isinstance(value, str) and value == config.READ_ERROR_VALUE:
+        return value
+    if kind == 'date':
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        return value if isinstance(value, datetime.date) else config.NA_VALUE
+    if kind == 'float':
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+        return None if math.isnan(value) else value
+    if kind == 'text' and not isinstance(value, str):
+        return str(value)
+    return value
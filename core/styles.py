@@ -0,0 +1,60 @@
+"""Модуль отвечает за стили строк обменной формы.
+
+Стили описаны в settings/styles.json: общий для всех стилей шрифт, граница
+и выравнивание (base) и для каждого типа элемента КСГ (Фаза, веха и т.д.)
+жирность и цвет шрифта и цвет заливки (styles). Файл читается один раз за
+процесс, в каждую книгу стили добавляются как именованные, и ячейки
+ссылаются на них по имени.
+"""
+
+import json
+import logging
+
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+
+import settings.readOF as config
+
+_registry = None  # Скомпилированные стили: тип элемента -> (имя стиля, шрифт, заливка, граница, выравнивание).
+
+
+def _compile(description):
+    """Превращает описание стилей из json в объекты openpyxl."""
+
+    base = description['base']
+    side = Side(style=base['border']['style'], color=base['border']['color'])
+    border = Border(left=side, right=side, top=side, bottom=side)
+    alignment = Alignment(**base['alignment'])
+    registry = {}
+    for element_type, style in description['styles'].items():
+        font = Font(bold=style['bold'], color=style['color'], **base['font'])
+        fill = PatternFill(fill_type='solid', fgColor=style['fill'])
+        registry[element_type] = (f"style_{element_type}", font, fill, border, alignment)
+    return registry
+
+
+def get_styles():
+    """Возвращает скомпилированные стили, при первом вызове читает их из файла."""
+
+    global _registry
+    if _registry is None:
+        try:
+            with open(config.PATH_TO_STYLE_FILE, encoding='utf-8') as file:
+                description = json.load(file)
+        except FileNotFoundError:
+            logging.error('%s: Неверно задан путь к файлу со стилями', get_styles.__name__)
+            raise Exception("Неверный путь до файла со стилями")
+        _registry = _compile(description)
+    return _registry
+
+
+def register_styles(workbook):
+    """Добавляет стили в книгу как именованные.
+
+    Возвращает словарь: тип элемента -> имя стиля, которое присваивается ячейкам.
+    """
+    names = {}
+    for element_type, (name, font, fill, border, alignment) in get_styles().items():
+        workbook.add_named_style(NamedStyle(name=name, font=font, fill=fill, border=border,
+                                            alignment=alignment))
+        names[element_type] = name
+    return names
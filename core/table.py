@@ -0,0 +1,110 @@
+"""Модуль отвечает за построение таблицы задач из объектов task."""
+
+import logging
+
+import pandas as pd
+
+import settings.readOF as config
+import core.metrics as metrics
+import core.schema as schema
+
+
+def build_task_table(tasks, columns=None, strict=True, index=None, skip_for_summary=(), count_as=None):
+    """Строит DataFrame из коллекции task за один проход.
+
+    На вход поступает любая итерируемая коллекция объектов task (коллекция
+    Tasks из project или заменяющие ее объекты с теми же атрибутами;
+    пустые строки проекта, None, пропускаются), список столбцов
+    schema.Column (по умолчанию схема ОФ) и признак строгого чтения.
+    Каждое поле task читается один раз, даже если оно
+    выгружается в несколько столбцов. Значения каждого поля собираются в
+    отдельный список, DataFrame создается один раз в конце, и его столбцы
+    целиком приводятся к типам схемы. Если strict равен False, то вместо
+    значения, которое не удалось прочитать, записывается
+    config.READ_ERROR_VALUE (такой столбец к типу не приводится), иначе
+    выбрасывается исключение.
+    Если задан index, значения этого атрибута task (например UniqueID)
+    становятся индексом DataFrame.
+    Поля из skip_for_summary у суммарных задач (Summary) не читаются,
+    вместо них записывается None (их вычисляет core.hierarchy.rollup).
+    Если задан count_as, количество фактических чтений полей task
+    (включая индекс и Summary) добавляется в счетчик замеров с этим
+    именем (см. core.metrics.count), например 'com_calls' для задач из COM.
+    """
+    if columns is None:
+        columns = schema.get_columns()
+    attributes = list(dict.fromkeys(column.attribute for column in columns))
+    buffers = [[] for _ in attributes]
+    failed = set()
+    labels = []
+    reads = 0
+    try:
+        for t in tasks:
+            if t is None:
+                continue
+            if index is not None:
+                reads += 1
+                labels.append(getattr(t, index))
+            summary = False
+            if skip_for_summary:
+                reads += 1
+                try:
+                    summary = bool(t.Summary)
+                except Exception:
+                    summary = False
+            for attribute, buffer in zip(attributes, buffers):
+                if summary and (attribute in skip_for_summary or attribute == 'Summary'):
+                    buffer.append(True if attribute == 'Summary' else None)
+                    continue
+                reads += 1
+                try:
+                    data = getattr(t, attribute)
+                except Exception:
+                    if strict:
+                        logging.error('%s: Неверный идентификатор столбца project', build_task_table.__name__)
+                        raise Exception('Неверный идентификатор столбца project')
+                    data = config.READ_ERROR_VALUE
+                    failed.add(attribute)
+                buffer.append(data)
+    finally:
+        if count_as is not None:
+            metrics.count(count_as, reads)
+    values = dict(zip(attributes, buffers))
+    headers = [column.header for column in columns]
+    data = pd.DataFrame({column.header: values[column.attribute] for column in columns}, columns=headers,
+                        index=pd.Index(labels, name=index) if index is not None else None)
+    return schema.normalize_frame(data, columns, {column.header for column in columns
+                                                  if column.attribute in failed})
+
+
+def iter_task_rows(tasks, columns=None, count_as=None):
+    """Возвращает строки ОФ по одной, не строя таблицу задач.
+
+    На вход поступает коллекция task и список столбцов schema.Column
+    (по умолчанию схема ОФ). Каждая строка - кортеж значений в порядке
+    столбцов в том виде, в каком они записываются в ОФ (см.
+    schema.output_value). Каждое поле task читается один раз, значение,
+    которое не удалось прочитать, заменяется на config.READ_ERROR_VALUE.
+    Пустые строки проекта (None) пропускаются. count_as - как в build_task_table.
+    """
+    if columns is None:
+        columns = schema.get_columns()
+    attributes = list(dict.fromkeys(column.attribute for column in columns))
+    positions = [attributes.index(column.attribute) for column in columns]
+    kinds = [column.kind for column in columns]
+    reads = 0
+    try:
+        for t in tasks:
+            if t is None:
+                continue
+            values = []
+            for attribute in attributes:
+                reads += 1
+                try:
+                    values.append(getattr(t, attribute))
+                except Exception:
+                    values.append(config.READ_ERROR_VALUE)
+            yield tuple(schema.output_value(values[position], kind) for position, kind in zip(positions, kinds))
+    finally:
+        if count_as is not None:
+            metrics.count(count_as, reads)
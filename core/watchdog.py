@@ -0,0 +1,233 @@
+"""Модуль отвечает за обработку файлов в отдельных процессах с ограничением времени.
+
+Каждый процесс-обработчик (Worker) держит собственный пул MS Project и
+выполняет функции по одной. Если функция не завершилась за отведенное
+время (например, MS Project завис на поврежденном файле или показал
+модальное окно), процесс-обработчик и запущенные им экземпляры MS Project
+принудительно завершаются, и для следующего файла запускается новый.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from core.backend import SessionPool
+
+CLOSE_TIMEOUT = 30  # Сколько секунд ждать штатного завершения процесса-обработчика, прежде чем завершить его.
+
+
+class FileTimeout(Exception):
+    """Обработка файла не завершилась за отведенное время."""
+
+
+class _ReportingBackend:
+    """Обертка над объектом для работы с MS Project, которая сообщает родителю id запущенных процессов."""
+
+    def __init__(self, backend, connection):
+        self._backend = backend
+        self._connection = connection
+        self._process_ids = {}
+
+    def start(self):
+        msp = self._backend.start()
+        process_id = getattr(self._backend, 'process_id', lambda _: None)(msp)
+        if process_id is not None:
+            self._process_ids[id(msp)] = process_id
+            self._connection.send(('started', process_id))
+        return msp
+
+    def open(self, msp, path):
+        return self._backend.open(msp, path)
+
+    def close_file(self, msp, save=False):
+        self._backend.close_file(msp, save)
+
+    def quit(self, msp):
+        try:
+            self._backend.quit(msp)
+        finally:
+            process_id = self._process_ids.pop(id(msp), None)
+            if process_id is not None:
+                self._connection.send(('stopped', process_id))
+
+
+def _serve(connection, backend_factory):
+    """Цикл процесса-обработчика: получает (функция, аргументы), вызывает function(*args, pool) и отправляет ответ."""
+
+    with SessionPool(_ReportingBackend(backend_factory(), connection)) as pool:
+        while True:
+            try:
+                task = connection.recv()
+            except EOFError:
+                return
+            if task is None:
+                return
+            function, args = task
+            try:
+                answer = ('result', function(*args, pool))
+            except Exception as error:
+                answer = ('error', str(error))
+            connection.send(answer)
+
+
+class Worker:
+    """Процесс-обработчик с собственным пулом MS Project.
+
+    call() передает функцию в процесс и ждет ответа не дольше timeout
+    секунд. По истечении времени процесс и запущенные им экземпляры
+    MS Project завершаются, процесс запускается заново, а call()
+    выбрасывает FileTimeout.
+    """
+
+    def __init__(self, backend_factory):
+        self.backend_factory = backend_factory
+        self.process_ids = set()
+        self._start()
+
+    def _start(self):
+        self._connection, child_connection = multiprocessing.Pipe()
+        self._process = multiprocessing.Process(target=_serve, args=(child_connection, self.backend_factory),
+                                                daemon=True)
+        self._process.start()
+        child_connection.close()
+
+    def call(self, function, args, timeout=None):
+        """Вызывает function(*args, pool) в процессе-обработчике и возвращает результат.
+
+        Функция и аргументы должны сериализоваться pickle. Ошибка внутри
+        функции выбрасывается как Exception с ее текстом.
+        """
+        self._connection.send((function, args))
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not self._connection.poll(remaining):
+                logging.error('%s: Обработка не завершилась за %s с, перезапускаем обработчик',
+                              self.call.__name__, timeout)
+                self.restart()
+                raise FileTimeout(f'Обработка не завершилась за {timeout} с')
+            try:
+                kind, value = self._connection.recv()
+            except (EOFError, OSError):
+                logging.error('%s: Процесс-обработчик завершился аварийно', self.call.__name__)
+                self.restart()
+                raise Exception('Процесс-обработчик завершился аварийно')
+            if kind == 'started':
+                self.process_ids.add(value)
+            elif kind == 'stopped':
+                self.process_ids.discard(value)
+            elif kind == 'result':
+                return value
+            else:
+                raise Exception(value)
+
+    def kill(self):
+        """Принудительно завершает процесс-обработчик и запущенные им экземпляры MS Project."""
+
+        self._process.kill()
+        self._process.join()
+        self._connection.close()
+        for process_id in self.process_ids:
+            try:
+                os.kill(process_id, signal.SIGTERM)
+            except OSError:
+                pass
+        self.process_ids.clear()
+
+    def restart(self):
+        """Завершает процесс-обработчик и запускает новый."""
+
+        self.kill()
+        self._start()
+
+    def close(self):
+        """Завершает процесс-обработчик штатно, а если он не отвечает - принудительно."""
+
+        try:
+            self._connection.send(None)
+        except OSError:
+            pass
+        self._process.join(CLOSE_TIMEOUT)
+        if self._process.is_alive():
+            self.kill()
+        else:
+            self._connection.close()
+
+
+def iter_calls(function, items, workers, backend_factory, timeout, cancel=None, on_start=None):
+    """Выполняет function(*item, pool) для каждого набора аргументов в процессах-обработчиках.
+
+    На вход поступает функция, список наборов аргументов, количество
+    процессов, фабрика объектов для работы с MS Project, ограничение
+    времени на один вызов в секундах (None - без ограничения),
+    необязательный объект threading.Event для отмены и необязательная
+    функция on_start(номер набора), которая вызывается из потока
+    процесса-обработчика перед передачей ему набора. Функция по одному
+    возвращает пары (результат, исключение или None) в порядке items,
+    при превышении времени исключение - FileTimeout. Если не запустился
+    ни один процесс-обработчик, для оставшихся наборов возвращается
+    ошибка запуска. После отмены новые вызовы не начинаются, начатые
+    дописываются.
+    """
+    items = list(items)
+    if not items:
+        return
+    numbers = itertools.count()
+    outcomes = {}
+    condition = threading.Condition()
+    stop = threading.Event()
+    running = [0]
+    start_errors = []
+
+    def drive():
+        worker = None
+        try:
+            worker = Worker(backend_factory)
+            while not stop.is_set() and not (cancel is not None and cancel.is_set()):
+                with condition:
+                    number = next(numbers)
+                if number >= len(items):
+                    return
+                if on_start is not None:
+                    on_start(number)
+                try:
+                    outcome = (worker.call(function, items[number], timeout), None)
+                except Exception as error:
+                    outcome = (None, error)
+                with condition:
+                    outcomes[number] = outcome
+                    condition.notify_all()
+        except Exception as error:
+            logging.error('%s: Не удалось запустить процесс-обработчик: %s', iter_calls.__name__, error)
+            start_errors.append(error)
+        finally:
+            if worker is not None:
+                worker.close()
+            with condition:
+                running[0] -= 1
+                condition.notify_all()
+
+    threads = [threading.Thread(target=drive, daemon=True) for _ in range(max(1, min(workers, len(items))))]
+    running[0] = len(threads)
+    for thread in threads:
+        thread.start()
+    try:
+        for number in range(len(items)):
+            with condition:
+                while number not in outcomes and running[0]:
+                    condition.wait()
+                if number in outcomes:
+                    outcome = outcomes.pop(number)
+                elif start_errors and not (cancel is not None and cancel.is_set()):
+                    outcome = (None, start_errors[0])
+                else:
+                    return
+            yield outcome
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
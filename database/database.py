@@ -1,56 +1,180 @@
-"""Модуль отвечает за работу с базой данных"""
+"""Модуль отвечает за работу с базой данных истории запусков.
 
-import sqlite3
-import os
-
-
-def create_database():
-    """Функция создает базу данных"""
-
-    conn = sqlite3.connect('example1.db')
-    c = conn.cursor()
-
-    c.execute('''CREATE TABLE IF NOT EXISTS my_table
-                 (col1 TEXT, col2 TEXT, col3 TEXT, col4 BOOLEAN)''')
-
-    conn.commit()
-
-    conn.close()
-
-
-def fill_data(list1, list2, string):
-    """Функция заполняет строку в базе данных."""
-
-    conn = sqlite3.connect('example1.db')
-    c = conn.cursor()
+В базе хранятся запуски (runs), обработанные в них файлы (files) с
+результатом и длительностью, а также длительности отдельных этапов
+обработки файла (stage_timings) и этапов запуска, которые не относятся
+к одному файлу, например копирования в резервную папку (run_stages).
+"""
 
-    for item1, item2 in zip(list1, list2):
-        if item1 is None:
-            col4_value = "False"
-        else:
-            col4_value = "True"
-        if item1 is not None:
-            item1 = os.path.splitext(os.path.basename(item1))[0]
-        if item2 is not None:
-            item2 = os.path.splitext(os.path.basename(item2))[0]
-        c.execute("INSERT INTO my_table VALUES (?, ?, ?, ?)", (item1, item2, string, col4_value))
-
-    conn.commit()
-
-    conn.close()
-
-
-def view_data():
-    """Функция выводит в консоль содержимое базы данных."""
-
-    conn = sqlite3.connect('example.db')
-    c = conn.cursor()
-
-    c.execute("SELECT * FROM my_table")
-
-    rows = c.fetchall()
-
-    for row in rows:
-        print(row)
-
-    conn.close()
+import datetime
+import os
+import sqlite3
+import threading
+
+import settings.database as config
+
+_store = None  # Хранилище текущего процесса.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    workers INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    file_name TEXT NOT NULL,
+    path TEXT NOT NULL,
+    output_path TEXT,
+    success INTEGER NOT NULL CHECK (success IN (0, 1)),
+    error TEXT,
+    duration REAL
+);
+CREATE TABLE IF NOT EXISTS stage_timings (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS run_stages (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_started_at ON runs(started_at);
+CREATE INDEX IF NOT EXISTS files_file_name ON files(file_name);
+CREATE INDEX IF NOT EXISTS files_run_id ON files(run_id);
+CREATE INDEX IF NOT EXISTS stage_timings_file_id ON stage_timings(file_id);
+CREATE INDEX IF NOT EXISTS run_stages_run_id ON run_stages(run_id);
+"""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+class RunStore:
+    """История запусков в SQLite.
+
+    Держит одно соединение в режиме WAL на все время работы, файлы
+    запуска и длительности их этапов записываются в одной транзакции.
+    """
+
+    def __init__(self, path=config.PATH_TO_DATABASE):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Закрывает соединение."""
+
+        self._conn.close()
+
+    def start_run(self, mode, workers=1):
+        """Создает запись о запуске и возвращает ее id.
+
+        mode - 'export' для выгрузки ОФ или 'fact' для внесения факта.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.execute("INSERT INTO runs (mode, started_at, workers) VALUES (?, ?, ?)",
+                                        (mode, _now(), workers))
+        return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        """Отмечает время окончания запуска."""
+
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (_now(), run_id))
+
+    def add_files(self, run_id, records):
+        """Записывает результаты обработки файлов запуска.
+
+        На вход поступает id запуска и список словарей с ключами path,
+        output_path, success, а также необязательными error, duration и
+        stages (словарь: этап -> длительность в секундах).
+        """
+        if not records:
+            return
+        rows = [(run_id, os.path.splitext(os.path.basename(r['path']))[0], r['path'], r.get('output_path'),
+                 int(bool(r['success'])), r.get('error'), r.get('duration')) for r in records]
+        timings = []
+        with self._lock, self._conn:
+            for row, record in zip(rows, records):
+                file_id = self._conn.execute("INSERT INTO files (run_id, file_name, path, output_path, success, "
+                                             "error, duration) VALUES (?, ?, ?, ?, ?, ?, ?)", row).lastrowid
+                timings.extend((file_id, stage, duration)
+                               for stage, duration in (record.get('stages') or {}).items())
+            self._conn.executemany("INSERT INTO stage_timings (file_id, stage, duration) VALUES (?, ?, ?)",
+                                   timings)
+
+    def add_run_stages(self, run_id, stages):
+        """Записывает длительности этапов запуска (словарь: этап -> длительность в секундах)."""
+
+        if not stages:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO run_stages (run_id, stage, duration) VALUES (?, ?, ?)",
+                                   [(run_id, stage, duration) for stage, duration in stages.items()])
+
+    def slowest_files(self, last_runs=30, limit=20):
+        """Самые медленные файлы за последние запуски.
+
+        Возвращает список (имя файла, средняя длительность, максимальная
+        длительность, число обработок), отсортированный по средней длительности.
+        """
+        return self._conn.execute("""
+            SELECT file_name, AVG(duration), MAX(duration), COUNT(*)
+            FROM files
+            WHERE duration IS NOT NULL
+              AND run_id IN (SELECT id FROM runs ORDER BY started_at DESC, id DESC LIMIT ?)
+            GROUP BY file_name
+            ORDER BY AVG(duration) DESC
+            LIMIT ?""", (last_runs, limit)).fetchall()
+
+    def failed_twice_in_row(self):
+        """Файлы, обработка которых завершилась ошибкой в двух последних запусках подряд."""
+
+        rows = self._conn.execute("""
+            WITH ranked AS (
+                SELECT f.file_name, f.success,
+                       ROW_NUMBER() OVER (PARTITION BY f.file_name
+                                          ORDER BY r.started_at DESC, f.id DESC) AS n
+                FROM files f JOIN runs r ON r.id = f.run_id)
+            SELECT file_name FROM ranked
+            WHERE n <= 2
+            GROUP BY file_name
+            HAVING COUNT(*) = 2 AND SUM(success) = 0
+            ORDER BY file_name""").fetchall()
+        return [row[0] for row in rows]
+
+    def slowest_stages(self, last_runs=30):
+        """Суммарная и средняя длительность этапов файлов и запусков за последние запуски."""
+
+        return self._conn.execute("""
+            WITH recent AS (SELECT id FROM runs ORDER BY started_at DESC, id DESC LIMIT ?),
+                 timings AS (
+                    SELECT s.stage, s.duration
+                    FROM stage_timings s JOIN files f ON f.id = s.file_id
+                    WHERE f.run_id IN recent
+                    UNION ALL
+                    SELECT stage, duration FROM run_stages WHERE run_id IN recent)
+            SELECT stage, SUM(duration), AVG(duration), COUNT(*)
+            FROM timings
+            GROUP BY stage
+            ORDER BY SUM(duration) DESC""", (last_runs,)).fetchall()
+
+
+def get_store():
+    """Возвращает хранилище истории запусков текущего процесса."""
+
+    global _store
+    if _store is None:
+        _store = RunStore()
+    return _store
@@ -0,0 +1,187 @@
+"""Модуль отвечает за журнал пакетной обработки, по которому прерванный пакет продолжается.
+
+Пакет (batches) - обработка файлов из одной папки в другую в одном режиме.
+Для каждого файла пакета (batch_files) хранится состояние:
+pending - еще не обрабатывался, running - передан на обработку, но
+результат не записан, done - обработан, failed - обработка не удалась.
+Состояние записывается сразу после обработки файла, поэтому после
+перезапуска приложения незавершенный пакет продолжается: обрабатываются
+только файлы не в состоянии done. Если приложение завершилось аварийно,
+файлы, которые оно обрабатывало, остаются в состоянии running.
+Пакет, начатый больше config.RESUME_MAX_AGE_HOURS часов назад, не
+продолжается: он закрывается, и создается новый.
+"""
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from collections import namedtuple
+
+import settings.database as config
+
+_journal = None  # Журнал текущего процесса.
+
+STATES = ('pending', 'running', 'done', 'failed')  # Состояния файла пакета.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    mode TEXT NOT NULL,
+    source TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS batch_files (
+    batch_id INTEGER NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    version TEXT,
+    state TEXT NOT NULL CHECK (state IN ('pending', 'running', 'done', 'failed')),
+    output_path TEXT,
+    error TEXT,
+    duration REAL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (batch_id, path)
+);
+CREATE INDEX IF NOT EXISTS batches_open ON batches(mode, source, destination, finished_at);
+"""
+
+Entry = namedtuple('Entry', ['path', 'version', 'state', 'output_path', 'error', 'duration'])
+Entry.__doc__ = """Файл пакета: путь до исходного файла, версия (хэш содержимого), состояние,
+путь до результата, причина неудачи и длительность обработки в секундах."""
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def _older_than(timestamp, hours):
+    """Проверяет, что время timestamp (в формате _now) было больше hours часов назад."""
+
+    if hours is None:
+        return False
+    return datetime.datetime.now() - datetime.datetime.fromisoformat(timestamp) > datetime.timedelta(hours=hours)
+
+
+class BatchJournal:
+    """Журнал пакетной обработки в SQLite (в той же базе, что и история запусков)."""
+
+    def __init__(self, path=config.PATH_TO_DATABASE):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        """Закрывает соединение."""
+
+        self._conn.close()
+
+    def open_batch(self, mode, source, destination, files, resume=True, max_age_hours=config.RESUME_MAX_AGE_HOURS):
+        """Открывает пакет и возвращает пару (id пакета, признак продолжения прерванного пакета).
+
+        На вход поступает режим ('export' или 'fact'), исходная папка,
+        папка для результатов и список пар (путь до файла, версия). Если
+        есть незавершенный пакет с теми же режимом и папками, он
+        продолжается: новые файлы добавляются как pending, файлы, которых
+        больше нет, удаляются из пакета, а файлы с другой версией или без
+        файла результата снова становятся pending. Иначе создается новый пакет.
+        Незавершенный пакет не продолжается, а закрывается, если resume
+        ложно или он начат больше max_age_hours часов назад (None - без
+        ограничения).
+        """
+        files = list(files)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id, started_at FROM batches WHERE mode = ? AND source = ? "
+                                     "AND destination = ? AND finished_at IS NULL ORDER BY id DESC LIMIT 1",
+                                     (mode, source, destination)).fetchone()
+            if row is not None and (not resume or _older_than(row[1], max_age_hours)):
+                logging.info('%s: Прерванный пакет %s не продолжается, обработка начинается заново',
+                             self.open_batch.__name__, row[0])
+                self._conn.execute("UPDATE batches SET finished_at = ? WHERE finished_at IS NULL AND mode = ? "
+                                   "AND source = ? AND destination = ?", (_now(), mode, source, destination))
+                row = None
+            resumed = row is not None
+            if resumed:
+                batch_id = row[0]
+                known = {path: (version, state, output_path) for path, version, state, output_path in
+                         self._conn.execute("SELECT path, version, state, output_path FROM batch_files "
+                                            "WHERE batch_id = ?", (batch_id,))}
+                paths = {path for path, _ in files}
+                self._conn.executemany("DELETE FROM batch_files WHERE batch_id = ? AND path = ?",
+                                       [(batch_id, path) for path in known if path not in paths])
+                stale = [(_now(), batch_id, path) for path, version in files
+                         if path in known and known[path][1] == 'done'
+                         and (known[path][0] != version or not known[path][2] or not os.path.exists(known[path][2]))]
+                self._conn.executemany("UPDATE batch_files SET state = 'pending', output_path = NULL, error = NULL, "
+                                       "updated_at = ? WHERE batch_id = ? AND path = ?", stale)
+            else:
+                batch_id = self._conn.execute("INSERT INTO batches (mode, source, destination, started_at) "
+                                              "VALUES (?, ?, ?, ?)", (mode, source, destination, _now())).lastrowid
+            now = _now()
+            self._conn.executemany("INSERT INTO batch_files (batch_id, position, path, version, state, updated_at) "
+                                   "VALUES (?, ?, ?, ?, 'pending', ?) ON CONFLICT (batch_id, path) "
+                                   "DO UPDATE SET position = excluded.position, version = excluded.version",
+                                   [(batch_id, position, path, version, now)
+                                    for position, (path, version) in enumerate(files)])
+        return batch_id, resumed
+
+    def remaining(self, batch_id):
+        """Возвращает пути до файлов пакета, которые еще нужно обработать (все, кроме done), по порядку."""
+
+        rows = self._conn.execute("SELECT path FROM batch_files WHERE batch_id = ? AND state != 'done' "
+                                  "ORDER BY position", (batch_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_running(self, batch_id, paths):
+        """Отмечает файлы как переданные на обработку."""
+
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE batch_files SET state = 'running', updated_at = ? "
+                                   "WHERE batch_id = ? AND path = ?", [(now, batch_id, path) for path in paths])
+
+    def mark_finished(self, batch_id, path, output_path, error=None, duration=None):
+        """Записывает результат обработки файла: done, если есть результат, иначе failed."""
+
+        state = 'done' if output_path is not None else 'failed'
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE batch_files SET state = ?, output_path = ?, error = ?, duration = ?, "
+                               "updated_at = ? WHERE batch_id = ? AND path = ?",
+                               (state, output_path, error, duration, _now(), batch_id, path))
+
+    def release(self, batch_id):
+        """Возвращает в pending файлы, которые были переданы на обработку, но не обработаны (после отмены)."""
+
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE batch_files SET state = 'pending', updated_at = ? "
+                               "WHERE batch_id = ? AND state = 'running'", (_now(), batch_id))
+
+    def entries(self, batch_id):
+        """Возвращает все файлы пакета по порядку в виде списка Entry."""
+
+        rows = self._conn.execute("SELECT path, version, state, output_path, error, duration FROM batch_files "
+                                  "WHERE batch_id = ? ORDER BY position", (batch_id,)).fetchall()
+        return [Entry(*row) for row in rows]
+
+    def finish_batch(self, batch_id):
+        """Отмечает пакет завершенным, после этого он больше не продолжается."""
+
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE batches SET finished_at = ? WHERE id = ?", (_now(), batch_id))
+
+
+def get_journal():
+    """Возвращает журнал пакетной обработки текущего процесса."""
+
+    global _journal
+    if _journal is None:
+        _journal = BatchJournal()
+    return _journal
@@ -0,0 +1,234 @@
+"""Модуль отвечает за сводную базу задач всех выгруженных проектов.
+
+Каждая выгрузка ОФ (exports) кроме файла Excel может записываться в одну
+базу SQLite: задачи проекта (tasks) хранятся в столбцах по полям task из
+схемы ОФ. Так аналитика по всем проектам - один запрос к базе, а не
+чтение сотен файлов ОФ. Повторная выгрузка того же проекта в тот же день
+заменяет прежнюю.
+"""
+
+import datetime
+import logging
+import math
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+import settings.database as config
+import settings.readOF as config_for_readOF
+import core.schema as schema
+
+_store = None  # Сводная база текущего процесса.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS exports (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    path TEXT NOT NULL,
+    export_date TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    finished_at TEXT,
+    task_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    export_id INTEGER NOT NULL REFERENCES exports(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS exports_project_date ON exports(project, export_date);
+CREATE INDEX IF NOT EXISTS tasks_export_id ON tasks(export_id);
+CREATE VIEW IF NOT EXISTS latest_tasks AS
+    SELECT e.project, e.export_date, t.*
+    FROM tasks t JOIN exports e ON e.id = t.export_id
+    WHERE e.id IN (SELECT MAX(id) FROM exports WHERE finished_at IS NOT NULL GROUP BY project);
+"""
+
+_SQL_TYPES = {'text': 'TEXT', 'category': 'TEXT', 'bool': 'INTEGER', 'int': 'INTEGER', 'float': 'REAL',
+              'date': 'TEXT'}  # Тип столбца SQLite для типа значения схемы ОФ.
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+
+def _sql_value(value, kind):
+    """Приводит значение строки ОФ (см. schema.output_value) к значению SQLite.
+
+    Даты хранятся строками ГГГГ-ММ-ДД, признаки - 0 и 1, пустые значения,
+    config.NA_VALUE и config.READ_ERROR_VALUE - NULL.
+    """
+    if value is None or isinstance(value, str) and value in (config_for_readOF.NA_VALUE,
+                                                             config_for_readOF.READ_ERROR_VALUE):
+        return None
+    if hasattr(value, 'item'):
+        value = value.item()
+    if kind == 'date':
+        return value.isoformat()[:10] if isinstance(value, datetime.date) else None
+    if kind == 'bool':
+        return int(bool(value))
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class Export:
+    """Выгрузка одного проекта в сводную базу, строки добавляются пачками."""
+
+    def __init__(self, store, export_id, columns):
+        self._store = store
+        self.id = export_id
+        self.count = 0
+        self.error = None  # Ошибка записи строк в базу в tee.
+        # Одно поле task может выгружаться в несколько столбцов ОФ, в базу пишется первый.
+        self._positions = {}
+        for position, column in enumerate(columns):
+            self._positions.setdefault(column.attribute, (position, column.kind))
+        names = ", ".join(f'"{attribute}"' for attribute in self._positions)
+        marks = ", ".join("?" * (len(self._positions) + 1))
+        self._insert = f"INSERT INTO tasks (export_id, {names}) VALUES ({marks})"
+
+    def add(self, rows):
+        """Добавляет строки ОФ (кортежи значений в порядке столбцов) в одной транзакции."""
+
+        values = [(self.id, *(_sql_value(row[position], kind) for position, kind in self._positions.values()))
+                  for row in rows]
+        if values:
+            self._store.execute_many(self._insert, values)
+            self.count += len(values)
+
+    def tee(self, rows, chunk_rows=config.EXPORT_CHUNK_ROWS):
+        """Возвращает строки без изменений, по пути добавляя их в базу пачками по chunk_rows.
+
+        Ошибка записи в базу не прерывает поток строк: она записывается в
+        журнал и в error, дальше строки в базу не добавляются, а при выходе
+        из TaskStore.export выгрузка удаляется.
+        """
+        chunk = []
+        for row in rows:
+            if self.error is None:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    self._add_quietly(chunk)
+                    chunk = []
+            yield row
+        if self.error is None:
+            self._add_quietly(chunk)
+
+    def _add_quietly(self, rows):
+        try:
+            self.add(rows)
+        except Exception as error:
+            logging.error('%s: Не удалось записать задачи в сводную базу: %s', self.tee.__name__, error)
+            self.error = error
+
+
+class TaskStore:
+    """Сводная база задач выгруженных проектов в SQLite.
+
+    Столбцы таблицы tasks - поля task из схемы ОФ, недостающие столбцы
+    добавляются при открытии базы. Задачи выгрузки пишутся короткими
+    транзакциями, выгрузка считается завершенной (и попадает в
+    представление latest_tasks) только после выхода из export без ошибки.
+    """
+
+    def __init__(self, path=config.PATH_TO_TASKS_DATABASE):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=config.DATABASE_TIMEOUT, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            self._add_columns(schema.get_columns())
+
+    def _add_columns(self, columns):
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(tasks)")}
+        for column in columns:
+            if column.attribute not in existing:
+                self._conn.execute(f'ALTER TABLE tasks ADD COLUMN "{column.attribute}" {_SQL_TYPES[column.kind]}')
+                existing.add(column.attribute)
+        if 'Text4' in existing:
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_text4 ON tasks(Text4)")
+
+    def close(self):
+        """Закрывает соединение."""
+
+        self._conn.close()
+
+    def execute_many(self, sql, rows):
+        """Выполняет запрос для всех строк в одной транзакции."""
+
+        with self._lock, self._conn:
+            self._conn.executemany(sql, rows)
+
+    @contextmanager
+    def export(self, path_to_project, columns=None, export_date=None):
+        """Открывает выгрузку проекта и возвращает объект Export.
+
+        Проект определяется по имени файла без расширения. При выходе
+        без ошибки выгрузка отмечается завершенной, а прежние выгрузки
+        этого проекта за тот же день удаляются. При ошибке удаляется
+        сама выгрузка, так же как после ошибки записи строк в tee (в этом
+        случае исключение не выбрасывается).
+        """
+        if columns is None:
+            columns = schema.get_columns()
+        project = os.path.splitext(os.path.basename(path_to_project))[0]
+        export_date = (export_date or datetime.date.today()).isoformat()
+        with self._lock, self._conn:
+            cursor = self._conn.execute("INSERT INTO exports (project, path, export_date, started_at) "
+                                        "VALUES (?, ?, ?, ?)", (project, path_to_project, export_date, _now()))
+        export = Export(self, cursor.lastrowid, columns)
+        try:
+            yield export
+        except BaseException:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM exports WHERE id = ?", (export.id,))
+            raise
+        if export.error is not None:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM exports WHERE id = ?", (export.id,))
+            return
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM exports WHERE project = ? AND export_date = ? AND id != ?",
+                               (project, export_date, export.id))
+            self._conn.execute("UPDATE exports SET finished_at = ?, task_count = ? WHERE id = ?",
+                               (_now(), export.count, export.id))
+
+    def add_table(self, path_to_project, data, export_date=None):
+        """Записывает таблицу задач проекта (DataFrame со столбцами ОФ) как одну выгрузку."""
+
+        columns = [column for column in schema.get_columns() if column.header in data.columns]
+        output = schema.for_output(data[[column.header for column in columns]])
+        with self.export(path_to_project, columns, export_date) as export:
+            export.add(output.itertuples(index=False, name=None))
+        return export.count
+
+    def read_latest(self, projects=None):
+        """Возвращает DataFrame с задачами последней выгрузки каждого проекта.
+
+        Столбцы называются по полям task, даты приводятся к datetime64.
+        Если передан список projects, возвращаются только эти проекты.
+        """
+        dates = list(dict.fromkeys(column.attribute for column in schema.get_columns() if column.kind == 'date'))
+        query = "SELECT * FROM latest_tasks"
+        params = ()
+        if projects is not None:
+            projects = list(projects)
+            query += f" WHERE project IN ({', '.join('?' * len(projects))})"
+            params = projects
+        return pd.read_sql_query(query, self._conn, params=params, parse_dates=dates)
+
+
+def get_store():
+    """Возвращает сводную базу задач текущего процесса или None, если запись в нее выключена."""
+
+    global _store
+    if not config.EXPORT_TO_DATABASE:
+        return None
+    if _store is None:
+        _store = TaskStore()
+    return _store
@@ -1,14 +1,20 @@
 """Модуль отвечает за интерфейс приложения. Также в нем содержится управляющая функция всего проекта."""
 
+import logging
+import multiprocessing
 import os
+import queue
+import threading
 
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, filedialog
 
-import core.readOF as readOF
+import core.runner as runner
 import settings.interface as config_for_interface
-import core.fact as fact
-import core.io as oi
+
+_events = queue.Queue()  # События фонового потока обработки для окна.
+_cancel = threading.Event()  # Признак отмены обработки.
+_worker = None  # Фоновый поток обработки.
 
 
 def choose_folder(folder_id):
@@ -40,21 +46,6 @@ def choose_folder(folder_id):
             return
 
 
-def _get_paths_to_file(directory):
-    """Функция для получения абсолютных путей до файлов в папке.
-
-    На вход поступает путь до папки. Функция возвращает список с
-    абсолютными путями до всех файлов лежащих в этой папке
-    и во вложенных папках.
-    """
-    file_paths = []
-    for root, directories, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.abspath(os.path.join(root, file))
-            file_paths.append(file_path)
-    return file_paths
-
-
 def _update_progress(value, count):
     """Функция обновляет значение количества загруженных файлов.
 
@@ -92,23 +83,70 @@ def _change_after_work(value):
     labels[-2].place_forget()
     _switch_info_labels(value)
     labels[-1].place_configure(relx=0.025, rely=0.5)
-    buttons[2].configure(bg="#118844")
+    buttons[2].configure(state="normal", bg="#118844")
     buttons[3].configure(state="normal", bg="#1166EE")
     buttons[4].configure(state="normal", bg="#1166EE")
 
 
-def _find_name(list_projects, excel_path):
-    """Функция ищет файл project, которому соответствует конкретная обменная форма.
+def _run_in_background(folder_id):
+    """Выполняет обработку в фоновом потоке и передает события окну через очередь."""
+
+    def on_event(kind, data):
+        _events.put((kind, data))
 
-    На вход поступает список с абсолютными путями до файлов project,
-    и путь до обменной формы. На выход поступает абсолютный путь до файла project
-    c таким же именем.
+    try:
+        if folder_id == 1:
+            runner.run_export(config_for_interface.path_to_from_folder, config_for_interface.path_to_to_folder,
+                              config_for_interface.WORKERS, on_event, _cancel)
+        elif folder_id == 2:
+            runner.run_fact(config_for_interface.path_to_from_folder, config_for_interface.path_to_to_folder,
+                            on_event, _cancel)
+    except Exception as e:
+        logging.error('%s: Обработка прервана: %s', _run_in_background.__name__, e)
+        on_event('error', str(e))
+
+
+def _poll_events():
+    """Забирает события фонового потока из очереди и отображает их в окне.
+
+    За один раз обрабатывается не больше MAX_EVENTS_PER_POLL событий, строки
+    результатов добавляются в текстовое поле одной вставкой. Пока фоновый
+    поток работает, функция планирует свой следующий вызов.
     """
-    name = os.path.splitext(os.path.basename(excel_path))[0]
-    for path in list_projects:
-        file_name = os.path.splitext(os.path.basename(path))[0]
-        if file_name == name:
-            return path
+    lines = []
+    for _ in range(config_for_interface.MAX_EVENTS_PER_POLL):
+        try:
+            kind, data = _events.get_nowait()
+        except queue.Empty:
+            break
+        if kind == 'start':
+            _update_progress(0, data)
+        elif kind == 'progress':
+            _update_progress(*data)
+        elif kind == 'file':
+            config_for_interface.path_to_results.append(data.output)
+            status = "Успешно" if data.output is not None else "Не успешно"
+            lines.append(f"{os.path.basename(data.path)}    -    {status}\n")
+        elif kind == 'error':
+            messagebox.showerror("Ошибка", data)
+        elif kind == 'done':
+            # Итог строится по журналу пакета и включает файлы, обработанные до прерывания.
+            config_for_interface.path_to_results[:] = [result.output for result in data.results]
+            if data.resumed:
+                lines.append(f"Продолжена прерванная обработка, файлов из прошлых запусков: {data.resumed}\n")
+            if data.cache_stats.hits or data.cache_stats.misses:
+                lines.append(f"Кэш таблиц задач: {data.cache_stats}\n")
+            if data.cancelled:
+                lines.append("Обработка отменена\n")
+            elif data.unfinished:
+                lines.append(f"Не обработано файлов: {data.unfinished}\n")
+    if lines:
+        text_area.insert(tk.INSERT, "".join(lines))
+    if _worker.is_alive() or not _events.empty():
+        window.after(config_for_interface.POLL_INTERVAL_MS, _poll_events)
+        return
+    buttons[5].configure(state="disable", bg="#969699")
+    _change_after_work(len(config_for_interface.path_to_results))
 
 
 def start_click(folder_id):
@@ -117,83 +155,32 @@ def start_click(folder_id):
     На вход поступает id кнопки.
     folder_id = 1 - выполняется выгрузка обменных форм
     folder_id = 2 - выполняется внесение факта в файл project
-    Перед выполнением основного функционала, функция выполняет подготовку.
-    То есть создает резервную папку, получает абсолютные пути до нужных файлов.
-    Затем вызывает управляющую функцию из модуля, в котором содержится нужный
-    функционал. Затем сохраняет полученные результаты в необходимые папки.
+    Обработка (подготовка резервной папки, вызов управляющих функций модулей
+    и сохранение результатов, см. core.runner) выполняется в фоновом потоке,
+    чтобы окно не зависало. Окно получает от него события через очередь
+    и проверяет ее с помощью after().
     """
-    if not os.path.exists(config_for_interface.PATH_TO_RESERVE_FOLDER):
-        os.mkdir(config_for_interface.PATH_TO_RESERVE_FOLDER)
-    path_to_excel_folder = config_for_interface.PATH_TO_RESERVE_FOLDER + '\\' + "OF"
-    path_to_project_folder = config_for_interface.PATH_TO_RESERVE_FOLDER + '\\' + "projects"
-    path_to_unsuccessful_folder = config_for_interface.PATH_TO_RESERVE_FOLDER + '\\' + "unsuccessful"
-    paths_to_bad_files = []
-    if not os.path.exists(path_to_excel_folder):
-        os.mkdir(path_to_excel_folder)
-    if not os.path.exists(path_to_project_folder):
-        os.mkdir(path_to_project_folder)
-    if not os.path.exists(path_to_unsuccessful_folder):
-        os.mkdir(path_to_unsuccessful_folder)
-    value = 0
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    config_for_interface.path_to_results.clear()
+    _cancel.clear()
     labels[-2].place(relx=0.025, rely=0.5)
     labels[-1].place(relx=0.025, rely=0.55)
-    _switch_info_labels(value)
-    if folder_id == 1:
-        paths_to_projects = _get_paths_to_file(config_for_interface.path_to_from_folder)
-        if paths_to_projects is None:
-            return
-        _update_progress(value, len(paths_to_projects))
-        window.update()
-        try:
-            oi.transfer_files(paths_to_projects, path_to_project_folder)
-        except Exception as e:
-            print(e)
-            messagebox.showerror("Ошибка",
-                                 e)
-            return
-        for path in paths_to_projects:
-            file_name = os.path.basename(path)
-            path = os.path.join(path_to_project_folder, file_name)
-            res = readOF.main(path, path_to_excel_folder)
-            if res is None:
-                paths_to_bad_files.append(path)
-                text_area.insert(tk.INSERT,
-                                 f"{os.path.basename(paths_to_projects[value])}    -    Не успешно\n")
-            else:
-                text_area.insert(tk.INSERT,
-                                 f"{os.path.basename(paths_to_projects[value])}    -    Успешно\n")
-            value = value + 1
-            _update_progress(value, len(paths_to_projects))
-            window.update()
-            config_for_interface.path_to_results.append(res)
-    elif folder_id == 2:
-        paths_to_excel = _get_paths_to_file(config_for_interface.path_to_from_folder)
-        paths_to_projects = _get_paths_to_file(config_for_interface.path_to_to_folder)
-        try:
-            oi.transfer_files(paths_to_projects, path_to_project_folder)
-            oi.transfer_files(paths_to_excel, path_to_excel_folder)
-        except Exception as e:
-            print(e)
-            messagebox.showerror("Ошибка",
-                                 e)
-            return
-        for path in paths_to_excel:
-            path_to_proj = _find_name(paths_to_projects, path)
-            if path_to_proj is None:
-                continue
-            fact.main(path_to_proj, path)
+    _switch_info_labels(0)
+    buttons[2].configure(state="disable")
+    buttons[5].configure(state="normal", bg="#1166EE")
+    _worker = threading.Thread(target=_run_in_background, args=(folder_id,), daemon=True)
+    _worker.start()
+    window.after(config_for_interface.POLL_INTERVAL_MS, _poll_events)
 
-    try:
-        oi.transfer_files(config_for_interface.path_to_results, config_for_interface.path_to_to_folder)
-    except Exception as e:
-        print(e)
-        messagebox.showerror("Ошибка",
-                             e)
-        return
-    if paths_to_bad_files:
-        oi.transfer_files(paths_to_bad_files, path_to_unsuccessful_folder)
 
-    _change_after_work(value)
+def cancel_click():
+    """Отменяет обработку: она остановится после текущего файла."""
+
+    _cancel.set()
+    buttons[5].configure(state="disable", bg="#969699")
+    labels[-1].configure(text="Отмена: обработка остановится после текущего файла")
 
 
 def on_window_resize(event):
@@ -249,6 +236,8 @@ def create_label(self, props):
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    logging.basicConfig(level=logging.INFO)
     window = tk.Tk()
     window.title("Приложение для работы с ОФ")
     window.geometry("1000x600")
@@ -275,7 +264,9 @@ if __name__ == '__main__':
         {"text": "Открыть резервную папку", "command": open_reserve_folder, "style": button_style_block,
          "width": 21, "relx": 0.78, "state": "disable", "rely": 0.5},
         {"text": "Открыть папку с ОФ", "command": open_folder_with_res, "style": button_style_block,
-         "width": 17, "relx": 0.6, "state": "disable", "rely": 0.5}
+         "width": 17, "relx": 0.6, "state": "disable", "rely": 0.5},
+        {"text": "Отменить", "command": cancel_click, "style": button_style_block,
+         "width": 15, "relx": 0.6, "state": "disable", "rely": 0.42}
     ]
     label_properties = [
         {"text": "Эта программа предназначена для выгрузки обменных форм из файлов project в папку",
@@ -305,4 +296,6 @@ if __name__ == '__main__':
     window.bind("<Configure>", on_window_resize)
     messagebox.showwarning("Предупреждение",
                            "Пожалуйста, закройте открытые файлы project для корректной работы программы")
+    # Модули обработки (pandas, openpyxl) импортируются в фоне, пока пользователь выбирает папки.
+    threading.Thread(target=runner.preload, daemon=True).start()
     window.mainloop()
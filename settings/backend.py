@@ -0,0 +1,8 @@
+"""Конфиг для модуля, который управляет экземплярами MS Project."""
+
+MAX_FILES_PER_APPLICATION = 20  # Сколько файлов открывается в одном экземпляре MS Project, прежде чем он
+                                # будет перезапущен. Защищает от утечек памяти в долгих выгрузках.
+
+FILE_TIMEOUT = 30 * 60  # Сколько секунд может обрабатываться один файл. Каждый файл обрабатывается в отдельном
+                        # процессе, который по истечении времени завершается вместе со своим MS Project.
+                        # None - без ограничения, файлы обрабатываются в текущем процессе.
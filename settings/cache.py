@@ -0,0 +1,8 @@
+"""Конфиг для кэша таблиц задач."""
+import os
+
+USE_CACHE = True  # Если True, таблицы задач неизмененных файлов проекта берутся из кэша без открытия MS Project.
+
+PATH_TO_CACHE_FOLDER = os.path.expanduser("~/Documents/reservFolder/cache")  # Путь до папки с кэшем.
+
+CACHE_MAX_BYTES = 2 * 1024 ** 3  # Максимальный размер кэша. Сверх него удаляются давно не использованные записи.
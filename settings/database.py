@@ -0,0 +1,10 @@
+"""Конфиг для базы данных с историей запусков и сводной базы задач."""
+import os
+
+PATH_TO_DATABASE = os.path.expanduser("~/Documents/reservFolder/history.db")  # Путь до файла базы данных.
+PATH_TO_TASKS_DATABASE = os.path.expanduser("~/Documents/reservFolder/tasks.db")  # Путь до сводной базы задач выгруженных проектов.
+EXPORT_TO_DATABASE = False  # Записывать ли задачи каждой выгруженной ОФ в сводную базу (кроме файла Excel).
+EXPORT_CHUNK_ROWS = 5000  # Количество задач, которое записывается в сводную базу за одну транзакцию при потоковой выгрузке.
+DATABASE_TIMEOUT = 60  # Сколько секунд ждать, пока база занята записью другого процесса.
+RESUME_MAX_AGE_HOURS = 72  # Сколько часов после начала прерванный пакет можно продолжить. Более старый пакет
+                          # закрывается, и обработка начинается заново. None - без ограничения.
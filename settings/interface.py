@@ -11,3 +11,16 @@ path_to_results = list()  # Список абсолютных путей до ф
 
 PATH_TO_RESERVE_FOLDER = os.path.expanduser("~/Documents/reservFolder")  # Путь до резервной папки.
 
+WORKERS = 1  # Количество процессов для выгрузки ОФ. Каждый процесс запускает свой экземпляр MS Project.
+
+PROJECT_EXTENSIONS = ('.mpp', '.xml')  # Расширения файлов проекта, которые отправляются на обработку.
+
+FORM_EXTENSIONS = ('.xlsx',)  # Расширения файлов обменных форм.
+
+EXCLUDE_PATTERNS = ('~$*',)  # Шаблоны имен файлов, которые пропускаются (файлы блокировки Office).
+
+PROGRESS_INTERVAL = 0.5  # Минимальный интервал в секундах между событиями о прогрессе обработки.
+
+POLL_INTERVAL_MS = 100  # Интервал в миллисекундах, с которым окно забирает события из очереди.
+
+MAX_EVENTS_PER_POLL = 500  # Максимальное количество событий, которое окно обрабатывает за один раз.
@@ -0,0 +1,12 @@
+"""Конфиг для модуля, который копирует файлы в резервную папку."""
+
+RESERVE_WORKERS = 4  # Количество потоков, которые копируют файлы в резервную папку.
+
+USE_HARDLINKS = False  # Если True, рабочие копии файлов создаются жесткими ссылками на файлы хранилища
+                       # (если файловая система это позволяет), иначе копируются. Такие копии доступны только
+                       # для чтения: запись в них изменила бы и резервную копию.
+
+RESERVE_MAX_AGE_DAYS = 30  # Файлы хранилища, которые не использовались дольше этого срока, удаляются.
+
+RESERVE_MAX_BYTES = 20 * 1024 ** 3  # Максимальный размер хранилища. Сверх него удаляются давно не
+                                    # использованные файлы.
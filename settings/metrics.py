@@ -0,0 +1,13 @@
+"""Конфиг для замеров этапов обработки файлов."""
+import os
+
+ENABLED = False  # Если True, для каждого файла замеряются длительности этапов, количество задач и обращений к COM.
+
+TRACE_MEMORY = False  # Если True, для каждого файла замеряется пик памяти (tracemalloc заметно замедляет работу).
+
+PROFILE_PATTERN = None  # Шаблон имени файла (например, "Проект_1*.mpp"), для обработки которого сохраняется
+                        # профиль cProfile. None - профиль не сохраняется.
+
+REPORT_FORMAT = "json"  # Формат отчета по замерам запуска: "json" или "csv".
+
+PATH_TO_REPORT_FOLDER = os.path.expanduser("~/Documents/reservFolder/metrics")  # Путь до папки с отчетами и профилями.
@@ -1,26 +1,76 @@
 """Конфиг для модуля, который формирует обменную форму из файла Project"""
 
-PATH_TO_STYLE_FILE = r".\settings\styles_dict.pkl"  # Путь до файла со стилями для Excel.
-
-ID_COLUMN = {'Text4': 'УИД_(П)',  # Словарь с именами столбцов и их идентификаторами в project.
-             'Active': 'Активная',
-             'OutlineLevel': 'Уровень структуры',
-             'Summary': 'Суммарная задача',
-             'Text5': 'Тип элемента КСГ_(П)',
-             'Name': 'Название задачи',
-             'Baseline4Start': 'Базовое начало4',
-             'Baseline4Finish': 'Базовое окончание4',
-             'Start': 'Дата начала (корр.по I пг)',
-             'Finish': 'Дата окончания (корр.по I пг)',
-             'Start': 'Начало',
-             'Finish': 'Окончание',
-             'ActualStart': 'Фактическое начало',
-             'ActualFinish': 'Фактическое окончание',
-             'Number15': 'Плановый % на дату отчета_(П)',
-             'Number17': 'Фактический % на дату отчета_(П)',
-             'Number20': 'Отклонение % завершения_(П)',
-             'Number18': 'Отклонение % завершения в (дн.)_(П)',
-             'Text20': 'Прогнозное начало',
-             'Text21': 'Прогнозное окончание',
-             'StartSlack': 'Отклонение начала',
-             }
+import os
+
+PATH_TO_STYLE_FILE = os.path.join(os.path.dirname(__file__), "styles.json")  # Путь до файла со стилями для Excel.
+
+COLUMNS = [  # Схема ОФ: поле task в project, имя столбца в ОФ и тип значения (см. core.schema.KINDS).
+           # Столбцы идут в ОФ в порядке списка, одно поле может выгружаться в несколько столбцов.
+    ('Text4', 'УИД_(П)', 'text'),
+    ('Active', 'Активная', 'bool'),
+    ('OutlineLevel', 'Уровень структуры', 'int'),
+    ('Summary', 'Суммарная задача', 'bool'),
+    ('Text5', 'Тип элемента КСГ_(П)', 'category'),
+    ('Name', 'Название задачи', 'text'),
+    ('Baseline4Start', 'Базовое начало4', 'date'),
+    ('Baseline4Finish', 'Базовое окончание4', 'date'),
+    ('Start', 'Дата начала (корр.по I пг)', 'date'),
+    ('Finish', 'Дата окончания (корр.по I пг)', 'date'),
+    ('Start', 'Начало', 'date'),
+    ('Finish', 'Окончание', 'date'),
+    ('ActualStart', 'Фактическое начало', 'date'),
+    ('ActualFinish', 'Фактическое окончание', 'date'),
+    ('Number15', 'Плановый % на дату отчета_(П)', 'float'),
+    ('Number17', 'Фактический % на дату отчета_(П)', 'float'),
+    ('Number20', 'Отклонение % завершения_(П)', 'float'),
+    ('Number18', 'Отклонение % завершения в (дн.)_(П)', 'float'),
+    ('Text20', 'Прогнозное начало', 'text'),
+    ('Text21', 'Прогнозное окончание', 'text'),
+    ('StartSlack', 'Отклонение начала', 'int'),
+]
+
+READ_ERROR_VALUE = "Ошибка чтения"  # Значение, которое записывается в ОФ, если поле task не удалось прочитать.
+
+NA_VALUE = "НД"  # Значение, которое MS Project возвращает для незаполненной даты.
+
+FORM_DATE_FORMAT = "%d.%m.%Y"  # Формат дат, введенных в ОФ текстом. Текст в другом формате разбирается
+                               # с днем перед месяцем.
+
+USE_MSPDI_EXPORT = False  # Если True, файл .mpp один раз сохраняется в XML (MSPDI) и задачи читаются из него,
+                          # а не через COM по одному полю.
+
+STREAMING_EXPORT = False  # Если True, задачи по одной записываются в ОФ без построения таблицы задач и без кэша.
+                          # Память не растет с размером проекта, ОФ получается такой же, как без этого режима.
+                          # Не используется, если включен DELTA_EXPORT или ROLLUP_SUMMARIES (для файлов,
+                          # которые читаются через COM): им нужна таблица задач.
+
+DELTA_EXPORT = None  # Сравнение с прошлой выгрузкой проекта: None - выключено, "mark" - в полной ОФ отмечаются
+                     # измененные и добавленные задачи, "delta" - вместо полной ОФ выгружаются только измененные,
+                     # добавленные и удаленные задачи. Требует таблицу задач, поэтому потоковая выгрузка не используется.
+
+PATH_TO_SNAPSHOT_FOLDER = os.path.expanduser("~/Documents/reservFolder/snapshots")  # Папка с таблицами задач
+                                                                                   # прошлых выгрузок проектов.
+
+DELTA_STATUS_COLUMN = "Изменение"  # Столбец ОФ с видом изменения задачи относительно прошлой выгрузки.
+DELTA_CHANGED_COLUMNS_COLUMN = "Измененные столбцы"  # Столбец ОФ со списком измененных столбцов задачи.
+DELTA_STATUSES = {'changed': "Изменена", 'added': "Добавлена", 'removed': "Удалена"}  # Виды изменений задач.
+
+MSPDI_EXTENSIONS = ('.xml',)  # Расширения файлов проекта, которые читаются без MS Project.
+
+FACT_ID_COLUMNS = ['Text4', 'ActualStart', 'ActualFinish']  # Столбцы, по которым ОФ сравнивается с проектом
+                                                            # при внесении факта. Первый столбец - ключ (УИД).
+
+ROLLUP_SUMMARIES = False  # Если True, поля из ROLLUPS у суммарных задач не читаются из MS Project,
+                          # а вычисляются из листовых задач (см. core.hierarchy).
+
+ROLLUPS = {  # Поле task -> способ свертки листовых задач в суммарную (см. core.hierarchy.AGGREGATIONS).
+    'Start': 'min',
+    'Finish': 'max',
+    'ActualStart': 'min',
+    'ActualFinish': 'max_complete',
+    'Number15': 'weighted_mean',
+    'Number17': 'weighted_mean',
+    'Number20': 'weighted_mean',
+    'Number18': 'max',
+    'StartSlack': 'min',
+}
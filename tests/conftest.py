@@ -0,0 +1,54 @@
+"""Общие настройки тестов.
+
+Тесты запускаются из корня репозитория: python -m pytest tests
+Модули репозитория импортируются как пакеты от его корня (core, settings, ...).
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Корень репозитория.
+DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")  # Папка с файлами для тестов.
+
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def workspace(tmp_path, monkeypatch):
+    """Переносит резервную папку, кэш, снимки и базы во временную папку теста.
+
+    Возвращает путь до временной папки.
+    """
+    import core.cache as cache
+    import database.database as database
+    import database.journal as journal
+    import settings.interface as interface_config
+    import settings.readOF as readOF_config
+
+    monkeypatch.setattr(interface_config, 'PATH_TO_RESERVE_FOLDER', str(tmp_path / "reserve"))
+    monkeypatch.setattr(readOF_config, 'PATH_TO_SNAPSHOT_FOLDER', str(tmp_path / "snapshots"))
+    monkeypatch.setattr(cache, '_cache', cache.TableCache(str(tmp_path / "cache")))
+    monkeypatch.setattr(database, '_store', database.RunStore(str(tmp_path / "history.db")))
+    monkeypatch.setattr(journal, '_journal', journal.BatchJournal(str(tmp_path / "history.db")))
+    return tmp_path
+
+
+@pytest.fixture
+def projects(tmp_path, request):
+    """Создает файлы проекта с именами из PROJECT_NAMES модуля теста и папку для ОФ.
+
+    Содержимое файла - его имя, поэтому файлы не совпадают в кэше.
+    Возвращает пару (пути до файлов проекта, путь до папки для ОФ).
+    """
+    folder = tmp_path / "projects"
+    folder.mkdir()
+    paths = []
+    for name in request.module.PROJECT_NAMES:
+        (folder / name).write_bytes(name.encode())
+        paths.append(str(folder / name))
+    output = tmp_path / "forms"
+    output.mkdir()
+    return paths, str(output)
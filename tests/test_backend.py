@@ -0,0 +1,89 @@
+import pytest
+
+from benchmarks.synthetic import FakeBackend
+from core.backend import SessionPool
+
+
+class RecordingBackend(FakeBackend):
+    """FakeBackend, который запоминает запущенные и закрытые экземпляры MS Project."""
+
+    def __init__(self, count=10, fail_start=False):
+        super().__init__(count)
+        self.fail_start = fail_start
+        self.applications = []
+        self.quit_count = 0
+
+    def start(self):
+        if self.fail_start:
+            raise RuntimeError('COM недоступен')
+        msp = super().start()
+        self.applications.append(msp)
+        return msp
+
+    def quit(self, msp):
+        self.quit_count += 1
+        super().quit(msp)
+
+
+def test_application_is_reused_until_max_files():
+    backend = RecordingBackend()
+    with SessionPool(backend, max_files=2) as pool:
+        for name in ("a.mpp", "b.mpp", "c.mpp"):
+            with pool.project(name) as (project, msp):
+                assert project is msp.ActiveProject
+
+    assert len(backend.applications) == 2
+    assert [msp.opened for msp in backend.applications] == [2, 1]
+    assert all(msp.closed for msp in backend.applications)
+
+
+def test_file_is_saved_on_close_when_asked():
+    backend = RecordingBackend()
+    with SessionPool(backend) as pool:
+        with pool.project("a.mpp", save=True) as (_, msp):
+            pass
+
+    assert msp.saved == 1
+
+
+def test_application_is_replaced_after_open_error():
+    backend = RecordingBackend()
+    with SessionPool(backend) as pool:
+        with pytest.raises(Exception, match='открыть файл проекта'):
+            with pool.project("broken.mpp"):
+                pass
+        assert backend.quit_count == 1
+        with pool.project("a.mpp"):
+            pass
+
+    assert len(backend.applications) == 2
+
+
+def test_application_is_replaced_after_error_inside_block():
+    backend = RecordingBackend()
+    with SessionPool(backend) as pool:
+        with pytest.raises(ValueError):
+            with pool.project("a.mpp") as (_, msp):
+                raise ValueError('ошибка обработки')
+        assert msp.ActiveProject is None
+        assert msp.closed
+        with pool.project("b.mpp"):
+            pass
+
+    assert len(backend.applications) == 2
+
+
+def test_start_error_is_reported():
+    with SessionPool(RecordingBackend(fail_start=True)) as pool:
+        with pytest.raises(Exception, match='запустить MS Project'):
+            with pool.project("a.mpp"):
+                pass
+
+
+def test_closed_pool_refuses_files():
+    pool = SessionPool(RecordingBackend())
+    pool.close()
+
+    with pytest.raises(Exception, match='закрыт'):
+        with pool.project("a.mpp"):
+            pass
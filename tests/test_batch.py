@@ -0,0 +1,49 @@
+import functools
+import os
+import threading
+
+import pytest
+
+import core.batch as batch
+import settings.backend as backend_config
+from benchmarks.synthetic import FakeBackend
+
+PROJECT_NAMES = ("Проект_1.mpp", "Проект_2_broken.mpp", "Проект_3.mpp", "Проект_4.mpp")
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_iter_export_keeps_order_and_reports_broken_files(projects, workers, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', None)
+    paths, output = projects
+
+    results = list(batch.iter_export(paths, output, workers, functools.partial(FakeBackend, 20)))
+
+    assert [result.path for result in results] == paths
+    assert [result.output is None for result in results] == [False, True, False, False]
+    for result in results:
+        if result.output is not None:
+            assert os.path.exists(result.output)
+
+
+def test_process_pool_gives_same_forms_as_single_process(projects, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', None)
+    paths, output = projects
+    factory = functools.partial(FakeBackend, 20)
+
+    single = batch.export(paths, output, 1, factory)
+    parallel = batch.export(paths, output, 2, factory)
+
+    assert single == parallel
+
+
+def test_cancel_stops_before_next_file(projects, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', None)
+    paths, output = projects
+    cancel = threading.Event()
+    results = []
+
+    for result in batch.iter_export(paths, output, 1, functools.partial(FakeBackend, 20), cancel=cancel):
+        results.append(result)
+        cancel.set()
+
+    assert len(results) == 1
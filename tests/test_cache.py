@@ -0,0 +1,51 @@
+import functools
+import zlib
+
+import pytest
+
+import core.fact as fact
+import core.readOF as readOF
+import core.runner as runner
+import core.schema as schema
+import settings.backend as backend_config
+import settings.readOF as config
+from benchmarks.synthetic import FakeBackend, make_form, make_project, write_form
+
+COUNT = 30
+
+
+@pytest.fixture
+def fact_folders(tmp_path):
+    forms = tmp_path / "forms"
+    projects = tmp_path / "projects"
+    forms.mkdir()
+    projects.mkdir()
+    columns = [schema.header(attribute) for attribute in config.FACT_ID_COLUMNS]
+    for name in ("Проект_1", "Проект_2"):
+        (projects / f"{name}.mpp").write_bytes(name.encode())
+        project = make_project(COUNT, seed=zlib.crc32(f"{name}.mpp".encode()))
+        form, _ = make_form(fact.fill_dataframe(project), columns, mismatch_rate=0)
+        write_form(form, str(forms / f"{name}_ОФ_01.02.2023.xlsx"))
+    return str(forms), str(projects)
+
+
+@pytest.mark.parametrize('timeout', [None, 60])
+def test_fact_run_reports_cache_counters(fact_folders, timeout, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', timeout)
+    factory = functools.partial(FakeBackend, COUNT)
+
+    first = runner.run_fact(*fact_folders, backend_factory=factory)
+    second = runner.run_fact(*fact_folders, backend_factory=factory)
+
+    assert not first.bad_files and not second.bad_files
+    # На каждый файл - ОФ и таблица задач проекта.
+    assert (first.cache_stats.hits, first.cache_stats.misses) == (0, 4)
+    assert (second.cache_stats.hits, second.cache_stats.misses) == (4, 0)
+
+
+def test_cache_variant_depends_on_mspdi_export(monkeypatch):
+    monkeypatch.setattr(config, 'USE_MSPDI_EXPORT', False)
+    com = readOF._cache_variant()
+    monkeypatch.setattr(config, 'USE_MSPDI_EXPORT', True)
+
+    assert readOF._cache_variant() != com
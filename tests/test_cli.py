@@ -0,0 +1,124 @@
+import functools
+import json
+import signal
+
+import pytest
+
+import core.cli as cli
+import core.watchdog as watchdog
+import settings.backend as backend_config
+from benchmarks.synthetic import FakeBackend
+
+
+class InterruptingBackend(FakeBackend):
+    """FakeBackend, который при открытии файлов имитирует нажатия Ctrl+C."""
+
+    def __init__(self, count=10, presses=1):
+        super().__init__(count)
+        self.presses = presses
+
+    def open(self, msp, path):
+        while self.presses:
+            self.presses -= 1
+            signal.raise_signal(signal.SIGINT)
+        return super().open(msp, path)
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    """Файлы обрабатываются в текущем процессе, обработчик Ctrl+C восстанавливается после теста."""
+
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', None)
+    handler = signal.getsignal(signal.SIGINT)
+    yield
+    signal.signal(signal.SIGINT, handler)
+
+
+def _folders(tmp_path, names):
+    source = tmp_path / "projects"
+    output = tmp_path / "forms"
+    source.mkdir()
+    output.mkdir()
+    for name in names:
+        (source / name).write_bytes(name.encode())
+    return ['export', str(source), str(output), '--workers', '1']
+
+
+def _events(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize('names, code', [
+    (["a.mpp", "b.mpp"], cli.EXIT_OK),
+    (["a.mpp", "b_broken.mpp"], cli.EXIT_PARTIAL),
+    (["a_broken.mpp", "b_broken.mpp"], cli.EXIT_FAILURE),
+])
+def test_exit_code_reflects_results(tmp_path, capsys, names, code):
+    argv = _folders(tmp_path, names)
+
+    assert cli.main(argv, functools.partial(FakeBackend, 10)) == code
+    events = _events(capsys)
+    assert [event['event'] for event in events][0] == 'start'
+    assert events[-1]['event'] == 'done'
+    assert events[-1]['total'] == len(names)
+
+
+def _broken_factory():
+    raise RuntimeError('MS Project не установлен')
+
+
+def test_error_that_stops_processing_is_failure(tmp_path, capsys):
+    argv = _folders(tmp_path, ["a.mpp"])
+
+    assert cli.main(argv, _broken_factory) == cli.EXIT_FAILURE
+    assert _events(capsys)[-1]['event'] == 'error'
+
+
+def test_ctrl_c_cancels_after_current_file(tmp_path, capsys):
+    argv = _folders(tmp_path, ["a.mpp", "b.mpp", "c.mpp"])
+
+    assert cli.main(argv, functools.partial(InterruptingBackend, 10)) == cli.EXIT_CANCELLED
+    done = _events(capsys)[-1]
+    assert done['event'] == 'done' and done['cancelled'] and done['total'] == 1
+
+
+def test_second_ctrl_c_stops_immediately(tmp_path, capsys):
+    argv = _folders(tmp_path, ["a.mpp", "b.mpp", "c.mpp"])
+
+    assert cli.main(argv, functools.partial(InterruptingBackend, 10, presses=2)) == cli.EXIT_CANCELLED
+    assert _events(capsys)[-1]['event'] == 'error'
+
+
+def test_restart_option_starts_interrupted_batch_over(tmp_path, capsys):
+    argv = _folders(tmp_path, ["a.mpp", "b.mpp"])
+
+    assert cli.main(argv, functools.partial(InterruptingBackend, 10)) == cli.EXIT_CANCELLED
+    assert cli.main(['--restart'] + argv, functools.partial(FakeBackend, 10)) == cli.EXIT_OK
+    done = _events(capsys)[-1]
+    assert done['event'] == 'done' and done['resumed'] == 0 and done['total'] == 2
+
+
+def _failing_worker(backend_factory):
+    raise RuntimeError('Не удалось запустить процесс-обработчик')
+
+
+def test_worker_start_failure_is_not_cancellation(tmp_path, capsys, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', 60)
+    monkeypatch.setattr(watchdog, 'Worker', _failing_worker)
+    argv = _folders(tmp_path, ["a.mpp", "b.mpp"])
+
+    assert cli.main(argv, functools.partial(FakeBackend, 10)) == cli.EXIT_FAILURE
+    done = _events(capsys)[-1]
+    assert done['event'] == 'done' and not done['cancelled'] and done['failed'] == 2
+
+
+def test_unprocessed_files_without_cancel_are_partial(tmp_path, capsys, monkeypatch):
+    iter_calls = watchdog.iter_calls
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', 60)
+    # Обработчик перестает отдавать результаты после первого файла.
+    monkeypatch.setattr(watchdog, 'iter_calls', lambda function, items, *args: iter_calls(function, items[:1], *args))
+    argv = _folders(tmp_path, ["a.mpp", "b.mpp"])
+
+    assert cli.main(argv, functools.partial(FakeBackend, 10)) == cli.EXIT_PARTIAL
+    done = _events(capsys)[-1]
+    assert not done['cancelled'] and done['unfinished'] == 1
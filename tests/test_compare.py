@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+
+import core.fact as fact
+import core.schema as schema
+import settings.readOF as config
+from core.compare import compare_tables
+
+KEY = schema.header('Text4')
+START = schema.header('ActualStart')
+FINISH = schema.header('ActualFinish')
+COLUMNS = [KEY, START, FINISH]
+
+
+def _project():
+    return pd.DataFrame({KEY: ["A", "B", "C", "D"],
+                         START: pd.to_datetime(["2023-02-01", "2023-02-05", None, None]),
+                         FINISH: pd.to_datetime(["2023-02-10", None, None, None])},
+                        index=pd.Index([11, 12, 13, 14], name='UniqueID'))
+
+
+def _form():
+    return pd.DataFrame({KEY: ["A", "B", "C", "E"],
+                         START: [pd.Timestamp("2023-02-01"), pd.Timestamp("2023-02-06"),
+                                 pd.Timestamp("2023-03-01"), pd.Timestamp("2023-04-01")],
+                         FINISH: [pd.Timestamp("2023-02-10 15:30"), config.NA_VALUE, None, None]})
+
+
+def test_compare_tables_finds_every_differing_cell():
+    comparison = compare_tables(_project(), _form(), KEY, COLUMNS[1:])
+
+    differences = comparison.differences.sort_values(['row', 'column'])
+    assert differences[[KEY, 'row', 'column']].values.tolist() == [["B", 12, START], ["C", 13, START]]
+    assert differences['form'].tolist() == [pd.Timestamp("2023-02-06"), pd.Timestamp("2023-03-01")]
+    assert comparison.only_in_form[KEY].tolist() == ["E"]
+    assert comparison.only_in_project[KEY].tolist() == ["D"]
+
+
+def test_compare_tables_can_treat_empty_form_cells_as_values():
+    project = _project()
+    form = _form()
+    form.loc[0, START] = None
+
+    default = compare_tables(project, form, KEY, [START])
+    strict = compare_tables(project, form, KEY, [START], ignore_empty=False)
+
+    assert "A" not in default.differences[KEY].tolist()
+    assert "A" in strict.differences[KEY].tolist()
+
+
+def test_compare_tables_uses_first_row_for_duplicated_keys():
+    form = pd.concat([_form(), _form().iloc[[1]].assign(**{START: pd.Timestamp("2023-02-05")})],
+                     ignore_index=True)
+
+    comparison = compare_tables(_project(), form, KEY, [START])
+
+    assert comparison.differences.loc[comparison.differences[KEY] == "B", 'form'].tolist() == \
+        [pd.Timestamp("2023-02-06")]
+
+
+def test_check_form_returns_changes_by_unique_id():
+    changes = fact.check_form(_project(), _form(), COLUMNS)
+
+    assert changes == {12: {START: pd.Timestamp("2023-02-06")}, 13: {START: pd.Timestamp("2023-03-01")}}
+
+
+@pytest.mark.parametrize('which', ['project', 'form'])
+def test_check_form_rejects_empty_tables(which):
+    project, form = _project(), _form()
+    if which == 'project':
+        project = project.iloc[:0]
+    else:
+        form = form.iloc[:0]
+
+    with pytest.raises(Exception, match='пустой'):
+        fact.check_form(project, form, COLUMNS)
@@ -0,0 +1,73 @@
+import pytest
+
+import database.database as database
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = database.RunStore(str(tmp_path / "history.db"))
+    yield store
+    store.close()
+
+
+def _run(store, records, mode='export'):
+    run_id = store.start_run(mode, workers=2)
+    store.add_files(run_id, [{'path': f"C:/projects/{name}.mpp", 'output_path': None if failed else "form.xlsx",
+                              'success': not failed, 'duration': duration, 'stages': stages}
+                             for name, failed, duration, stages in records])
+    store.finish_run(run_id)
+    return run_id
+
+
+def test_run_is_started_and_finished(store):
+    run_id = _run(store, [])
+
+    mode, started_at, finished_at, workers = store._conn.execute(
+        "SELECT mode, started_at, finished_at, workers FROM runs WHERE id = ?", (run_id,)).fetchone()
+    assert (mode, workers) == ('export', 2)
+    assert started_at <= finished_at
+
+
+def test_stage_timings_belong_to_their_files(store):
+    _run(store, [("a", False, 3.0, {'open': 1.0, 'write_form': 2.0}), ("b", False, 1.0, None),
+                 ("c", False, 5.0, {'open': 4.0})])
+
+    rows = store._conn.execute("SELECT f.file_name, s.stage, s.duration FROM stage_timings s "
+                               "JOIN files f ON f.id = s.file_id ORDER BY f.file_name, s.stage").fetchall()
+    assert rows == [("a", 'open', 1.0), ("a", 'write_form', 2.0), ("c", 'open', 4.0)]
+    assert store.slowest_stages() == [('open', 5.0, 2.5, 2), ('write_form', 2.0, 2.0, 1)]
+
+
+def test_slowest_files_are_ordered_by_average_within_last_runs(store):
+    _run(store, [("a", False, 10.0, None)])
+    _run(store, [("a", False, 1.0, None), ("b", False, 5.0, None)])
+
+    assert store.slowest_files(last_runs=1) == [("b", 5.0, 5.0, 1), ("a", 1.0, 1.0, 1)]
+    assert store.slowest_files(last_runs=2) == [("a", 5.5, 10.0, 2), ("b", 5.0, 5.0, 1)]
+    assert store.slowest_files(last_runs=2, limit=1) == [("a", 5.5, 10.0, 2)]
+
+
+def test_failed_twice_in_row_looks_at_the_last_two_runs_of_each_file(store):
+    _run(store, [("a", True, 1.0, None), ("b", True, 1.0, None)])
+    _run(store, [("a", True, 1.0, None), ("b", False, 1.0, None), ("c", True, 1.0, None)])
+    _run(store, [("c", True, 1.0, None), ("d", True, 1.0, None)])
+
+    # b после сбоя обработан успешно, d не обработан только один раз.
+    assert store.failed_twice_in_row() == ["a", "c"]
+
+
+def test_file_recovered_after_two_failures_is_not_reported(store):
+    _run(store, [("a", True, 1.0, None)])
+    _run(store, [("a", True, 1.0, None)])
+    _run(store, [("a", False, 1.0, None)])
+
+    assert store.failed_twice_in_row() == []
+
+
+def test_run_stages_are_counted_with_file_stages(store):
+    run_id = _run(store, [("a", False, 3.0, {'open': 1.0})])
+    store.add_run_stages(run_id, {'reserve': 4.0, 'transfer_files': 0.5})
+    store.add_run_stages(run_id, {})
+
+    assert store.slowest_stages() == [('reserve', 4.0, 4.0, 1), ('open', 1.0, 1.0, 1),
+                                      ('transfer_files', 0.5, 0.5, 1)]
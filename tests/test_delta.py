@@ -0,0 +1,99 @@
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import core.delta as delta
+import core.excel as excel
+import core.readOF as readOF
+import core.schema as schema
+import settings.readOF as config
+from conftest import DATA
+
+STATUS = config.DELTA_STATUS_COLUMN
+CHANGED, ADDED, REMOVED = (config.DELTA_STATUSES[kind] for kind in ('changed', 'added', 'removed'))
+
+
+def _table(rows):
+    key, name = schema.header('Text4'), schema.header('Name')
+    return pd.DataFrame(rows, columns=[key, name])
+
+
+PREVIOUS = _table([["UID-1", "Этап"], ["UID-2", "Работа"], ["UID-3", "Удаленная работа"]])
+CURRENT = _table([["UID-1", "Этап"], ["UID-2", "Работа (изменена)"], ["UID-4", "Новая работа"]])
+
+
+def test_first_export_marks_every_task_as_added():
+    marked, removed = delta.mark_changes(None, CURRENT)
+
+    assert marked[STATUS].tolist() == [ADDED] * 3
+    assert removed.empty
+
+
+def test_changed_tasks_are_marked_with_their_columns():
+    marked, removed = delta.mark_changes(PREVIOUS, CURRENT)
+
+    assert pd.isna(marked[STATUS].iloc[0]) and marked[STATUS].iloc[1:].tolist() == [CHANGED, ADDED]
+    assert marked[config.DELTA_CHANGED_COLUMNS_COLUMN].iloc[1] == schema.header('Name')
+    assert removed[schema.header('Text4')].tolist() == ["UID-3"]
+
+
+def test_delta_form_drops_unchanged_tasks():
+    form = delta.delta_form(PREVIOUS, CURRENT)
+
+    assert form[schema.header('Text4')].tolist() == ["UID-2", "UID-4", "UID-3"]
+    assert form[STATUS].tolist() == [CHANGED, ADDED, REMOVED]
+
+
+def test_snapshots_of_same_named_projects_are_kept_apart(tmp_path):
+    store = delta.SnapshotStore(str(tmp_path / "snapshots"))
+    store.put(str(tmp_path / "a" / "Проект.mpp"), PREVIOUS)
+    store.put(str(tmp_path / "b" / "Проект.mpp"), CURRENT)
+
+    pd.testing.assert_frame_equal(store.get(str(tmp_path / "a" / "Проект.mpp")), PREVIOUS)
+    pd.testing.assert_frame_equal(store.get(str(tmp_path / "b" / "Проект.mpp")), CURRENT)
+    assert store.get(str(tmp_path / "c" / "Проект.mpp")) is None
+
+
+@pytest.fixture
+def written_forms(monkeypatch):
+    """Перехватывает запись ОФ и возвращает список записанных таблиц."""
+
+    forms = []
+    monkeypatch.setattr(excel, 'write_form', lambda data, *args: forms.append(data))
+    monkeypatch.setattr(config, 'DELTA_EXPORT', "mark")
+    return forms
+
+
+def _copy_project(folder, rename=None):
+    os.makedirs(folder)
+    path = os.path.join(folder, "project.xml")
+    shutil.copyfile(os.path.join(DATA, "project.xml"), path)
+    if rename is not None:
+        with open(path, encoding='utf-8') as file:
+            text = file.read()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text.replace(*rename))
+    return path
+
+
+def test_export_marks_changes_against_the_same_project(tmp_path, written_forms):
+    first = _copy_project(str(tmp_path / "a"))
+    second = _copy_project(str(tmp_path / "b"), rename=("Работа 1.1", "Работа 1.1 (другой проект)"))
+
+    for path in (first, second, first, second):
+        assert readOF.main(path, str(tmp_path), pool=object()) is not None
+
+    assert all(status == ADDED for form in written_forms[:2] for status in form[STATUS])
+    assert written_forms[2][STATUS].isna().all() and written_forms[3][STATUS].isna().all()
+
+
+def test_export_of_a_work_copy_uses_the_source_snapshot(tmp_path, written_forms):
+    source = _copy_project(str(tmp_path / "source"))
+    copies = [_copy_project(str(tmp_path / folder)) for folder in ("copy_1", "copy_2")]
+
+    for copy in copies:
+        readOF.main(copy, str(tmp_path), pool=object(), path_to_source=source)
+
+    assert written_forms[1][STATUS].isna().all()
@@ -0,0 +1,35 @@
+import datetime
+import logging
+import os
+
+import core.discovery as discovery
+
+PROJECTS = [os.path.join("projects", name) for name in ("Проект_1.mpp", "Проект_2.mpp")]
+
+
+def _forms(*names):
+    return [os.path.join("forms", name) for name in names]
+
+
+def test_form_date_is_parsed_from_the_suffix():
+    assert discovery.form_date("Проект_1_ОФ_05.01.2024.xlsx") == datetime.date(2024, 1, 5)
+    assert discovery.form_date("Проект_1.xlsx") is None
+    assert discovery.form_date("Проект_1_ОФ_31.02.2024.xlsx") is None
+
+
+def test_latest_form_is_chosen_by_date_not_by_name(caplog):
+    # По имени 20.12.2023 идет после 05.01.2024, но она раньше.
+    forms = _forms("Проект_1_ОФ_05.01.2024.xlsx", "Проект_1_ОФ_20.12.2023.xlsx", "Проект_2_ОФ_01.02.2023.xlsx",
+                   "Чужой_ОФ_01.02.2023.xlsx")
+
+    with caplog.at_level(logging.WARNING):
+        pairs = discovery.latest_forms(forms, PROJECTS)
+
+    assert pairs == {PROJECTS[0]: forms[0], PROJECTS[1]: forms[2]}
+    assert "Проект_1_ОФ_20.12.2023.xlsx" in caplog.text
+
+
+def test_form_without_date_is_the_earliest():
+    forms = _forms("Проект_1.xlsx", "Проект_1_ОФ_20.12.2023.xlsx")
+
+    assert discovery.latest_forms(forms, PROJECTS) == {PROJECTS[0]: forms[1]}
@@ -0,0 +1,105 @@
+import datetime
+import zipfile
+
+import openpyxl
+import pandas as pd
+import pytest
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+import core.excel as excel
+
+MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+RELATIONSHIPS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+
+def _write_xlsx(path, rows, shared_strings=(), date1904=False):
+    """Собирает минимальную книгу xlsx из готовых строк XML листа."""
+
+    properties = '<workbookPr date1904="1"/>' if date1904 else ''
+    strings = ''.join(f'<si><t>{text}</t></si>' for text in shared_strings)
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr('xl/workbook.xml',
+                         f'<workbook xmlns="{MAIN}" xmlns:r="{RELATIONSHIPS}">{properties}'
+                         '<sheets><sheet name="ОФ" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        archive.writestr('xl/_rels/workbook.xml.rels',
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         f'<Relationship Id="rId1" Type="{RELATIONSHIPS}/worksheet" '
+                         'Target="worksheets/sheet1.xml"/></Relationships>')
+        archive.writestr('xl/worksheets/sheet1.xml',
+                         f'<worksheet xmlns="{MAIN}"><sheetData>{"".join(rows)}</sheetData></worksheet>')
+        if shared_strings:
+            archive.writestr('xl/sharedStrings.xml', f'<sst xmlns="{MAIN}">{strings}</sst>')
+    return str(path)
+
+
+@pytest.fixture
+def sparse_book(tmp_path):
+    """Книга со строками из общих и встроенных строк, пустыми строками и пропущенными ячейками."""
+
+    return _write_xlsx(tmp_path / "sparse.xlsx", [
+        '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="inlineStr"><is><t>Имя</t></is></c>'
+        '<c r="D1" t="s"><v>1</v></c></row>',
+        '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2" t="inlineStr"><is><t>Работа 1</t></is></c>'
+        '<c r="D2"><v>45000</v></c></row>',
+        '<row r="3"><c r="C3" t="inlineStr"><is><t>вне столбцов</t></is></c></row>',
+        '<row r="4"/>',
+        # Ячейки без ссылки r нумеруются по порядку.
+        '<row r="5"><c t="inlineStr"><is><t>UID-2</t></is></c><c/><c t="inlineStr"><is><t>x</t></is></c>'
+        '<c><v>45001.5</v></c></row>',
+    ], shared_strings=("УИД", "Дата", "UID-1"))
+
+
+def test_shared_and_inline_strings_are_read(sparse_book):
+    columns = excel.read_columns(sparse_book, ["УИД", "Имя"])
+
+    assert columns["УИД"].tolist() == ["UID-1", "UID-2"]
+    assert columns["Имя"].tolist() == ["Работа 1", None]
+
+
+def test_blank_rows_and_other_columns_are_skipped(sparse_book):
+    columns = excel.read_columns(sparse_book, ["Дата", "УИД"], date_headers=["Дата"])
+
+    assert columns["Дата"].tolist() == [pd.Timestamp(2023, 3, 15), pd.Timestamp(2023, 3, 16, 12)]
+    assert list(columns) == ["Дата", "УИД"]
+
+
+@pytest.mark.parametrize('date1904', [False, True])
+def test_dates_are_read_in_both_date_systems(tmp_path, date1904):
+    workbook = openpyxl.Workbook()
+    if date1904:
+        workbook.epoch = CALENDAR_MAC_1904
+    sheet = workbook.active
+    sheet.append(["УИД", "Дата", "Число"])
+    sheet.append(["UID-1", datetime.datetime(2023, 2, 1, 8, 30), 42])
+    sheet.append(["UID-2", None, 1.5])
+    path = str(tmp_path / "form.xlsx")
+    workbook.save(path)
+
+    columns = excel.read_columns(path, ["УИД", "Дата", "Число"], date_headers=["Дата"])
+
+    assert columns["Дата"][0] == pd.Timestamp(2023, 2, 1, 8, 30) and pd.isna(columns["Дата"][1])
+    assert columns["Число"].tolist() == [42, 1.5]
+
+
+def test_dates_in_1904_system_use_their_epoch(tmp_path):
+    path = _write_xlsx(tmp_path / "mac.xlsx", [
+        '<row r="1"><c r="A1" t="inlineStr"><is><t>Дата</t></is></c></row>',
+        '<row r="2"><c r="A2"><v>0</v></c></row>',
+    ], date1904=True)
+
+    assert excel.read_columns(path, ["Дата"], ["Дата"])["Дата"][0] == pd.Timestamp(1904, 1, 1)
+
+
+def test_missing_header_raises_logged_exception(sparse_book, caplog):
+    with pytest.raises(Exception, match='В ОФ нет столбцов: Факт') as error:
+        excel.read_columns(sparse_book, ["УИД", "Факт"])
+
+    assert not isinstance(error.value, KeyError)
+    assert 'Факт' in caplog.text
+
+
+def test_empty_sheet_has_no_headers(tmp_path):
+    path = _write_xlsx(tmp_path / "empty.xlsx", [])
+
+    with pytest.raises(Exception, match='В ОФ нет столбцов: УИД'):
+        excel.read_columns(path, ["УИД"])
@@ -0,0 +1,87 @@
+import datetime
+
+import pytest
+
+import core.fact as fact
+import core.schema as schema
+from benchmarks.synthetic import FakeApplication, make_project
+
+
+class IndexedTasks:
+    """Коллекция задач без перебора: задачи можно получить только по UniqueID."""
+
+    def __init__(self, tasks):
+        self._by_uid = {t.UniqueID: t for t in tasks}
+
+    def UniqueID(self, uid):
+        return self._by_uid[uid]
+
+
+class ObservedApplication(FakeApplication):
+    """FakeApplication, который запоминает значения Calculation и ScreenUpdating на момент сохранения."""
+
+    def FileSave(self):
+        super().FileSave()
+        self.saved_with = (self.Calculation, self.ScreenUpdating)
+
+
+class BrokenApplication(FakeApplication):
+    """FakeApplication, у которого чтение Calculation завершается ошибкой COM."""
+
+    @property
+    def Calculation(self):
+        raise Exception('(-2147352567, Ошибка COM)')
+
+    @Calculation.setter
+    def Calculation(self, value):
+        pass
+
+
+def _project(count=10):
+    project = make_project(count, seed=1)
+    tasks = list(project.Tasks)
+    project.Tasks = IndexedTasks(tasks)
+    return project, tasks
+
+
+def test_changes_are_written_by_unique_id_and_saved_once():
+    project, tasks = _project()
+    msp = ObservedApplication()
+    finish = schema.header('ActualFinish')
+
+    fact.change_project(project, msp, {3: {finish: datetime.date(2024, 5, 6)}, 7: {finish: None}})
+
+    assert tasks[2].ActualFinish == datetime.datetime(2024, 5, 6)
+    assert tasks[6].ActualFinish is None
+    assert msp.saved == 1 and msp.saved_with == (fact.PJ_MANUAL, False)
+    assert (msp.Calculation, msp.ScreenUpdating) == (-1, True)
+
+
+def test_settings_are_restored_when_a_write_fails():
+    project, _ = _project()
+    msp = FakeApplication()
+
+    with pytest.raises(Exception, match='Не получилось применить изменения'):
+        fact.change_project(project, msp, {999: {schema.header('ActualStart'): datetime.date(2024, 1, 1)}})
+
+    assert msp.saved == 0
+    assert (msp.Calculation, msp.ScreenUpdating) == (-1, True)
+
+
+def test_com_error_on_reading_settings_is_reported():
+    project, _ = _project()
+    msp = BrokenApplication()
+
+    with pytest.raises(Exception, match='Не получилось применить изменения'):
+        fact.change_project(project, msp, {1: {schema.header('ActualStart'): datetime.date(2024, 1, 1)}})
+
+    assert msp.saved == 0 and msp.ScreenUpdating is True
+
+
+def test_no_changes_do_not_touch_the_project():
+    project, _ = _project()
+    msp = FakeApplication()
+
+    fact.change_project(project, msp, {})
+
+    assert msp.saved == 0
@@ -0,0 +1,68 @@
+import contextlib
+import os
+
+import pandas as pd
+import pytest
+
+import core.hierarchy as hierarchy
+import core.mspdi as mspdi
+import core.readOF as readOF
+import core.schema as schema
+import settings.readOF as config
+from benchmarks.synthetic import make_project
+from conftest import DATA
+
+LEVELS = [1, 2, 3, 3, 2, 1, 2]
+
+
+def test_hierarchy_parents_and_subtrees():
+    tree = hierarchy.Hierarchy(LEVELS)
+
+    assert tree.parent.tolist() == [-1, 0, 1, 1, 0, -1, 5]
+    assert tree.end.tolist() == [5, 4, 3, 4, 5, 7, 7]
+    assert tree.is_leaf.tolist() == [False, False, True, True, True, False, True]
+    assert tree.children(0).tolist() == [1, 4]
+    assert tree.children(-1).tolist() == [0, 5]
+
+
+def test_rollup_fills_summaries_and_keeps_dtype():
+    level, slack, start = (schema.header(attribute) for attribute in ('OutlineLevel', 'StartSlack', 'Start'))
+    data = pd.DataFrame({
+        level: LEVELS,
+        slack: pd.array([None, None, 5, 3, 8, None, 2], dtype='Int64'),
+        start: pd.to_datetime([None, None, '2023-02-03', '2023-02-01', '2023-02-06', None, '2023-03-01']),
+    })
+
+    result = hierarchy.rollup(data, {'StartSlack': 'min', 'Start': 'min'})
+
+    assert result[slack].dtype == data[slack].dtype
+    assert result[slack].tolist() == [3, 3, 5, 3, 8, 2, 2]
+    assert result[start].dtype == data[start].dtype
+    assert result[start].iloc[0] == pd.Timestamp('2023-02-01')
+
+
+class RecordingPool:
+    """Пул, который отдает один синтетический проект и ничего не открывает."""
+
+    def __init__(self, project):
+        self._project = project
+
+    def project(self, path_to_project):
+        return contextlib.nullcontext((self._project, None))
+
+
+@pytest.mark.parametrize('path_to_project, use_mspdi_export, rolled_up', [
+    (os.path.join(DATA, "project.xml"), False, False),
+    ("project.mpp", True, False),
+    ("project.mpp", False, True),
+])
+def test_only_com_tables_are_rolled_up(path_to_project, use_mspdi_export, rolled_up, monkeypatch):
+    calls = []
+    monkeypatch.setattr(config, 'ROLLUP_SUMMARIES', True)
+    monkeypatch.setattr(config, 'USE_MSPDI_EXPORT', use_mspdi_export)
+    monkeypatch.setattr(mspdi, 'fill_dataframe_from_project', lambda msp: pd.DataFrame())
+    monkeypatch.setattr(hierarchy, 'rollup', lambda data: calls.append(data) or data)
+
+    readOF._extract(path_to_project, RecordingPool(make_project(20, seed=1)))
+
+    assert bool(calls) == rolled_up
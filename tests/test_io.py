@@ -0,0 +1,82 @@
+import os
+import stat
+
+import pytest
+
+import core.io as oi
+import settings.io as config
+
+
+@pytest.fixture
+def sources(tmp_path):
+    folder = tmp_path / "sources"
+    folder.mkdir()
+    paths = []
+    for name, content in (("a.mpp", b"first"), ("b.mpp", b"second"), ("c.mpp", b"first")):
+        (folder / name).write_bytes(content)
+        paths.append(str(folder / name))
+    return paths
+
+
+def test_store_files_deduplicates_by_content(sources, tmp_path):
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+
+    objects = store.store_files(sources)
+
+    assert objects[0] == objects[2]
+    assert len(set(objects)) == 2
+    assert all(not os.stat(path).st_mode & stat.S_IWUSR for path in objects)
+
+
+def test_writing_work_copy_keeps_backup_intact(sources, tmp_path):
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+    work_folder = str(tmp_path / "work")
+
+    copies = store.store_files(sources, work_folder)
+    with open(copies[0], 'r+b') as file:
+        file.write(b"SAVED")
+    objects = store.store_files(sources)
+
+    with open(objects[0], 'rb') as file:
+        assert file.read() == b"first"
+
+
+def test_hardlinked_work_copies_are_read_only(sources, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'USE_HARDLINKS', True)
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+
+    copies = store.store_files(sources, str(tmp_path / "work"))
+
+    assert all(not os.stat(path).st_mode & stat.S_IWUSR for path in copies)
+
+
+def test_work_folder_is_replaced_on_next_run(sources, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'USE_HARDLINKS', True)
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+    work_folder = str(tmp_path / "work")
+
+    store.store_files(sources, work_folder)
+    copies = store.store_files(sources[:1], work_folder)
+
+    assert sorted(os.path.join(root, name) for root, _, names in os.walk(work_folder) for name in names) == copies
+
+
+def test_evict_removes_read_only_objects(sources, tmp_path):
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+    store.store_files(sources)
+
+    assert store.evict(max_age_days=0) == 2
+
+
+def test_same_file_in_two_folders_gets_one_work_copy(tmp_path):
+    paths = []
+    for folder in ("first", "second"):
+        (tmp_path / folder).mkdir()
+        (tmp_path / folder / "Проект.mpp").write_bytes(b"same")
+        paths.append(str(tmp_path / folder / "Проект.mpp"))
+    store = oi.ReserveStore(str(tmp_path / "reserve"))
+
+    copies = store.store_files(iter(paths), str(tmp_path / "work"))
+
+    assert copies[0] == copies[1]
+    assert os.path.basename(copies[0]) == "Проект.mpp"
@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+import core.runner as runner
+import database.database as database
+import database.journal as journal
+import settings.backend as backend_config
+import settings.metrics as metrics_config
+from benchmarks.synthetic import FakeBackend
+
+NAMES = ("Проект_1.mpp", "Проект_2.mpp", "Проект_3.mpp", "Проект_4.mpp")
+
+
+class CrashingBackend(FakeBackend):
+    """FakeBackend, на третьем файле которого приложение завершается аварийно."""
+
+    crash = True
+
+    def open(self, msp, path):
+        if self.crash and "_3" in path:
+            raise KeyboardInterrupt
+        return super().open(msp, path)
+
+
+@pytest.fixture(autouse=True)
+def in_process(monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', None)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    source = tmp_path / "projects"
+    output = tmp_path / "forms"
+    source.mkdir()
+    output.mkdir()
+    for name in NAMES:
+        (source / name).write_bytes(name.encode())
+    return str(source), str(output)
+
+
+def _run(folders, backend_factory=FakeBackend, cancel_after=None, resume=True):
+    """Запускает выгрузку и возвращает итог и количество обработанных в этом запуске файлов."""
+
+    cancel = threading.Event()
+    processed = []
+
+    def on_event(kind, data):
+        if kind == 'file':
+            processed.append(data.path)
+            if len(processed) == cancel_after:
+                cancel.set()
+
+    summary = runner.run_export(*folders, workers=1, on_event=on_event, cancel=cancel,
+                                backend_factory=backend_factory, resume=resume)
+    return summary, len(processed)
+
+
+def _states():
+    batch_journal = journal.get_journal()
+    batch_id = batch_journal._conn.execute("SELECT MAX(id) FROM batches").fetchone()[0]
+    return [entry.state for entry in batch_journal.entries(batch_id)]
+
+
+def test_cancelled_batch_resumes_with_remaining_files(folders):
+    first, first_count = _run(folders, cancel_after=2)
+
+    assert first.cancelled and first_count == 2
+    assert _states() == ['done', 'done', 'pending', 'pending']
+
+    second, second_count = _run(folders)
+
+    assert not second.cancelled and second.resumed == 2 and second_count == 2
+    assert len(second.results) == 4 and not second.bad_files
+    assert _states() == ['done'] * 4
+
+
+def test_crashed_batch_resumes_from_running_file(folders, monkeypatch):
+    with pytest.raises(KeyboardInterrupt):
+        _run(folders, CrashingBackend)
+
+    # Отмечен только файл, который обрабатывался в момент сбоя.
+    assert _states() == ['done', 'done', 'running', 'pending']
+
+    monkeypatch.setattr(CrashingBackend, 'crash', False)
+    summary, count = _run(folders, CrashingBackend)
+
+    assert summary.resumed == 2 and count == 2
+    assert _states() == ['done'] * 4
+
+
+def test_old_batch_is_started_over(folders):
+    _run(folders, cancel_after=1)
+    batch_journal = journal.get_journal()
+    with batch_journal._conn:
+        batch_journal._conn.execute("UPDATE batches SET started_at = '2000-01-01T00:00:00'")
+
+    summary, count = _run(folders)
+
+    assert summary.resumed == 0 and count == 4
+
+
+def test_restart_starts_batch_over(folders):
+    _run(folders, cancel_after=1)
+
+    summary, count = _run(folders, resume=False)
+
+    assert summary.resumed == 0 and count == 4
+
+
+def test_reserve_copy_is_recorded_as_a_run_stage(folders, tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_config, 'ENABLED', True)
+    monkeypatch.setattr(metrics_config, 'PATH_TO_REPORT_FOLDER', str(tmp_path / "reports"))
+
+    _run(folders)
+
+    stages = {stage for stage, *_ in database.get_store().slowest_stages()}
+    assert {'reserve', 'transfer_files', 'write_form'} <= stages
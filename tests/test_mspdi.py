@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pytest
+
+import core.mspdi as mspdi
+import core.schema as schema
+from conftest import DATA
+
+PATH_TO_PROJECT = os.path.join(DATA, "project.xml")
+
+
+def test_read_tasks_skips_project_summary_and_keeps_null_rows():
+    tasks = list(mspdi.read_tasks(PATH_TO_PROJECT))
+
+    assert [t.UniqueID if t is not None else None for t in tasks] == [1, 2, None, 4]
+
+
+def test_read_tasks_converts_fields_like_com():
+    task = list(mspdi.read_tasks(PATH_TO_PROJECT))[1]
+
+    assert task.Name == "Работа 1.1"
+    assert task.Text4 == "UID-2"
+    assert task.Number15 == 42.5
+    assert task.StartSlack == 480
+    assert task.ActualStart == pd.Timestamp("2023-02-02 08:00")
+    assert task.Baseline4Start == pd.Timestamp("2023-01-30 08:00")
+    assert task.Summary is False
+
+
+def test_missing_fields_have_com_empty_values():
+    task = list(mspdi.read_tasks(PATH_TO_PROJECT))[0]
+
+    assert task.ActualFinish == mspdi.config.NA_VALUE
+    assert task.Text5 == ""
+    assert task.Number17 == 0.0
+    with pytest.raises(AttributeError):
+        task.NotInSchema
+
+
+def test_fill_dataframe_builds_typed_task_table():
+    data = mspdi.fill_dataframe(PATH_TO_PROJECT)
+
+    assert list(data.columns) == [column.header for column in schema.get_columns()]
+    assert data[schema.header('Text4')].tolist() == ["UID-1", "UID-2", "UID-4"]
+    assert data[schema.header('Active')].tolist() == [True, True, False]
+    assert data[schema.header('ActualStart')].tolist()[1] == pd.Timestamp("2023-02-02")
+    assert data[schema.header('ActualStart')].isna().tolist() == [True, False, True]
+    assert pd.api.types.is_datetime64_any_dtype(data[schema.header('Start')])
+
+
+def test_fill_dataframe_reports_broken_file(tmp_path):
+    path = tmp_path / "broken.xml"
+    path.write_text("<Project xmlns='http://schemas.microsoft.com/project'><Tasks><Task>", encoding='utf-8')
+
+    with pytest.raises(Exception, match="MSPDI"):
+        mspdi.fill_dataframe(str(path))
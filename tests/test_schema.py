@@ -0,0 +1,49 @@
+import datetime
+
+import openpyxl
+import pandas as pd
+import pytest
+
+import core.fact as fact
+import core.schema as schema
+import settings.readOF as config
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("01.02.2023", "2023-02-01"),
+    ("13.02.2023", "2023-02-13"),
+    (" 05.03.2023 ", "2023-03-05"),
+    ("02.03.2023 10:15", "2023-03-02"),
+    ("2023-04-07", "2023-04-07"),
+])
+def test_text_dates_are_day_first(text, expected):
+    dates = schema.normalize_column(pd.Series([text], dtype=object), 'date')
+
+    assert dates[0] == pd.Timestamp(expected)
+
+
+def test_mixed_date_column():
+    values = pd.Series(["01.02.2023", config.NA_VALUE, None, "не дата", pd.Timestamp("2023-06-01 13:00"),
+                        datetime.datetime(2023, 7, 1, 9, tzinfo=datetime.timezone.utc)], dtype=object)
+
+    dates = schema.normalize_column(values, 'date')
+
+    assert dates.tolist()[:1] + dates.tolist()[4:] == [pd.Timestamp("2023-02-01"), pd.Timestamp("2023-06-01"),
+                                                       pd.Timestamp("2023-07-01")]
+    assert dates.isna().tolist() == [False, True, True, True, False, False]
+
+
+def test_text_dates_from_form_reach_check_form(tmp_path):
+    key, start, finish = (schema.header(attribute) for attribute in config.FACT_ID_COLUMNS)
+    path = tmp_path / "form.xlsx"
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append([key, start, finish])
+    sheet.append(["A", "01.02.2023", "13.02.2023"])
+    workbook.save(path)
+    project = pd.DataFrame({key: ["A"], start: [pd.NaT], finish: [pd.NaT]}, index=pd.Index([7], name='UniqueID'))
+
+    form = fact.get_excel_pd(str(path), [key, start, finish])
+    changes = fact.check_form(project, form, [key, start, finish])
+
+    assert changes == {7: {start: pd.Timestamp("2023-02-01"), finish: pd.Timestamp("2023-02-13")}}
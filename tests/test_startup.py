@@ -0,0 +1,21 @@
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.bench_startup import ROOT, measure
+
+
+@pytest.mark.parametrize('module', ['core.runner', 'core.cli'])
+def test_startup_modules_do_not_load_heavy_dependencies(module):
+    assert measure(module, repeat=1)['forbidden_loaded'] == []
+
+
+def test_core_modules_import_without_pywin32():
+    modules = ['core.batch', 'core.readOF', 'core.fact', 'core.watchdog', 'core.cli']
+    code = f"import sys; import {', '.join(modules)}; print(sorted({{'win32com', 'pythoncom'}} & set(sys.modules)))"
+
+    completed = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.strip() == '[]'
@@ -0,0 +1,30 @@
+import openpyxl
+import pytest
+
+import core.readOF as readOF
+import settings.readOF as config
+from benchmarks.synthetic import FakeBackend
+from core.backend import SessionPool
+
+
+def _export(path_to_project, folder, streaming, monkeypatch):
+    monkeypatch.setattr(config, 'STREAMING_EXPORT', streaming)
+    folder.mkdir()
+    with SessionPool(FakeBackend(60)) as pool:
+        path_to_excel = readOF.main(path_to_project, str(folder), pool)
+    workbook = openpyxl.load_workbook(path_to_excel)
+    return [list(row) for row in workbook.active.iter_rows(values_only=True)]
+
+
+@pytest.mark.parametrize('rollup', [False, True])
+def test_streaming_export_writes_the_same_form(tmp_path, monkeypatch, rollup):
+    monkeypatch.setattr(config, 'ROLLUP_SUMMARIES', rollup)
+    path_to_project = tmp_path / "Проект.mpp"
+    path_to_project.write_bytes(b"mpp")
+    path_to_project = str(path_to_project)
+
+    normal = _export(path_to_project, tmp_path / "normal", False, monkeypatch)
+    streamed = _export(path_to_project, tmp_path / "streamed", True, monkeypatch)
+
+    assert len(normal) == 61
+    assert streamed == normal
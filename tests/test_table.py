@@ -0,0 +1,51 @@
+import pytest
+
+import core.fact as fact
+import core.metrics as metrics
+import core.readOF as readOF
+import settings.metrics as metrics_config
+import settings.readOF as config
+from benchmarks.synthetic import FakeProject, make_project
+
+
+class CountingTask:
+    """Обертка над задачей, которая считает чтения ее полей, как обращения к COM."""
+
+    def __init__(self, task, reads):
+        self._task = task
+        self._reads = reads
+
+    def __getattr__(self, name):
+        self._reads.append(name)
+        return getattr(self._task, name)
+
+
+def _counting_project(count, reads):
+    return FakeProject([CountingTask(t, reads) for t in make_project(count, seed=1).Tasks])
+
+
+@pytest.fixture(autouse=True)
+def metrics_enabled(monkeypatch):
+    monkeypatch.setattr(metrics_config, 'ENABLED', True)
+
+
+@pytest.mark.parametrize('rollup', [False, True])
+def test_export_counts_actual_com_reads(rollup, monkeypatch):
+    monkeypatch.setattr(config, 'ROLLUP_SUMMARIES', rollup)
+    reads = []
+
+    with metrics.track(None) as record:
+        readOF.fill_dataframe(_counting_project(50, reads))
+
+    assert record['counters']['com_calls'] == len(reads)
+    assert ('Summary' in reads) and (reads.count('Start') < 50) == rollup
+
+
+def test_fact_counts_index_reads():
+    reads = []
+
+    with metrics.track(None) as record:
+        fact.fill_dataframe(_counting_project(20, reads))
+
+    assert record['counters']['com_calls'] == len(reads)
+    assert reads.count('UniqueID') == 20
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+import pytest
+
+import core.readOF as readOF
+import database.tasks as tasks
+import settings.database as database_config
+import settings.readOF as config
+from conftest import DATA
+
+PATH_TO_PROJECT = os.path.join(DATA, "project.xml")
+
+
+@pytest.fixture
+def task_store(tmp_path, monkeypatch):
+    store = tasks.TaskStore(str(tmp_path / "tasks.db"))
+    monkeypatch.setattr(database_config, 'EXPORT_TO_DATABASE', True)
+    monkeypatch.setattr(tasks, '_store', store)
+    yield store
+    store.close()
+
+
+def _fail(*args, **kwargs):
+    raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_export_writes_tasks_to_database(task_store, tmp_path, monkeypatch, streaming):
+    monkeypatch.setattr(config, 'STREAMING_EXPORT', streaming)
+
+    assert readOF.main(PATH_TO_PROJECT, str(tmp_path), pool=object()) is not None
+    assert len(task_store.read_latest()) == 3
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_database_error_keeps_form(task_store, tmp_path, monkeypatch, streaming):
+    monkeypatch.setattr(config, 'STREAMING_EXPORT', streaming)
+    monkeypatch.setattr(tasks.Export, 'add', _fail)
+
+    path_to_excel = readOF.main(PATH_TO_PROJECT, str(tmp_path), pool=object())
+
+    assert path_to_excel is not None and os.path.exists(path_to_excel)
+    assert task_store.read_latest().empty
+    assert task_store._conn.execute("SELECT COUNT(*) FROM exports").fetchone()[0] == 0
+
+
+def test_database_unavailable_on_open_keeps_streamed_form(task_store, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'STREAMING_EXPORT', True)
+    monkeypatch.setattr(task_store, 'export', _fail)
+
+    path_to_excel = readOF.main(PATH_TO_PROJECT, str(tmp_path), pool=object())
+
+    assert path_to_excel is not None and os.path.exists(path_to_excel)
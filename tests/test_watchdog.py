@@ -0,0 +1,53 @@
+import functools
+import multiprocessing
+import os
+
+import core.batch as batch
+import core.watchdog as watchdog
+import settings.backend as backend_config
+from benchmarks.synthetic import FakeBackend
+
+PROJECT_NAMES = ("Проект_1.mpp", "Проект_2_hang.mpp", "Проект_3.mpp")
+
+
+def _double(value, pool):
+    return value * 2
+
+
+def _crash(value, pool):
+    if value == 2:
+        os._exit(1)
+    return value
+
+
+def test_iter_calls_keeps_order():
+    outcomes = list(watchdog.iter_calls(_double, [(1,), (2,), (3,)], 2, functools.partial(FakeBackend, 5), None))
+
+    assert outcomes == [(2, None), (4, None), (6, None)]
+
+
+def test_hanging_file_fails_after_timeout_and_batch_continues(projects, monkeypatch):
+    monkeypatch.setattr(backend_config, 'FILE_TIMEOUT', 2)
+    paths, output = projects
+
+    results = list(batch.iter_export(paths, output, 1, functools.partial(FakeBackend, 20)))
+
+    assert [result.output is None for result in results] == [False, True, False]
+    assert 'не завершилась' in results[1].error
+
+
+def test_crashed_worker_is_restarted():
+    outcomes = list(watchdog.iter_calls(_crash, [(1,), (2,), (3,)], 1, functools.partial(FakeBackend, 5), None))
+
+    assert outcomes[0] == (1, None) and outcomes[2] == (3, None)
+    assert outcomes[1][0] is None and 'аварийно' in str(outcomes[1][1])
+
+
+def test_worker_start_failure_is_reported_for_every_item(monkeypatch):
+    # При spawn фабрика передается в процесс через pickle, а lambda не сериализуется.
+    monkeypatch.setattr(watchdog, 'multiprocessing', multiprocessing.get_context('spawn'))
+
+    outcomes = list(watchdog.iter_calls(_double, [(1,), (2,), (3,)], 2, lambda: FakeBackend(5), 60))
+
+    assert len(outcomes) == 3
+    assert all(result is None and error is not None for result, error in outcomes)